@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+图表转图片微基准：PNG 往返 vs Agg RGBA 缓冲区直接转换
+
+旧路径（StatsFrame.fig_to_image 原实现）：draw -> print_png（再次绘制并 PNG 编码）-> Image.open 解码 -> 新建 PhotoImage
+新路径：draw -> buffer_rgba 直接构造 PIL 图片 -> 贴入已有的同尺寸 PhotoImage
+
+没有显示器时跳过 PhotoImage 部分，只比较到 PIL 图片为止。
+
+用法:
+    python benchmarks/bench_fig_to_image.py [--repeat 30]
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from PIL import Image, ImageTk
+
+from konata_api.charts import create_balance_bar_chart
+from konata_api.chart_render import rgba_to_pil, to_photo_image
+
+
+def _sample_figure():
+    sites = [
+        {"name": f"站点 {i}", "balance": 5.0 + i * 3.7, "balance_unit": "USD", "type": "paid"}
+        for i in range(20)
+    ]
+    return create_balance_bar_chart(sites, figsize=(4.8, 2.6), dpi=110)   # 统计页的图表尺寸
+
+
+def _timeit(func, repeat: int) -> float:
+    """多次执行取中位数（毫秒）"""
+    func()   # 预热
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return samples[len(samples) // 2]
+
+
+def _png_to_pil(fig):
+    canvas = FigureCanvasAgg(fig)
+    canvas.draw()
+    buf = io.BytesIO()
+    canvas.print_png(buf)
+    buf.seek(0)
+    img = Image.open(buf)
+    img.load()
+    return img
+
+
+def _rgba_to_pil(fig):
+    canvas = FigureCanvasAgg(fig)
+    canvas.draw()
+    rgba = canvas.buffer_rgba()
+    height, width = rgba.shape[:2]
+    return rgba_to_pil(width, height, rgba)
+
+
+def _tk_root():
+    try:
+        import tkinter as tk
+        root = tk.Tk()
+        root.withdraw()
+        return root
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="fig_to_image 微基准")
+    parser.add_argument("--repeat", type=int, default=30, help="每项重复次数")
+    args = parser.parse_args()
+
+    fig = _sample_figure()
+    canvas = FigureCanvasAgg(fig)
+    canvas.draw()
+
+    def convert_png():
+        buf = io.BytesIO()
+        canvas.print_png(buf)
+        buf.seek(0)
+        Image.open(buf).load()
+
+    def convert_buffer():
+        rgba = canvas.buffer_rgba()
+        Image.frombuffer("RGBA", (rgba.shape[1], rgba.shape[0]), rgba, "raw", "RGBA", 0, 1).load()
+
+    results = [
+        ("转换（已绘制）: PNG 编码 + 解码", _timeit(convert_png, args.repeat)),
+        ("转换（已绘制）: RGBA 缓冲区", _timeit(convert_buffer, args.repeat)),
+        ("完整: draw + PNG 往返 -> PIL", _timeit(lambda: _png_to_pil(fig), args.repeat)),
+        ("完整: draw + RGBA 缓冲区 -> PIL", _timeit(lambda: _rgba_to_pil(fig).load(), args.repeat)),
+    ]
+
+    root = _tk_root()
+    if root is not None:
+        photo = to_photo_image(_rgba_to_pil(fig))
+        results += [
+            ("完整 + 新建 PhotoImage（旧）", _timeit(lambda: ImageTk.PhotoImage(_png_to_pil(fig)), args.repeat)),
+            ("完整 + 复用 PhotoImage（新）", _timeit(lambda: to_photo_image(_rgba_to_pil(fig), photo), args.repeat)),
+        ]
+        root.destroy()
+    else:
+        print("（没有可用的显示器，跳过 PhotoImage 部分）")
+
+    width, height = canvas.get_width_height()
+    print(f"图表尺寸 {width}x{height}，每项 {args.repeat} 次取中位数")
+    for name, ms in results:
+        print(f"  {name:<32} {ms:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,410 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+站点统计与图表基准测试（不需要显示器）
+
+按 10 / 100 / 1,000 / 10,000 个站点生成合成数据（stats.json、签到日志、本地调用日志），
+分别计时 load_stats、save_stats、get_stats_summary、import_from_profiles、load_checkin_log、
+各个 create_*_chart（构建 Figure 与 Agg 绘制分开计时）以及复用图表模板时的渲染（render_chart），
+结果写入 JSON 报告。
+每个规模在单独的子进程中运行，数据放在临时目录，不会读写程序自己的 config/。
+
+用法:
+    python benchmarks/bench_stats.py
+    python benchmarks/bench_stats.py --sizes 10,100 --repeat 3 --backend sqlite
+    python benchmarks/bench_stats.py --compare benchmarks/results/上次的报告.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, "src"))
+
+DEFAULT_SIZES = (10, 100, 1000, 10000)
+DEFAULT_REPEAT = 5
+DEFAULT_OUTPUT_DIR = os.path.join(ROOT_DIR, "benchmarks", "results")
+
+CHART_FIGSIZE = (4.8, 2.6)   # 统计页的图表尺寸
+CHART_DPI = 110
+
+# 合成数据的规模
+CHECKIN_DAYS = 30                 # 公益站每天签到，保留最近 30 天
+RECHARGE_RECORDS_MAX = 12         # 付费站最多 12 条充值记录
+CALL_LOGS_PER_SITE = 50
+CALL_LOGS_MAX = 200000
+MODELS = ("gpt-4o", "gpt-4o-mini", "claude-sonnet", "claude-haiku", "gemini-pro", "deepseek-chat", "qwen-max")
+
+
+# ============ 合成数据 ============
+
+def make_sites(count: int, rng: random.Random) -> list:
+    """站点列表：付费站带充值记录，余额单位以 USD 为主"""
+    from konata_api.stats import (
+        SITE_TYPE_PAID, SITE_TYPE_FREE, SITE_TYPE_SUBSCRIPTION, create_site, generate_record_id,
+    )
+
+    today = datetime.now()
+    sites = []
+    for index in range(count):
+        site_type = rng.choices(
+            (SITE_TYPE_PAID, SITE_TYPE_FREE, SITE_TYPE_SUBSCRIPTION), weights=(50, 35, 15)
+        )[0]
+        site = create_site(
+            name=f"站点-{index:05d}",
+            url=f"https://api{index}.example.com",
+            site_type=site_type,
+            balance=round(rng.uniform(0, 500), 2),
+            balance_unit=rng.choices(("USD", "CNY", "Token"), weights=(80, 15, 5))[0],
+            api_key=f"sk-bench-{index:05d}",
+        )
+        site["id"] = f"bench{index:05d}"
+        site["last_query_time"] = (today - timedelta(minutes=rng.randint(0, 7 * 1440))).strftime("%Y-%m-%d %H:%M:%S")
+        if site_type == SITE_TYPE_PAID:
+            for _ in range(rng.randint(0, RECHARGE_RECORDS_MAX)):
+                site["recharge_records"].append({
+                    "id": generate_record_id(),   # 与程序生成的ID相同（不同站点之间可能重复）
+                    "amount": float(rng.choice((5, 10, 20, 50, 100))),
+                    "date": (today - timedelta(days=rng.randint(0, 365))).strftime("%Y-%m-%d"),
+                    "note": "",
+                })
+        sites.append(site)
+    return sites
+
+
+def make_checkin_logs(sites: list, rng: random.Random) -> list:
+    """签到日志（从旧到新）：公益站最近 CHECKIN_DAYS 天每天一次"""
+    from konata_api.stats import SITE_TYPE_FREE
+
+    now = datetime.now()
+    logs = []
+    for site in sites:
+        if site["type"] != SITE_TYPE_FREE:
+            continue
+        for day in range(CHECKIN_DAYS):
+            success = rng.random() < 0.85
+            logs.append({
+                "id": f"chk-{site['id']}-{day:02d}",
+                "time": (now - timedelta(days=day, minutes=rng.randint(0, 600))).strftime("%Y-%m-%d %H:%M:%S"),
+                "site_name": site["name"],
+                "site_id": site["id"],
+                "success": success,
+                "quota_awarded": round(rng.uniform(0.1, 2.0), 2) if success else 0,
+                "message": "签到成功" if success else "今日已签到",
+            })
+    logs.sort(key=lambda record: record["time"])
+    return logs
+
+
+def make_call_log_columns(site_count: int, rng: random.Random):
+    """最近 30 天的本地调用日志（LogColumns）"""
+    from konata_api.log_analytics import LogColumns
+
+    now = int(time.time())
+    records = [
+        {
+            "created_at": now - rng.randint(0, 30 * 86400),
+            "quota": rng.randint(100, 200000),
+            "model_name": rng.choice(MODELS),
+            "token_name": f"key-{rng.randint(0, 9)}",
+            "prompt_tokens": rng.randint(10, 8000),
+            "completion_tokens": rng.randint(10, 2000),
+        }
+        for _ in range(min(site_count * CALL_LOGS_PER_SITE, CALL_LOGS_MAX))
+    ]
+    return LogColumns.from_records(records)
+
+
+def make_profiles(sites: list, rng: random.Random) -> list:
+    """config.json 中的 profiles：一半与已有站点重复，一半是新站点"""
+    profiles = []
+    for index, site in enumerate(sites):
+        url = site["url"] if index % 2 == 0 else f"https://new{index}.example.com"
+        profiles.append({"name": f"配置-{index:05d}", "url": url, "api_key": f"sk-new-{index:05d}"})
+    rng.shuffle(profiles)
+    return profiles
+
+
+def write_dataset(data_dir: str, sites: list, checkin_logs: list, backend: str):
+    """写入 config.json、stats.json 和 checkin_log.jsonl"""
+    config_dir = os.path.join(data_dir, "config")
+    os.makedirs(config_dir, exist_ok=True)
+    config = {
+        "profiles": [],
+        "stats_storage": {"backend": backend},
+        # 保留全部合成的签到日志，避免加载时被压缩
+        "checkin_log": {"keep": max(1, len(checkin_logs)), "max_file_kb": 1024 * 1024},
+    }
+    with open(os.path.join(config_dir, "config.json"), "w", encoding="utf-8") as f:
+        json.dump(config, f, ensure_ascii=False, indent=2)
+    with open(os.path.join(config_dir, "stats.json"), "w", encoding="utf-8") as f:
+        json.dump({"sites": sites}, f, ensure_ascii=False, indent=2)
+    with open(os.path.join(config_dir, "checkin_log.jsonl"), "w", encoding="utf-8") as f:
+        for record in checkin_logs:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def use_data_dir(data_dir: str):
+    """让 konata_api 的所有模块把 data_dir 当作程序目录（读写 data_dir/config/）"""
+    for name, module in list(sys.modules.items()):
+        if name.startswith("konata_api") and hasattr(module, "get_exe_dir"):
+            module.get_exe_dir = lambda: data_dir
+
+
+# ============ 计时 ============
+
+def measure(func, repeat: int, setup=None) -> dict:
+    """执行 repeat 次（每次之前调用 setup，不计时），返回毫秒统计"""
+    samples = []
+    for _ in range(max(1, repeat)):
+        args = setup() if setup is not None else ()
+        start = time.perf_counter()
+        func(*args)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "median_ms": round(samples[len(samples) // 2], 3),
+        "min_ms": round(samples[0], 3),
+        "max_ms": round(samples[-1], 3),
+        "runs": len(samples),
+    }
+
+
+def run_size(size: int, repeat: int, backend: str, seed: int, charts: bool) -> dict:
+    """生成一个规模的数据并计时（在子进程中调用）"""
+    import konata_api  # noqa: F401  先导入全部模块，再统一重定向数据目录
+    from konata_api import stats
+
+    rng = random.Random(seed + size)
+    with tempfile.TemporaryDirectory(prefix=f"konata-bench-{size}-") as data_dir:
+        use_data_dir(data_dir)
+        sites = make_sites(size, rng)
+        checkin_logs = make_checkin_logs(sites, rng)
+        write_dataset(data_dir, sites, checkin_logs, backend)
+        profiles = make_profiles(sites, rng)
+
+        stats.load_stats()   # SQLite 后端：首次打开时从 JSON 导入（不计时）
+        data = stats.load_stats()
+
+        def touch_one_site():
+            # 每次修改一个站点的余额再保存（SQLite 后端只写入变化的行）
+            data["sites"][rng.randrange(size)]["balance"] = round(rng.uniform(0, 500), 2)
+            return (data,)
+
+        results = {
+            "dataset": {
+                "sites": size,
+                "recharge_records": sum(len(site["recharge_records"]) for site in sites),
+                # 与 recharge_records 不同说明存储后端丢失了记录
+                "recharge_records_loaded": sum(len(site["recharge_records"]) for site in data["sites"]),
+                "checkin_logs": len(checkin_logs),
+                "stats_json_bytes": os.path.getsize(stats.get_stats_path()),
+            },
+            "load_stats": measure(stats.load_stats, repeat),
+            "save_stats": measure(stats.save_stats, repeat, setup=touch_one_site),
+            "get_stats_summary": measure(lambda: stats.get_stats_summary(data["sites"]), repeat),
+            "import_from_profiles": measure(
+                lambda: stats.import_from_profiles(profiles, data["sites"]), repeat,
+            ),
+            "load_checkin_log": measure(stats.load_checkin_log, repeat),
+        }
+
+        if charts:
+            results["charts"] = run_charts(data, stats.load_checkin_log(), size, rng, repeat)
+        stats.close_stats_storage()
+        return results
+
+
+def run_charts(data: dict, checkin_logs: list, size: int, rng: random.Random, repeat: int) -> dict:
+    """各个 create_*_chart：构建 Figure（build）与 Agg 绘制（draw）分开计时"""
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    import matplotlib.pyplot as plt
+    from konata_api import charts
+    from konata_api.stats import get_stats_summary
+
+    sites = data["sites"]
+    summary = get_stats_summary(sites)
+    columns = make_call_log_columns(size, rng)
+    size_kwargs = {"figsize": CHART_FIGSIZE, "dpi": CHART_DPI}
+    builders = {
+        "create_balance_bar_chart": lambda: charts.create_balance_bar_chart(sites, **size_kwargs),
+        "create_type_stats_chart": lambda: charts.create_type_stats_chart(sites, **size_kwargs),
+        "create_recharge_trend_chart": lambda: charts.create_recharge_trend_chart(sites, months=12, **size_kwargs),
+        "create_checkin_activity_chart": lambda: charts.create_checkin_activity_chart(checkin_logs, days=30, **size_kwargs),
+        "create_model_usage_chart": lambda: charts.create_model_usage_chart(columns, days=30, **size_kwargs),
+        "create_usage_trend_chart": lambda: charts.create_usage_trend_chart(columns, days=30, **size_kwargs),
+    }
+    charts.warm_up()
+
+    results = {}
+    for name, build in builders.items():
+        figures = []
+
+        def build_once():
+            figures.append(build())
+
+        def draw_once(fig):
+            FigureCanvasAgg(fig).draw()
+
+        results[name] = {
+            "build": measure(build_once, repeat),
+            "draw": measure(draw_once, repeat, setup=lambda: (figures[-1],)),
+        }
+        for fig in figures:
+            plt.close(fig)
+    # 使用 SiteRepository.summary() 的增量汇总时（统计页的实际用法）
+    results["create_type_stats_chart[summary]"] = {
+        "build": measure(lambda: plt.close(charts.create_type_stats_chart(sites, summary=summary, **size_kwargs)), repeat),
+    }
+    results["create_recharge_trend_chart[summary]"] = {
+        "build": measure(lambda: plt.close(charts.create_recharge_trend_chart(sites, summary=summary, **size_kwargs)), repeat),
+    }
+    results["template_reuse"] = run_template_reuse(sites, summary, checkin_logs, columns, repeat)
+    return results
+
+
+def run_template_reuse(sites: list, summary: dict, checkin_logs: list, columns, repeat: int) -> dict:
+    """
+    渲染进程中复用图表模板的路径（chart_render.render_chart：原地更新 + 绘制 + 取像素）
+
+    每次在完整数据和一半数据之间交替，数据确实发生变化（刻度变化时会重新 tight_layout）
+    """
+    from konata_api.chart_render import render_chart
+    from konata_api.stats import get_stats_summary
+
+    half_sites = sites[: len(sites) // 2 + 1]
+    size_kwargs = {"figsize": CHART_FIGSIZE, "dpi": CHART_DPI}
+    variants = {
+        "balance": ({"sites": sites}, {"sites": half_sites}),
+        "recharge": (
+            {"sites": sites, "months": 12, "summary": summary},
+            {"sites": half_sites, "months": 12, "summary": get_stats_summary(half_sites)},
+        ),
+        "checkin": ({"logs": checkin_logs, "days": 30}, {"logs": checkin_logs[::2], "days": 30}),
+        "usage": ({"columns": columns, "days": 30}, {"columns": columns.select(slice(None, None, 2)), "days": 30}),
+    }
+
+    results = {}
+    for name, pair in variants.items():
+        pair = [dict(kwargs, **size_kwargs) for kwargs in pair]
+        render_chart(name, pair[1])   # 创建模板（不计时）
+        calls = []
+
+        def next_kwargs():
+            calls.append(None)
+            return (pair[len(calls) % 2],)
+
+        results[name] = measure(lambda kwargs: render_chart(name, kwargs), repeat, setup=next_kwargs)
+    return results
+
+
+# ============ 报告 ============
+
+def _flatten(results: dict, prefix: str = "") -> dict:
+    """{"charts": {"x": {"build": {...}}}} -> {"charts.x.build": median_ms}"""
+    flat = {}
+    for key, value in results.items():
+        if not isinstance(value, dict) or key == "dataset":
+            continue
+        if "median_ms" in value:
+            flat[prefix + key] = value["median_ms"]
+        else:
+            flat.update(_flatten(value, prefix + key + "."))
+    return flat
+
+
+def print_report(report: dict, baseline: dict = None):
+    for size, results in report["results"].items():
+        dataset = results["dataset"]
+        print(f"\n== {size} 个站点（充值记录 {dataset['recharge_records']}，签到日志 {dataset['checkin_logs']}，"
+              f"stats.json {dataset['stats_json_bytes'] / 1024:.0f} KB）==")
+        loaded = dataset.get("recharge_records_loaded", dataset["recharge_records"])
+        if loaded != dataset["recharge_records"]:
+            print(f"  ！读回的充值记录只有 {loaded} 条，存储后端丢失了 {dataset['recharge_records'] - loaded} 条")
+        current = _flatten(results)
+        previous = _flatten(baseline["results"].get(size, {})) if baseline else {}
+        for name, median in current.items():
+            line = f"  {name:<52} {median:10.2f} ms"
+            if name in previous and previous[name] > 0:
+                line += f"   {median / previous[name]:6.2f}x（上次 {previous[name]:.2f} ms）"
+            print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="站点统计与图表基准测试")
+    parser.add_argument("--sizes", default=",".join(str(size) for size in DEFAULT_SIZES), help="站点数，逗号分隔")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="每项重复次数（取中位数）")
+    parser.add_argument("--backend", choices=("json", "sqlite"), default="json", help="统计数据存储后端")
+    parser.add_argument("--seed", type=int, default=20240101, help="合成数据随机种子")
+    parser.add_argument("--no-charts", action="store_true", help="跳过图表计时")
+    parser.add_argument("--output", help="JSON 报告路径（默认 benchmarks/results/bench_stats-时间.json）")
+    parser.add_argument("--compare", help="与之前的 JSON 报告对比")
+    parser.add_argument("--worker-size", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--worker-output", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker_size is not None:
+        # 子进程：只运行一个规模，结果写入 --worker-output
+        results = run_size(args.worker_size, args.repeat, args.backend, args.seed, not args.no_charts)
+        with open(args.worker_output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False)
+        return
+
+    import matplotlib
+    import numpy
+
+    report = {
+        "meta": {
+            "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": numpy.__version__,
+            "matplotlib": matplotlib.__version__,
+            "backend": args.backend,
+            "repeat": args.repeat,
+            "seed": args.seed,
+        },
+        "results": {},
+    }
+    for size in (int(value) for value in args.sizes.split(",") if value.strip()):
+        print(f"运行 {size} 个站点...", flush=True)
+        fd, worker_output = tempfile.mkstemp(prefix="konata-bench-", suffix=".json")
+        os.close(fd)
+        command = [sys.executable, os.path.abspath(__file__), "--worker-size", str(size),
+                   "--worker-output", worker_output, "--repeat", str(args.repeat),
+                   "--backend", args.backend, "--seed", str(args.seed)]
+        if args.no_charts:
+            command.append("--no-charts")
+        try:
+            completed = subprocess.run(command, capture_output=True, text=True, encoding="utf-8", errors="replace")
+            if completed.returncode != 0:
+                print(completed.stderr, file=sys.stderr)
+                sys.exit(completed.returncode)
+            with open(worker_output, "r", encoding="utf-8") as f:
+                report["results"][str(size)] = json.load(f)
+        finally:
+            os.remove(worker_output)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    output = args.output or os.path.join(DEFAULT_OUTPUT_DIR, f"bench_stats-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n报告已保存: {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,7 @@
 # -*- coding: utf-8 -*-
 """KonataAPI 入口文件"""
 
+import multiprocessing
 import sys
 import os
 
@@ -11,4 +12,5 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), "src"))
 from konata_api.app import main
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # 打包后图表渲染子进程从这里启动
     main()
\ No newline at end of file
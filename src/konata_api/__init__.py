@@ -3,6 +3,6 @@
 __version__ = "1.0.0"
 
 from konata_api.app import main, ApiQueryApp
-from konata_api.api import query_balance, query_logs
+from konata_api.api import query_balance, query_logs, iter_logs
 
-__all__ = ["main", "ApiQueryApp", "query_balance", "query_logs"]
+__all__ = ["main", "ApiQueryApp", "query_balance", "query_logs", "iter_logs"]
@@ -0,0 +1,257 @@
+"""异步 API 模块 - 基于 httpx.AsyncClient 的查询接口
+
+提供 api.py / conversation_test.py 中查询函数的异步版本，返回结构与同步版本一致。
+请求构建和响应解析与同步版本共用，这里只负责异步 I/O。
+同时查询大量站点时，建议传入同一个 client（见 http_pool.create_async_client）复用连接。
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
+
+import httpx
+
+from konata_api.api import (
+    BALANCE_REQUEST_TIMEOUT,
+    _log_debug,
+    _build_balance_probes,
+    _balance_query_plan,
+    _build_logs_request,
+    _parse_logs_response,
+    _build_checkin_request,
+    _parse_checkin_response,
+    _build_checkin_status_request,
+    _parse_checkin_status_response,
+    _build_cookie_balance_request,
+    _parse_cookie_balance_response,
+)
+from konata_api.conversation_test import (
+    _build_connectivity_request,
+    _parse_connectivity_response,
+    _connectivity_error,
+)
+from konata_api.http_pool import create_async_client
+
+
+# httpx 请求异常（对应同步版本中的 requests.exceptions.RequestException）
+_REQUEST_ERRORS = (httpx.HTTPError, httpx.InvalidURL)
+
+
+@asynccontextmanager
+async def _client_scope(client: Optional[httpx.AsyncClient]):
+    """使用调用方传入的客户端；未传入时临时创建一个，用完即关闭"""
+    if client is not None:
+        yield client
+        return
+    async with create_async_client() as temp_client:
+        yield temp_client
+
+
+async def _fetch_json(client: httpx.AsyncClient, url: str, headers: dict, params: Optional[dict] = None, check_status: bool = True):
+    """异步版 api._fetch_json：请求失败或解析失败时返回 None"""
+    try:
+        resp = await client.get(
+            url,
+            headers=headers,
+            params=params if params else None,
+            timeout=BALANCE_REQUEST_TIMEOUT,
+            follow_redirects=True,
+        )
+        if check_status:
+            resp.raise_for_status()
+        return resp.json()
+    except (*_REQUEST_ERRORS, ValueError):
+        return None
+
+
+async def _run_probe_plan(plan, fetch):
+    """异步版 api._run_probe_plan：探测流程共用同一个生成器，这里只把 fetch 换成协程函数"""
+    try:
+        name = next(plan)
+        while True:
+            name = plan.send(await fetch(name))
+    except StopIteration as stop:
+        return stop.value
+
+
+async def query_balance(
+    api_key: str,
+    base_url: str = "",
+    subscription_api: str = "/v1/dashboard/billing/subscription",
+    usage_api: str = "/v1/dashboard/billing/usage",
+    auth_type: str = "bearer",
+    parallel: bool = False,
+    api_format: Optional[list] = None,
+    client: Optional[httpx.AsyncClient] = None,
+) -> dict:
+    """
+    异步查询中转站余额，参数与返回值同 api.query_balance
+
+    Args:
+        client: 复用的 httpx.AsyncClient，留空则临时创建
+    """
+    base = base_url.rstrip("/")
+    headers, probes = _build_balance_probes(api_key, base, subscription_api, usage_api, auth_type)
+
+    async with _client_scope(client) as http:
+        tasks = {}  # 同一次查询内每个接口只请求一次（回退完整检测时复用）
+
+        def start_probe(name: str):
+            if name not in tasks:
+                url, params, check_status = probes[name]
+                tasks[name] = asyncio.ensure_future(_fetch_json(http, url, headers, params, check_status))
+            return tasks[name]
+
+        def start_probes(names):
+            # 用量接口依赖订阅接口结果，仍按需请求
+            for name in names:
+                if name in probes and name != "usage":
+                    start_probe(name)
+
+        async def fetch(name: str):
+            return await start_probe(name)
+
+        try:
+            plan = _balance_query_plan(
+                base, subscription_api, usage_api, auth_type, api_format, list(probes),
+                start_probes if parallel else None,
+            )
+            return await _run_probe_plan(plan, fetch)
+        finally:
+            # 取消未用到的并行探测，避免在客户端关闭后继续运行
+            pending = [task for task in tasks.values() if not task.done()]
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+
+async def query_logs(
+    api_key: str,
+    base_url: str,
+    page_size: int = 50,
+    page: int = 1,
+    order: str = "desc",
+    custom_api_path: str = "",
+    proxy_url: str = "",
+    auth_type: str = "bearer",
+    client: Optional[httpx.AsyncClient] = None,
+) -> dict:
+    """
+    异步查询调用日志，参数与返回值同 api.query_logs
+
+    Args:
+        client: 复用的 httpx.AsyncClient，留空则临时创建
+    """
+    request_url, params, headers = _build_logs_request(
+        api_key, base_url, page_size, page, order, custom_api_path, proxy_url, auth_type
+    )
+
+    try:
+        async with _client_scope(client) as http:
+            resp = await http.get(request_url, params=params, headers=headers, timeout=10, follow_redirects=True)
+            return _parse_logs_response(resp, request_url)
+    except _REQUEST_ERRORS as e:
+        _log_debug(f"query_logs {request_url} exception={e}")
+        return {"error": str(e)}
+
+
+async def do_checkin(
+    base_url: str,
+    session_cookie: str,
+    user_id: str = "",
+    checkin_path: str = "/api/user/checkin",
+    extra_headers: Optional[dict] = None,
+    client: Optional[httpx.AsyncClient] = None,
+) -> dict:
+    """
+    异步执行签到，参数与返回值同 api.do_checkin
+
+    Args:
+        client: 复用的 httpx.AsyncClient，留空则临时创建
+    """
+    url, headers = _build_checkin_request(base_url, session_cookie, user_id, checkin_path, extra_headers)
+
+    try:
+        async with _client_scope(client) as http:
+            resp = await http.post(url, headers=headers, timeout=15, follow_redirects=True)
+            return _parse_checkin_response(resp, url)
+    except httpx.TimeoutException:
+        _log_debug(f"checkin {url} timeout")
+        return {"success": False, "message": "请求超时，请检查网络"}
+    except httpx.NetworkError:
+        _log_debug(f"checkin {url} connection_error")
+        return {"success": False, "message": "连接失败，请检查网络或站点是否可访问"}
+    except _REQUEST_ERRORS as e:
+        _log_debug(f"checkin {url} exception={e}")
+        return {"success": False, "message": f"网络错误: {str(e)}"}
+
+
+async def get_checkin_status(
+    base_url: str,
+    session_cookie: str,
+    month: str = None,
+    client: Optional[httpx.AsyncClient] = None,
+) -> dict:
+    """
+    异步获取签到状态，参数与返回值同 api.get_checkin_status
+
+    Args:
+        client: 复用的 httpx.AsyncClient，留空则临时创建
+    """
+    url, params, headers = _build_checkin_status_request(base_url, session_cookie, month)
+
+    try:
+        async with _client_scope(client) as http:
+            resp = await http.get(url, headers=headers, params=params, timeout=15, follow_redirects=True)
+            return _parse_checkin_status_response(resp)
+    except _REQUEST_ERRORS as e:
+        return {"success": False, "message": f"网络错误: {str(e)}"}
+
+
+async def query_balance_by_cookie(
+    base_url: str,
+    session_cookie: str,
+    user_id: str = "",
+    client: Optional[httpx.AsyncClient] = None,
+) -> dict:
+    """
+    异步使用 Cookie 查询用户余额，参数与返回值同 api.query_balance_by_cookie
+
+    Args:
+        client: 复用的 httpx.AsyncClient，留空则临时创建
+    """
+    url, headers = _build_cookie_balance_request(base_url, session_cookie, user_id)
+
+    try:
+        async with _client_scope(client) as http:
+            resp = await http.get(url, headers=headers, timeout=15, follow_redirects=True)
+            return _parse_cookie_balance_response(resp, url)
+    except _REQUEST_ERRORS as e:
+        _log_debug(f"balance_by_cookie {url} exception={e}")
+        return {"success": False, "message": f"网络错误: {str(e)}"}
+
+
+async def test_connectivity(
+    url: str,
+    api_key: str = "",
+    timeout: float = 10.0,
+    client: Optional[httpx.AsyncClient] = None,
+) -> dict:
+    """
+    异步测试站点连通性，参数与返回值同 conversation_test.test_connectivity
+
+    Args:
+        client: 复用的 httpx.AsyncClient，留空则临时创建
+    """
+    base, models_url, headers = _build_connectivity_request(url, api_key)
+
+    try:
+        async with _client_scope(client) as http:
+            start_time = time.time()
+            resp = await http.get(models_url, headers=headers, timeout=timeout)
+            latency_ms = (time.time() - start_time) * 1000
+            return _parse_connectivity_response(resp, latency_ms)
+    except Exception as e:
+        return _connectivity_error(e, base)
@@ -1,27 +1,11 @@
 from typing import Optional
-import os
-from datetime import datetime
+import threading
+from collections import deque
+from concurrent.futures import Future
+from datetime import datetime, timedelta
 import requests
-from konata_api.utils import get_exe_dir, load_config
-
-
-def _should_log_debug() -> bool:
-    config = load_config()
-    return bool(config.get("debug", {}).get("enable_api_log", False))
-
-
-def _log_debug(message: str):
-    if not _should_log_debug():
-        return
-    try:
-        log_dir = os.path.join(get_exe_dir(), "debug")
-        os.makedirs(log_dir, exist_ok=True)
-        log_path = os.path.join(log_dir, "requests.log")
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        with open(log_path, "a", encoding="utf-8") as f:
-            f.write(f"[{timestamp}] {message}\n")
-    except Exception:
-        pass
+from konata_api.debug_log import log_debug as _log_debug
+from konata_api.http_pool import get_session
 
 
 def _describe_http_response(status_code: int, text: str, content_type: str = "") -> str:
@@ -73,242 +57,440 @@ def _build_cookie_headers(base_url: str, session_cookie: str, user_id: str = "",
     return headers
 
 
-def query_balance(
-    api_key: str,
-    base_url: str = "",
-    subscription_api: str = "/v1/dashboard/billing/subscription",
-    usage_api: str = "/v1/dashboard/billing/usage",
-    auth_type: str = "bearer"
-) -> dict:
+BALANCE_REQUEST_TIMEOUT = 10
+
+
+def _fetch_json(url: str, headers: dict, params: Optional[dict] = None, check_status: bool = True):
     """
-    查询中转站余额（USD 和 Token 两种统计）
-    支持自动检测多种 API 体系
+    发送 GET 请求并解析 JSON，请求失败或解析失败时返回 None
 
     Args:
-        api_key: API Key (sk-xxx 格式) 或 JWT Token
-        base_url: API 基础地址
-        subscription_api: 订阅信息接口路径
-        usage_api: 用量信息接口路径
-        auth_type: 认证方式，"bearer" 使用 Header 认证，"url_key" 使用 URL 参数
+        url: 完整请求地址
+        headers: 请求头
+        params: URL 参数
+        check_status: 是否要求 2xx 状态码（sub2api 的 /v1/usage 会返回 403 + JSON 错误信息）
+    """
+    try:
+        resp = get_session(url).get(url, headers=headers, params=params if params else None, timeout=BALANCE_REQUEST_TIMEOUT)
+        if check_status:
+            resp.raise_for_status()
+        return resp.json()
+    except (requests.exceptions.RequestException, ValueError):
+        return None
 
-    Returns:
-        dict: 包含余额信息的字典
+
+def _start_probe(func, *args) -> Future:
+    """在守护线程中执行探测请求，返回 Future（退出程序时不会被未完成的探测阻塞）"""
+    future = Future()
+
+    def runner():
+        try:
+            future.set_result(func(*args))
+        except Exception as e:
+            future.set_exception(e)
+
+    threading.Thread(target=runner, daemon=True).start()
+    return future
+
+
+def _run_probe_plan(plan, fetch):
     """
-    base = base_url.rstrip("/")
+    同步执行探测生成器（见 _merge_balance_probes），返回生成器的最终结果
+
+    Args:
+        plan: 探测生成器，每次 yield 需要的接口名称
+        fetch: fetch(name) 返回对应探测接口的 JSON 数据（失败为 None）
+    """
+    try:
+        name = next(plan)
+        while True:
+            name = plan.send(fetch(name))
+    except StopIteration as stop:
+        return stop.value
 
-    # 根据认证类型构建请求参数
-    if auth_type == "url_key":
-        headers = {"Content-Type": "application/json"}
-        auth_params = {"key": api_key}
-    else:  # bearer (默认)
-        headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json",
-        }
-        auth_params = {}
 
+def _parse_subscription(result: dict, raw_responses: dict, sub_data):
+    """
+    解析 OpenAI 兼容订阅接口（或新 API 体系 code/message/data 格式），返回是否识别成功
+
+    生成器：需要用量数据时 yield "usage"，由调用方发送用量接口的 JSON 数据
+    """
+    if sub_data is None:
+        return False
+    raw_responses["subscription"] = sub_data
+
+    # 检查是否是新 API 体系 (code/message/data 格式)
+    if sub_data.get("code") == 0 and "data" in sub_data:
+        data = sub_data["data"]
+        # /api/v1/auth/me 格式
+        if "balance" in data:
+            result["balance"] = data.get("balance", 0)
+            result["email"] = data.get("email", "")
+            result["status"] = data.get("status", "")
+            return True
+        return False
+
+    if "hard_limit_usd" not in sub_data:
+        return False
+
+    # OpenAI 兼容格式
+    result["hard_limit_usd"] = sub_data.get("hard_limit_usd", 0)
+    usage_data = yield "usage"
+    if usage_data is not None:
+        raw_responses["usage"] = usage_data
+        total_usage_cents = usage_data.get("total_usage", 0)
+        result["used_usd"] = round(total_usage_cents / 100, 2)
+        result["remaining_usd"] = round(
+            result["hard_limit_usd"] - result["used_usd"], 2
+        )
+    return True
+
+
+def _parse_v1_usage(result: dict, raw_responses: dict, usage_data) -> bool:
+    """解析 sub2api /v1/usage 接口，返回是否识别成功"""
+    if usage_data is None:
+        return False
+    raw_responses["v1_usage"] = usage_data
+
+    # 检查是否返回错误码（如 INSUFFICIENT_BALANCE）
+    if "code" in usage_data and "message" in usage_data:
+        # 站点返回了错误信息
+        error_code = usage_data.get("code", "")
+        error_msg = usage_data.get("message", "")
+        if error_code == "INSUFFICIENT_BALANCE":
+            result["error"] = f"余额不足: {error_msg}"
+        elif error_code == "INVALID_API_KEY":
+            result["error"] = f"API Key 无效: {error_msg}"
+        else:
+            result["error"] = f"{error_code}: {error_msg}"
+        return True  # 标记已处理，不再尝试其他接口
+
+    # sub2api /v1/usage 格式
+    if "balance" in usage_data or "remaining" in usage_data:
+        result["balance"] = usage_data.get("balance", usage_data.get("remaining", 0))
+        result["remaining"] = usage_data.get("remaining", 0)
+        result["plan_name"] = usage_data.get("planName", "")
+        result["unit"] = usage_data.get("unit", "USD")
+
+        # 解析 usage 统计
+        usage = usage_data.get("usage", {})
+        if usage:
+            today = usage.get("today", {})
+            total = usage.get("total", {})
+            result["today_requests"] = today.get("requests", 0)
+            result["today_tokens"] = today.get("total_tokens", 0)
+            result["today_cost"] = today.get("cost", 0)
+            result["total_requests"] = total.get("requests", 0)
+            result["total_tokens"] = total.get("total_tokens", 0)
+            result["total_cost"] = total.get("cost", 0)
+        return True
+    return False
+
+
+def _parse_auth_me(result: dict, raw_responses: dict, me_data) -> bool:
+    """解析 /api/v1/auth/me（JWT Token 认证的站点），返回是否识别成功"""
+    if me_data is None:
+        return False
+    raw_responses["auth_me"] = me_data
+
+    if me_data.get("code") == 0 and "data" in me_data:
+        data = me_data["data"]
+        result["balance"] = data.get("balance", 0)
+        result["email"] = data.get("email", "")
+        result["status"] = data.get("status", "")
+        return True
+    return False
+
+
+def _parse_dashboard_stats(result: dict, raw_responses: dict, stats_data) -> bool:
+    """解析新 API 体系用量统计 (/api/v1/usage/dashboard/stats)，返回是否识别成功"""
+    if stats_data is None:
+        return False
+    raw_responses["stats"] = stats_data
+
+    if stats_data.get("code") == 0 and "data" in stats_data:
+        data = stats_data["data"]
+        result["total_requests"] = data.get("total_requests", 0)
+        result["total_tokens"] = data.get("total_tokens", 0)
+        result["total_cost"] = data.get("total_cost", 0)
+        result["today_requests"] = data.get("today_requests", 0)
+        result["today_tokens"] = data.get("today_tokens", 0)
+        result["today_cost"] = data.get("today_cost", 0)
+        return True
+    return False
+
+
+def _parse_token_usage(result: dict, raw_responses: dict, token_data) -> bool:
+    """解析 NewAPI 风格 Token 用量 (/api/usage/token/)，返回是否识别成功"""
+    if token_data is None:
+        return False
+    raw_responses["token"] = token_data
+
+    if token_data.get("code") == 0 and "data" in token_data:
+        data = token_data["data"]
+        result["total_granted"] = data.get("total_granted", 0)
+        result["total_used"] = data.get("total_used", 0)
+        result["total_available"] = data.get("total_available", 0)
+        return True
+    return False
+
+
+def _merge_balance_probes(usage_api: str):
+    """
+    按固定优先级合并各接口的探测结果（完整格式检测）
+
+    生成器：每次 yield 需要的探测接口名称，调用方发送该接口的 JSON 数据（失败为 None），
+    结束时返回合并结果。同步与异步查询（konata_api.aio）共用这一套合并逻辑。
+
+    Args:
+        usage_api: 用量信息接口路径（决定是否需要新 API 体系用量统计）
+    """
     result = {}
     raw_responses = {}  # 保存原始返回数据
-    openai_api_success = False
+    answered = []  # 成功识别的接口格式，按探测顺序
 
     # 1. 尝试 OpenAI 兼容 API
-    try:
-        params = {**auth_params}
-        sub_resp = requests.get(
-            f"{base}{subscription_api}", headers=headers, params=params if params else None, timeout=10
-        )
-        sub_resp.raise_for_status()
-        sub_data = sub_resp.json()
-        raw_responses["subscription"] = sub_data
-
-        # 检查是否是新 API 体系 (code/message/data 格式)
-        if sub_data.get("code") == 0 and "data" in sub_data:
-            data = sub_data["data"]
-            # /api/v1/auth/me 格式
-            if "balance" in data:
-                result["balance"] = data.get("balance", 0)
-                result["email"] = data.get("email", "")
-                result["status"] = data.get("status", "")
-                openai_api_success = True
-        elif "hard_limit_usd" in sub_data:
-            # OpenAI 兼容格式
-            openai_api_success = True
-            result["hard_limit_usd"] = sub_data.get("hard_limit_usd", 0)
-
-            # 计算日期范围（最近 100 天）
-            from datetime import datetime, timedelta
-            end_date = datetime.now()
-            start_date = end_date - timedelta(days=100)
-
-            usage_params = {
-                **auth_params,
-                "start_date": start_date.strftime("%Y-%m-%d"),
-                "end_date": end_date.strftime("%Y-%m-%d"),
-            }
-            usage_resp = requests.get(
-                f"{base}{usage_api}",
-                headers=headers,
-                params=usage_params,
-                timeout=10,
-            )
-            usage_resp.raise_for_status()
-            usage_data = usage_resp.json()
-            raw_responses["usage"] = usage_data
-            total_usage_cents = usage_data.get("total_usage", 0)
-            result["used_usd"] = round(total_usage_cents / 100, 2)
-            result["remaining_usd"] = round(
-                result["hard_limit_usd"] - result["used_usd"], 2
-            )
-    except requests.exceptions.RequestException:
-        pass  # billing API 可能不可用，继续尝试其他接口
+    openai_api_success = yield from _parse_subscription(result, raw_responses, (yield "subscription"))
+    if openai_api_success:
+        answered.append("subscription")
 
     # 2. 如果 OpenAI API 失败，尝试 sub2api 格式 (/v1/usage)
     if not openai_api_success:
-        try:
-            usage_resp = requests.get(
-                f"{base}/v1/usage", headers=headers, params=auth_params if auth_params else None, timeout=10
-            )
-            # 不管状态码，先尝试解析 JSON（sub2api 可能返回 403 + JSON 错误信息）
-            try:
-                usage_data = usage_resp.json()
-                raw_responses["v1_usage"] = usage_data
-
-                # 检查是否返回错误码（如 INSUFFICIENT_BALANCE）
-                if "code" in usage_data and "message" in usage_data:
-                    # 站点返回了错误信息
-                    error_code = usage_data.get("code", "")
-                    error_msg = usage_data.get("message", "")
-                    if error_code == "INSUFFICIENT_BALANCE":
-                        result["error"] = f"余额不足: {error_msg}"
-                    elif error_code == "INVALID_API_KEY":
-                        result["error"] = f"API Key 无效: {error_msg}"
-                    else:
-                        result["error"] = f"{error_code}: {error_msg}"
-                    openai_api_success = True  # 标记已处理，不再尝试其他接口
-
-                # sub2api /v1/usage 格式
-                elif "balance" in usage_data or "remaining" in usage_data:
-                    openai_api_success = True
-                    result["balance"] = usage_data.get("balance", usage_data.get("remaining", 0))
-                    result["remaining"] = usage_data.get("remaining", 0)
-                    result["plan_name"] = usage_data.get("planName", "")
-                    result["unit"] = usage_data.get("unit", "USD")
-
-                    # 解析 usage 统计
-                    usage = usage_data.get("usage", {})
-                    if usage:
-                        today = usage.get("today", {})
-                        total = usage.get("total", {})
-                        result["today_requests"] = today.get("requests", 0)
-                        result["today_tokens"] = today.get("total_tokens", 0)
-                        result["today_cost"] = today.get("cost", 0)
-                        result["total_requests"] = total.get("requests", 0)
-                        result["total_tokens"] = total.get("total_tokens", 0)
-                        result["total_cost"] = total.get("cost", 0)
-            except ValueError:
-                # JSON 解析失败，检查 HTTP 状态码
-                if usage_resp.status_code != 200:
-                    pass  # 继续尝试其他接口
-        except requests.exceptions.RequestException:
-            pass
+        openai_api_success = _parse_v1_usage(result, raw_responses, (yield "v1_usage"))
+        if openai_api_success:
+            answered.append("v1_usage")
 
     # 3. 如果还是失败，尝试 /api/v1/auth/me (JWT Token 认证的站点)
     if not openai_api_success:
-        try:
-            me_resp = requests.get(
-                f"{base}/api/v1/auth/me", headers=headers, params=auth_params if auth_params else None, timeout=10
-            )
-            me_resp.raise_for_status()
-            me_data = me_resp.json()
-            raw_responses["auth_me"] = me_data
-
-            if me_data.get("code") == 0 and "data" in me_data:
-                data = me_data["data"]
-                result["balance"] = data.get("balance", 0)
-                result["email"] = data.get("email", "")
-                result["status"] = data.get("status", "")
-        except requests.exceptions.RequestException:
-            pass
+        if _parse_auth_me(result, raw_responses, (yield "auth_me")):
+            answered.append("auth_me")
 
     # 4. 尝试新 API 体系用量统计 (/api/v1/usage/dashboard/stats)
     # 如果配置了新 API 路径，或者 OpenAI API 失败时自动尝试
     should_try_new_stats = "/api/v1/" in usage_api or not openai_api_success
     if should_try_new_stats and "today_requests" not in result:
-        stats_url = usage_api if "/api/v1/" in usage_api else "/api/v1/usage/dashboard/stats"
-        try:
-            stats_resp = requests.get(
-                f"{base}{stats_url}", headers=headers, params=auth_params if auth_params else None, timeout=10
-            )
-            stats_resp.raise_for_status()
-            stats_data = stats_resp.json()
-            raw_responses["stats"] = stats_data
-
-            if stats_data.get("code") == 0 and "data" in stats_data:
-                data = stats_data["data"]
-                result["total_requests"] = data.get("total_requests", 0)
-                result["total_tokens"] = data.get("total_tokens", 0)
-                result["total_cost"] = data.get("total_cost", 0)
-                result["today_requests"] = data.get("today_requests", 0)
-                result["today_tokens"] = data.get("today_tokens", 0)
-                result["today_cost"] = data.get("today_cost", 0)
-        except requests.exceptions.RequestException:
-            pass
-
-    # 4. 查询 Token 用量 (NewAPI 风格)
-    try:
-        token_params = {**auth_params} if auth_params else None
-        token_resp = requests.get(
-            f"{base}/api/usage/token/", headers=headers, params=token_params, timeout=10
-        )
-        token_resp.raise_for_status()
-        token_data = token_resp.json()
-        raw_responses["token"] = token_data
-        if token_data.get("code") == 0 and "data" in token_data:
-            data = token_data["data"]
-            result["total_granted"] = data.get("total_granted", 0)
-            result["total_used"] = data.get("total_used", 0)
-            result["total_available"] = data.get("total_available", 0)
-    except requests.exceptions.RequestException:
-        pass  # token API 可能不可用
+        if _parse_dashboard_stats(result, raw_responses, (yield "stats")):
+            answered.append("stats")
+
+    # 5. 查询 Token 用量 (NewAPI 风格)
+    if _parse_token_usage(result, raw_responses, (yield "token")):
+        answered.append("token")
 
     if not result:
         result["error"] = "无法获取余额信息"
 
+    if answered:
+        result["api_format"] = answered
     result["raw_response"] = raw_responses
     return result
 
 
-def query_logs(
+# 已识别的余额接口格式 -> 解析函数（订阅接口需要额外请求用量接口，单独处理）
+_BALANCE_PARSERS = {
+    "v1_usage": _parse_v1_usage,
+    "auth_me": _parse_auth_me,
+    "stats": _parse_dashboard_stats,
+    "token": _parse_token_usage,
+}
+
+# 进程内格式缓存：(base_url, auth_type, subscription_api, usage_api) -> 接口格式列表
+_api_format_cache = {}
+_api_format_cache_lock = threading.Lock()
+
+
+def _query_known_formats(api_format: list):
+    """
+    只请求已知的接口格式；任一接口出错或返回结构变化时返回 None（需要重新完整检测）
+
+    生成器，用法同 _merge_balance_probes
+    """
+    result = {}
+    raw_responses = {}
+    for name in api_format:
+        if name == "subscription":
+            ok = yield from _parse_subscription(result, raw_responses, (yield name))
+        elif name in _BALANCE_PARSERS:
+            ok = _BALANCE_PARSERS[name](result, raw_responses, (yield name))
+        else:
+            ok = False
+        if not ok:
+            return None
+
+    result["api_format"] = list(api_format)
+    result["raw_response"] = raw_responses
+    return result
+
+
+def _api_format_cache_key(base: str, auth_type: str, subscription_api: str, usage_api: str) -> tuple:
+    """格式缓存的键：接口路径决定各格式请求的地址（以及是否检测新 API 体系的用量统计），一并作为键"""
+    return base, auth_type, subscription_api, usage_api
+
+
+def _get_cached_api_format(cache_key: tuple) -> Optional[list]:
+    """读取进程内缓存的接口格式"""
+    with _api_format_cache_lock:
+        return _api_format_cache.get(cache_key)
+
+
+def _remember_api_format(cache_key: tuple, result: dict):
+    """根据完整检测结果更新进程内格式缓存"""
+    with _api_format_cache_lock:
+        if result.get("api_format"):
+            _api_format_cache[cache_key] = result["api_format"]
+        else:
+            _api_format_cache.pop(cache_key, None)
+
+
+def _balance_query_plan(
+    base: str,
+    subscription_api: str,
+    usage_api: str,
+    auth_type: str,
+    api_format: Optional[list],
+    probe_names,
+    start_probes=None,
+):
+    """
+    一次余额查询的完整探测流程：先只请求已知格式（参数或进程内缓存），失败再完整检测并更新缓存
+
+    生成器，用法同 _merge_balance_probes；同步与异步查询（konata_api.aio）共用
+
+    Args:
+        probe_names: 全部探测接口名称（完整检测时并行发出）
+        start_probes: start_probes(names) 提前并行发出这些探测请求，留空则按需逐个请求
+    """
+    cache_key = _api_format_cache_key(base, auth_type, subscription_api, usage_api)
+    if not api_format:
+        api_format = _get_cached_api_format(cache_key)
+
+    if api_format:
+        if start_probes is not None:
+            start_probes(api_format)
+        result = yield from _query_known_formats(api_format)
+        if result is not None:
+            return result
+        _log_debug(f"query_balance {base} format {api_format} changed, re-detecting")
+
+    if start_probes is not None:
+        start_probes(probe_names)
+    result = yield from _merge_balance_probes(usage_api)
+    _remember_api_format(cache_key, result)
+    return result
+
+
+def _build_balance_probes(
     api_key: str,
-    base_url: str,
-    page_size: int = 50,
-    page: int = 1,
-    order: str = "desc",
-    custom_api_path: str = "",
-    proxy_url: str = "",
+    base: str,
+    subscription_api: str,
+    usage_api: str,
+    auth_type: str,
+) -> tuple:
+    """
+    构建余额查询的请求头和各探测接口
+
+    Returns:
+        tuple: (headers, probes)，probes 为 名称 -> (URL, 参数, 是否要求 2xx 状态码)，
+               其中 usage 依赖订阅接口结果，只在需要时请求
+    """
+    # 根据认证类型构建请求参数
+    if auth_type == "url_key":
+        headers = {"Content-Type": "application/json"}
+        auth_params = {"key": api_key}
+    else:  # bearer (默认)
+        headers = {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json",
+        }
+        auth_params = {}
+
+    # 计算用量接口日期范围（最近 100 天）
+    end_date = datetime.now()
+    start_date = end_date - timedelta(days=100)
+    usage_params = {
+        **auth_params,
+        "start_date": start_date.strftime("%Y-%m-%d"),
+        "end_date": end_date.strftime("%Y-%m-%d"),
+    }
+
+    stats_path = usage_api if "/api/v1/" in usage_api else "/api/v1/usage/dashboard/stats"
+    probes = {
+        "subscription": (f"{base}{subscription_api}", auth_params, True),
+        "v1_usage": (f"{base}/v1/usage", auth_params, False),
+        "auth_me": (f"{base}/api/v1/auth/me", auth_params, True),
+        "stats": (f"{base}{stats_path}", auth_params, True),
+        "token": (f"{base}/api/usage/token/", auth_params, True),
+        "usage": (f"{base}{usage_api}", usage_params, True),
+    }
+    return headers, probes
+
+
+def query_balance(
+    api_key: str,
+    base_url: str = "",
+    subscription_api: str = "/v1/dashboard/billing/subscription",
+    usage_api: str = "/v1/dashboard/billing/usage",
     auth_type: str = "bearer",
+    parallel: bool = False,
+    api_format: Optional[list] = None,
 ) -> dict:
     """
-    查询调用日志（使用 API Key）
+    查询中转站余额（USD 和 Token 两种统计）
+    支持自动检测多种 API 体系
 
     Args:
         api_key: API Key (sk-xxx 格式) 或 JWT Token
         base_url: API 基础地址
-        page_size: 每页返回多少条日志（默认 50）
-        page: 页码（默认 1）
-        order: 排序方式，desc=降序/最新在前，asc=升序（默认 desc）
-        custom_api_path: 自定义日志接口路径（如 /api/log/custom），留空使用默认 /api/log/token
-        proxy_url: 代理地址（如 https://proxy.cifang.xyz/proxy），留空则直接访问
+        subscription_api: 订阅信息接口路径
+        usage_api: 用量信息接口路径
         auth_type: 认证方式，"bearer" 使用 Header 认证，"url_key" 使用 URL 参数
+        parallel: 是否同时发出各探测请求（总耗时约为最慢的有效接口），
+                  结果仍按顺序探测的优先级合并
+        api_format: 上次识别到的接口格式（如 ["subscription", "token"]），
+                    留空则使用进程内缓存；命中时只请求这些接口，失败再完整检测
 
     Returns:
-        dict: 包含日志列表的字典
-            - total: 总条数
-            - items: 日志列表，每条包含 model_name, token_name, quota,
-                     prompt_tokens, completion_tokens, created_at 等
-            - raw_response: 原始 API 返回数据
+        dict: 包含余额信息的字典，识别成功时 api_format 字段为本次命中的接口格式
     """
-    from urllib.parse import urlencode, quote
+    base = base_url.rstrip("/")
+    headers, probes = _build_balance_probes(api_key, base, subscription_api, usage_api, auth_type)
+
+    futures = {}
+    fetched = {}  # 同一次查询内每个接口只请求一次（回退完整检测时复用）
+
+    def start_probes(names):
+        # 各探测接口相互独立，同时发出；用量接口依赖订阅接口结果，仍按需请求
+        for name in names:
+            if name in probes and name != "usage" and name not in futures and name not in fetched:
+                url, params, check_status = probes[name]
+                futures[name] = _start_probe(_fetch_json, url, headers, params, check_status)
+
+    def fetch(name: str):
+        if name not in fetched:
+            if name in futures:
+                fetched[name] = futures[name].result()
+            else:
+                url, params, check_status = probes[name]
+                fetched[name] = _fetch_json(url, headers, params, check_status)
+        return fetched[name]
+
+    plan = _balance_query_plan(
+        base, subscription_api, usage_api, auth_type, api_format, list(probes), start_probes if parallel else None,
+    )
+    return _run_probe_plan(plan, fetch)
+
+
+def _build_logs_request(
+    api_key: str,
+    base_url: str,
+    page_size: int = 50,
+    page: int = 1,
+    order: str = "desc",
+    custom_api_path: str = "",
+    proxy_url: str = "",
+    auth_type: str = "bearer",
+) -> tuple:
+    """构建日志查询请求（参数同 query_logs），返回 (request_url, params, headers)"""
+    from urllib.parse import quote
 
     base = base_url.rstrip("/")
     api_path = custom_api_path.strip() if custom_api_path else "/api/log/token"
@@ -351,45 +533,283 @@ def query_logs(
                 "per_page": page_size,
                 "order": order,
             }
+    return request_url, params, headers
+
+
+def _parse_logs_response(resp, request_url: str) -> dict:
+    """解析日志查询响应（requests / httpx 响应对象均可）"""
+    if resp.status_code != 200:
+        detail = _describe_http_response(resp.status_code, resp.text, resp.headers.get("Content-Type", ""))
+        _log_debug(f"query_logs {request_url} status={resp.status_code} detail={detail}")
+        return {"error": f"HTTP {resp.status_code}: {detail}"}
+
+    # 检查响应内容是否为空
+    if not resp.text.strip():
+        return {"error": "API 返回空响应，请检查接口路径是否正确"}
 
     try:
-        resp = requests.get(request_url, params=params, headers=headers, timeout=10)
-        if resp.status_code != 200:
-            detail = _describe_http_response(resp.status_code, resp.text, resp.headers.get("Content-Type", ""))
-            _log_debug(f"query_logs {request_url} status={resp.status_code} detail={detail}")
-            return {"error": f"HTTP {resp.status_code}: {detail}"}
+        data = resp.json()
+    except ValueError:
+        detail = _describe_http_response(resp.status_code, resp.text, resp.headers.get("Content-Type", ""))
+        _log_debug(f"query_logs {request_url} json_error detail={detail}")
+        return {"error": f"API 返回非 JSON 格式: {detail}"}
 
-        # 检查响应内容是否为空
-        if not resp.text.strip():
-            return {"error": "API 返回空响应，请检查接口路径是否正确"}
+    # 保存原始返回数据
+    raw_response = data
 
-        try:
-            data = resp.json()
-        except ValueError:
-            detail = _describe_http_response(resp.status_code, resp.text, resp.headers.get("Content-Type", ""))
-            _log_debug(f"query_logs {request_url} json_error detail={detail}")
-            return {"error": f"API 返回非 JSON 格式: {detail}"}
+    # 新接口直接返回 {"data": [...]}
+    items = data.get("data", [])
 
-        # 保存原始返回数据
-        raw_response = data
+    # 强制按 created_at 降序排序（确保最新的在前面）
+    # 因为有些 API 不支持 order 参数
+    items = sorted(items, key=lambda x: x.get("created_at", 0), reverse=True)
 
-        # 新接口直接返回 {"data": [...]}
-        items = data.get("data", [])
+    return {
+        "total": len(items),
+        "items": items,
+        "raw_response": raw_response
+    }
 
-        # 强制按 created_at 降序排序（确保最新的在前面）
-        # 因为有些 API 不支持 order 参数
-        items = sorted(items, key=lambda x: x.get("created_at", 0), reverse=True)
 
-        return {
-            "total": len(items),
-            "items": items,
-            "raw_response": raw_response
-        }
+def query_logs(
+    api_key: str,
+    base_url: str,
+    page_size: int = 50,
+    page: int = 1,
+    order: str = "desc",
+    custom_api_path: str = "",
+    proxy_url: str = "",
+    auth_type: str = "bearer",
+) -> dict:
+    """
+    查询调用日志（使用 API Key）
+
+    Args:
+        api_key: API Key (sk-xxx 格式) 或 JWT Token
+        base_url: API 基础地址
+        page_size: 每页返回多少条日志（默认 50）
+        page: 页码（默认 1）
+        order: 排序方式，desc=降序/最新在前，asc=升序（默认 desc）
+        custom_api_path: 自定义日志接口路径（如 /api/log/custom），留空使用默认 /api/log/token
+        proxy_url: 代理地址（如 https://proxy.cifang.xyz/proxy），留空则直接访问
+        auth_type: 认证方式，"bearer" 使用 Header 认证，"url_key" 使用 URL 参数
+
+    Returns:
+        dict: 包含日志列表的字典
+            - total: 总条数
+            - items: 日志列表，每条包含 model_name, token_name, quota,
+                     prompt_tokens, completion_tokens, created_at 等
+            - raw_response: 原始 API 返回数据
+    """
+    request_url, params, headers = _build_logs_request(
+        api_key, base_url, page_size, page, order, custom_api_path, proxy_url, auth_type
+    )
+
+    try:
+        resp = get_session(request_url).get(request_url, params=params, headers=headers, timeout=10)
+        return _parse_logs_response(resp, request_url)
     except requests.exceptions.RequestException as e:
         _log_debug(f"query_logs {request_url} exception={e}")
         return {"error": str(e)}
 
 
+DEFAULT_LOG_PREFETCH = 2  # 逐页获取日志时提前并发请求的页数
+
+
+def _log_record_id(item: dict):
+    """日志记录的唯一标识（优先使用 id，缺失时用创建时间+请求内容组合）"""
+    if item.get("id") is not None:
+        return item["id"]
+    return (
+        item.get("created_at"),
+        item.get("model_name"),
+        item.get("token_name"),
+        item.get("quota"),
+        item.get("prompt_tokens"),
+        item.get("completion_tokens"),
+    )
+
+
+class LogIterator:
+    """
+    逐页获取调用日志的迭代器（由 iter_logs 创建）
+
+    按时间从新到旧逐条产出日志；迭代结束后可通过 error 查看是否因接口出错而中止。
+    同一时间最多只保留 prefetch + 1 页数据。
+    """
+
+    def __init__(self, fetch_page, page_size: int, since=None, prefetch: int = DEFAULT_LOG_PREFETCH, max_pages: Optional[int] = None):
+        self._fetch_page = fetch_page
+        self.page_size = page_size
+        self.since = since
+        self.prefetch = max(0, prefetch)
+        self.max_pages = max_pages
+        self.error = None          # 接口错误信息（正常结束为 None）
+        self.pages_fetched = 0     # 已处理的页数
+        self.reached_since = False  # 是否因早于 since 而提前结束
+
+    def __iter__(self):
+        pending = deque()  # (页码, Future)
+        next_page = 1
+
+        def schedule(limit):
+            nonlocal next_page
+            while len(pending) < limit and (self.max_pages is None or next_page <= self.max_pages):
+                pending.append((next_page, _start_probe(self._fetch_page, next_page)))
+                next_page += 1
+
+        # 指定 since 时通常第一页就够了，确认需要翻页后再预取
+        schedule(1 if self.since is not None else self.prefetch + 1)
+        previous_ids = None
+        while pending:
+            page, future = pending.popleft()
+            result = future.result()
+            if "error" in result:
+                self.error = result["error"]
+                return
+            self.pages_fetched += 1
+
+            items = result.get("items", [])
+            ids = {_log_record_id(item) for item in items}
+            # 空页，或站点忽略页码参数重复返回上一页，视为已到末尾
+            if not items or (previous_ids is not None and ids <= previous_ids):
+                return
+            previous_ids = ids
+
+            is_last_page = len(items) < self.page_size
+            crosses_since = self.since is not None and items[-1].get("created_at", 0) < self.since
+            if not is_last_page and not crosses_since:
+                # 先补齐预取，再把本页交给调用方处理
+                schedule(self.prefetch + 1)
+
+            for item in items:
+                if self.since is not None and item.get("created_at", 0) < self.since:
+                    self.reached_since = True
+                    return
+                yield item
+
+            if is_last_page:
+                return
+
+
+def iter_logs(
+    api_key: str,
+    base_url: str,
+    page_size: int = 50,
+    custom_api_path: str = "",
+    proxy_url: str = "",
+    auth_type: str = "bearer",
+    since=None,
+    prefetch: int = DEFAULT_LOG_PREFETCH,
+    max_pages: Optional[int] = None,
+) -> LogIterator:
+    """
+    逐页获取调用日志（从新到旧），后续页在后台提前并发请求
+
+    Args:
+        api_key / base_url / page_size / custom_api_path / proxy_url / auth_type: 同 query_logs
+        since: 只获取该时间之后的日志（Unix 时间戳或 datetime），遇到更早的记录即停止翻页
+        prefetch: 提前并发请求的页数
+        max_pages: 最多获取的页数，留空不限
+
+    Returns:
+        LogIterator: 可迭代对象，逐条产出日志记录（格式同 query_logs 的 items）
+    """
+    if isinstance(since, datetime):
+        since = since.timestamp()
+
+    def fetch_page(page: int) -> dict:
+        return query_logs(
+            api_key,
+            base_url,
+            page_size=page_size,
+            page=page,
+            order="desc",
+            custom_api_path=custom_api_path,
+            proxy_url=proxy_url,
+            auth_type=auth_type,
+        )
+
+    return LogIterator(fetch_page, page_size, since=since, prefetch=prefetch, max_pages=max_pages)
+
+
+def _build_checkin_request(
+    base_url: str,
+    session_cookie: str,
+    user_id: str = "",
+    checkin_path: str = "/api/user/checkin",
+    extra_headers: Optional[dict] = None,
+) -> tuple:
+    """构建签到请求（参数同 do_checkin），返回 (url, headers)"""
+    base = base_url.rstrip("/")
+    headers = _build_cookie_headers(base, session_cookie, user_id, include_content_type=True)
+    if extra_headers:
+        headers.update(extra_headers)
+
+    path = checkin_path.strip() or "/api/user/checkin"
+    if not path.startswith("/"):
+        path = "/" + path
+    return f"{base}{path}", headers
+
+
+def _parse_checkin_response(resp, url: str) -> dict:
+    """解析签到响应（requests / httpx 响应对象均可）"""
+    # 检查响应内容类型，判断是否被 Cloudflare 拦截
+    content_type = resp.headers.get("Content-Type", "")
+    response_text = resp.text
+
+    # 检测 Cloudflare 拦截
+    if "text/html" in content_type or response_text.strip().startswith("<!DOCTYPE") or response_text.strip().startswith("<html"):
+        detail = _describe_http_response(resp.status_code, response_text, content_type)
+        _log_debug(f"checkin {url} status={resp.status_code} detail={detail}")
+        return {"success": False, "message": detail}
+
+    # 检查空响应
+    if not response_text.strip():
+        return {"success": False, "message": "API 返回空响应，请检查 Cookie 是否有效"}
+
+    # 尝试解析 JSON
+    try:
+        data = resp.json()
+    except ValueError:
+        detail = _describe_http_response(resp.status_code, response_text, content_type)
+        _log_debug(f"checkin {url} json_error detail={detail}")
+        return {"success": False, "message": f"API 返回非 JSON: {detail}"}
+
+    message = str(data.get("message") or "").strip()
+    if data.get("success"):
+        return {
+            "success": True,
+            "message": message or "签到成功",
+            "quota_awarded": data.get("data", {}).get("quota_awarded", 0),
+            "checkin_date": data.get("data", {}).get("checkin_date", ""),
+        }
+
+    normalized_message = message.lower()
+    already_checked_keywords = (
+        "已签到",
+        "已经签到",
+        "今日已签到",
+        "already checked",
+        "already check",
+        "checked in today",
+        "already signed",
+    )
+    if any((keyword in message) or (keyword in normalized_message) for keyword in already_checked_keywords):
+        return {
+            "success": True,
+            "already_checked_in": True,
+            "message": message or "今日已签到",
+            "quota_awarded": 0,
+            "checkin_date": data.get("data", {}).get("checkin_date", ""),
+        }
+
+    return {
+        "success": False,
+        "message": message or "签到失败",
+    }
+
+
 def do_checkin(
     base_url: str,
     session_cookie: str,
@@ -414,82 +834,51 @@ def do_checkin(
             - quota_awarded: 获得的额度（成功时）
             - checkin_date: 签到日期（成功时）
     """
-    base = base_url.rstrip("/")
-    headers = _build_cookie_headers(base, session_cookie, user_id, include_content_type=True)
-    if extra_headers:
-        headers.update(extra_headers)
+    url, headers = _build_checkin_request(base_url, session_cookie, user_id, checkin_path, extra_headers)
 
     try:
-        path = checkin_path.strip() or "/api/user/checkin"
-        if not path.startswith("/"):
-            path = "/" + path
-        resp = requests.post(f"{base}{path}", headers=headers, timeout=15)
-
-        # 检查响应内容类型，判断是否被 Cloudflare 拦截
-        content_type = resp.headers.get("Content-Type", "")
-        response_text = resp.text
-
-        # 检测 Cloudflare 拦截
-        if "text/html" in content_type or response_text.strip().startswith("<!DOCTYPE") or response_text.strip().startswith("<html"):
-            detail = _describe_http_response(resp.status_code, response_text, content_type)
-            _log_debug(f"checkin {base}{path} status={resp.status_code} detail={detail}")
-            return {"success": False, "message": detail}
-
-        # 检查空响应
-        if not response_text.strip():
-            return {"success": False, "message": "API 返回空响应，请检查 Cookie 是否有效"}
-
-        # 尝试解析 JSON
-        try:
-            data = resp.json()
-        except ValueError:
-            detail = _describe_http_response(resp.status_code, response_text, content_type)
-            _log_debug(f"checkin {base}{path} json_error detail={detail}")
-            return {"success": False, "message": f"API 返回非 JSON: {detail}"}
-
-        message = str(data.get("message") or "").strip()
-        if data.get("success"):
-            return {
-                "success": True,
-                "message": message or "签到成功",
-                "quota_awarded": data.get("data", {}).get("quota_awarded", 0),
-                "checkin_date": data.get("data", {}).get("checkin_date", ""),
-            }
-
-        normalized_message = message.lower()
-        already_checked_keywords = (
-            "已签到",
-            "已经签到",
-            "今日已签到",
-            "already checked",
-            "already check",
-            "checked in today",
-            "already signed",
-        )
-        if any((keyword in message) or (keyword in normalized_message) for keyword in already_checked_keywords):
-            return {
-                "success": True,
-                "already_checked_in": True,
-                "message": message or "今日已签到",
-                "quota_awarded": 0,
-                "checkin_date": data.get("data", {}).get("checkin_date", ""),
-            }
-
-        return {
-            "success": False,
-            "message": message or "签到失败",
-        }
+        resp = get_session(url).post(url, headers=headers, timeout=15)
+        return _parse_checkin_response(resp, url)
     except requests.exceptions.Timeout:
-        _log_debug(f"checkin {base}{path} timeout")
+        _log_debug(f"checkin {url} timeout")
         return {"success": False, "message": "请求超时，请检查网络"}
     except requests.exceptions.ConnectionError:
-        _log_debug(f"checkin {base}{path} connection_error")
+        _log_debug(f"checkin {url} connection_error")
         return {"success": False, "message": "连接失败，请检查网络或站点是否可访问"}
     except requests.exceptions.RequestException as e:
-        _log_debug(f"checkin {base}{path} exception={e}")
+        _log_debug(f"checkin {url} exception={e}")
         return {"success": False, "message": f"网络错误: {str(e)}"}
 
 
+def _build_checkin_status_request(base_url: str, session_cookie: str, month: str = None) -> tuple:
+    """构建签到状态请求（参数同 get_checkin_status），返回 (url, params, headers)"""
+    base = base_url.rstrip("/")
+    if not month:
+        month = datetime.now().strftime("%Y-%m")
+
+    headers = _build_cookie_headers(base, session_cookie)
+    return f"{base}/api/user/checkin", {"month": month}, headers
+
+
+def _parse_checkin_status_response(resp) -> dict:
+    """解析签到状态响应（requests / httpx 响应对象均可）"""
+    try:
+        data = resp.json()
+    except ValueError:
+        return {"success": False, "message": "API 返回非 JSON 格式"}
+
+    if data.get("success"):
+        return {
+            "success": True,
+            "data": data.get("data", {}),
+        }
+    else:
+        return {
+            "success": False,
+            "message": data.get("message", "获取签到状态失败"),
+        }
+
+
 def get_checkin_status(base_url: str, session_cookie: str, month: str = None) -> dict:
     """
     获取签到状态（使用 Session Cookie 认证）
@@ -502,32 +891,51 @@ def get_checkin_status(base_url: str, session_cookie: str, month: str = None) ->
     Returns:
         dict: 签到状态信息
     """
-    from datetime import datetime
+    url, params, headers = _build_checkin_status_request(base_url, session_cookie, month)
 
+    try:
+        resp = get_session(url).get(url, headers=headers, params=params, timeout=15)
+        return _parse_checkin_status_response(resp)
+    except requests.exceptions.RequestException as e:
+        return {"success": False, "message": f"网络错误: {str(e)}"}
+
+
+def _build_cookie_balance_request(base_url: str, session_cookie: str, user_id: str = "") -> tuple:
+    """构建 Cookie 余额查询请求（参数同 query_balance_by_cookie），返回 (url, headers)"""
     base = base_url.rstrip("/")
-    if not month:
-        month = datetime.now().strftime("%Y-%m")
+    headers = _build_cookie_headers(base, session_cookie, user_id)
+    return f"{base}/api/user/self", headers
 
-    headers = _build_cookie_headers(base, session_cookie)
 
+def _parse_cookie_balance_response(resp, url: str) -> dict:
+    """解析 /api/user/self 响应（requests / httpx 响应对象均可）"""
     try:
-        resp = requests.get(f"{base}/api/user/checkin", headers=headers, params={"month": month}, timeout=15)
         data = resp.json()
-
-        if data.get("success"):
-            return {
-                "success": True,
-                "data": data.get("data", {}),
-            }
-        else:
-            return {
-                "success": False,
-                "message": data.get("message", "获取签到状态失败"),
-            }
-    except requests.exceptions.RequestException as e:
-        return {"success": False, "message": f"网络错误: {str(e)}"}
     except ValueError:
-        return {"success": False, "message": "API 返回非 JSON 格式"}
+        detail = _describe_http_response(resp.status_code, resp.text, resp.headers.get("Content-Type", ""))
+        _log_debug(f"balance_by_cookie {url} json_error detail={detail}")
+        return {"success": False, "message": f"API 返回非 JSON 格式: {detail}"}
+
+    if data.get("success") and "data" in data:
+        user_data = data["data"]
+        # quota 通常是以 500000 为 1 USD 的单位
+        quota = user_data.get("quota", 0)
+        balance = quota / 500000 if quota else 0
+
+        return {
+            "success": True,
+            "balance": round(balance, 2),
+            "quota": quota,
+            "username": user_data.get("username", ""),
+            "email": user_data.get("email", ""),
+            "display_name": user_data.get("display_name", ""),
+            "raw_data": user_data,
+        }
+    else:
+        return {
+            "success": False,
+            "message": data.get("message", "获取用户信息失败"),
+        }
 
 
 def query_balance_by_cookie(base_url: str, session_cookie: str, user_id: str = "") -> dict:
@@ -547,40 +955,13 @@ def query_balance_by_cookie(base_url: str, session_cookie: str, user_id: str = "
             - email: 邮箱
             - raw_data: 原始返回数据
     """
-    base = base_url.rstrip("/")
-    headers = _build_cookie_headers(base, session_cookie, user_id)
+    url, headers = _build_cookie_balance_request(base_url, session_cookie, user_id)
 
     try:
-        resp = requests.get(f"{base}/api/user/self", headers=headers, timeout=15)
-        try:
-            data = resp.json()
-        except ValueError:
-            detail = _describe_http_response(resp.status_code, resp.text, resp.headers.get("Content-Type", ""))
-            _log_debug(f"balance_by_cookie {base}/api/user/self json_error detail={detail}")
-            return {"success": False, "message": f"API 返回非 JSON 格式: {detail}"}
-
-        if data.get("success") and "data" in data:
-            user_data = data["data"]
-            # quota 通常是以 500000 为 1 USD 的单位
-            quota = user_data.get("quota", 0)
-            balance = quota / 500000 if quota else 0
-
-            return {
-                "success": True,
-                "balance": round(balance, 2),
-                "quota": quota,
-                "username": user_data.get("username", ""),
-                "email": user_data.get("email", ""),
-                "display_name": user_data.get("display_name", ""),
-                "raw_data": user_data,
-            }
-        else:
-            return {
-                "success": False,
-                "message": data.get("message", "获取用户信息失败"),
-            }
+        resp = get_session(url).get(url, headers=headers, timeout=15)
+        return _parse_cookie_balance_response(resp, url)
     except requests.exceptions.RequestException as e:
-        _log_debug(f"balance_by_cookie {base}/api/user/self exception={e}")
+        _log_debug(f"balance_by_cookie {url} exception={e}")
         return {"success": False, "message": f"网络错误: {str(e)}"}
 
 
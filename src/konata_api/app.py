@@ -9,19 +9,35 @@ from PIL import Image, ImageTk
 import json
 import os
 import threading
+from collections.abc import Mapping
 from datetime import datetime
 
-from konata_api.api import query_balance, query_logs, do_checkin, query_balance_by_cookie
+from konata_api.api import query_balance, do_checkin, query_balance_by_cookie
+from konata_api.balance_forecast import get_forecaster, DEFAULT_DEPLETION_WARNING_DAYS
+from konata_api.balance_history import (
+    record_balance, delete_balance_history, balance_from_result,
+    SOURCE_QUERY, SOURCE_BATCH, SOURCE_AUTO, SOURCE_COOKIE, SOURCE_CHECKIN,
+)
+from konata_api.batch import run_batch, host_of, DEFAULT_MAX_WORKERS, DEFAULT_PER_HOST_LIMIT
+from konata_api.chart_render import warm_up as warm_up_charts, shutdown as shutdown_chart_render
+from konata_api.debug_log import flush as flush_debug_log
+from konata_api.http_pool import configure_pool, close_all as close_http_pool
+from konata_api.log_sync import sync_logs, DEFAULT_INITIAL_MAX_PAGES
 from konata_api.utils import (
     get_exe_dir, resource_path, load_config
 )
 from konata_api.dialogs import SettingsDialog, RawResponseDialog, BalanceSummaryDialog, ProfileAdvancedDialog
 from konata_api.tray import TrayIcon
 from konata_api.stats_dialog import StatsFrame
-from konata_api.stats import load_stats, save_stats, get_site_by_id, add_checkin_log, update_site, load_checkin_log
+from konata_api.stats import (
+    SiteRepository, add_checkin_log, load_checkin_log,
+    get_site_api_format, close_stats_storage
+)
 from konata_api.test_dialog import TestFrame
 
 
+CHART_WARMUP_DELAY_MS = 1500  # 主窗口显示后多久在后台预加载图表模块
+
 class ApiQueryApp:
     def __init__(self, root):
         self.root = root
@@ -36,6 +52,9 @@ class ApiQueryApp:
         # 加载配置
         self.config = load_config()
 
+        # 共享 HTTP 连接池上限
+        configure_pool(self.config.get("http_pool"))
+
         # 动态适配窗口尺寸，避免首屏显示不全
         self._configure_window_geometry()
 
@@ -48,6 +67,9 @@ class ApiQueryApp:
         # 原始数据保存文件路径
         self.raw_response_file = os.path.join(get_exe_dir(), "config", "raw_response.json")
 
+        # 站点数据（各模块共享同一个仓库）
+        self.site_repo = SiteRepository.load()
+
         # 创建界面
         self.create_widgets()
 
@@ -61,10 +83,18 @@ class ApiQueryApp:
         # 重写窗口关闭行为
         self.root.protocol("WM_DELETE_WINDOW", self.on_close_window)
 
+        # 正在进行的批量余额查询（BatchJob）
+        self._balance_batch = None
+
         # 自动查询定时器 ID
         self._auto_query_timer_id = None
         self.start_auto_query()
 
+        # 图表模块（matplotlib）不在启动时导入，窗口显示后在后台启动渲染进程并预加载
+        self._chart_warmup_state = "idle"   # idle / deferred / started
+        if self.config.get("preload_charts", True):
+            self.root.after(CHART_WARMUP_DELAY_MS, self._start_chart_warmup)
+
     def _configure_styles(self):
         """配置全局样式"""
         style = ttk.Style()
@@ -287,7 +317,7 @@ class ApiQueryApp:
         # 左侧操作分组
         self._build_action_group(actions_panel, "站点管理", [
             ("➕ 添加站点", self.add_site_from_list, "success"),
-            ("🔄 刷新列表", self.refresh_profile_list, "secondary-outline"),
+            ("🔄 刷新列表", lambda: self.refresh_profile_list(force=True), "secondary-outline"),
             ("🗑️ 删除选中", self.delete_site_from_list, "danger-outline"),
         ])
         self._build_action_group(actions_panel, "查询操作", [
@@ -323,7 +353,7 @@ class ApiQueryApp:
         # Tab 1: 数据统计
         stats_tab = ttk.Frame(self.main_notebook, padding=6)
         self.main_notebook.add(stats_tab, text="📊 数据统计")
-        self.stats_frame = StatsFrame(stats_tab, profiles=self.config.get("profiles", []), show_site_list=False, on_save_callback=self.on_stats_save)
+        self.stats_frame = StatsFrame(stats_tab, profiles=self.config.get("profiles", []), show_site_list=False, on_save_callback=self.on_stats_save, site_repo=self.site_repo)
         self.stats_frame.pack(fill=BOTH, expand=YES)
 
         # Tab 2: 余额查询
@@ -334,7 +364,7 @@ class ApiQueryApp:
         # Tab 3: 站点测试
         test_tab = ttk.Frame(self.main_notebook, padding=6)
         self.main_notebook.add(test_tab, text="🧪 站点测试")
-        self.test_frame = TestFrame(test_tab, show_site_list=False)
+        self.test_frame = TestFrame(test_tab, show_site_list=False, site_repo=self.site_repo)
         self.test_frame.pack(fill=BOTH, expand=YES)
 
         # === 状态栏 ===
@@ -419,8 +449,14 @@ class ApiQueryApp:
         # 日志查询结果页
         logs_tab = ttk.Frame(self.result_notebook)
         self.result_notebook.add(logs_tab, text="日志明细")
+        logs_header = ttk.Frame(logs_tab)
+        logs_header.pack(fill=X, padx=8, pady=(8, 4))
         self.logs_meta_var = ttk.StringVar(value="等待查询日志。")
-        ttk.Label(logs_tab, textvariable=self.logs_meta_var, bootstyle="secondary").pack(anchor=W, padx=8, pady=(8, 4))
+        ttk.Label(logs_header, textvariable=self.logs_meta_var, bootstyle="secondary").pack(side=LEFT, anchor=W)
+        # 从本地日志库继续读取更早的记录（不请求网络）
+        self.logs_more_btn = ttk.Button(logs_header, text="⬇ 加载更早日志", command=self.load_more_logs, bootstyle="secondary-outline", state="disabled")
+        self.logs_more_btn.pack(side=RIGHT)
+        self._logs_view = None
 
         logs_table_frame = ttk.Frame(logs_tab)
         logs_table_frame.pack(fill=BOTH, expand=YES, padx=8, pady=(0, 8))
@@ -516,8 +552,16 @@ class ApiQueryApp:
                 self.root.after_cancel(self._resize_after_id)
             self._resize_after_id = self.root.after(120, self.update_background)
 
-    def refresh_profile_list(self):
-        """刷新站点列表（数据源：stats.json）"""
+    def refresh_profile_list(self, force=False):
+        """刷新站点列表（数据源：站点仓库快照，数据和排序都没有变化时跳过）"""
+        snapshot = self.site_repo.snapshot()
+        sort_key = getattr(self, "_sort_key", "balance")
+        sort_reverse = getattr(self, "_sort_reverse", True)
+        list_state = (snapshot.version, sort_key, sort_reverse)
+        if not force and list_state == getattr(self, "_profile_list_state", None):
+            return
+        self._profile_list_state = list_state
+
         previous_selection = self.profile_tree.selection()
         previous_id = previous_selection[0] if previous_selection else ""
         if not previous_id and hasattr(self, "_current_site"):
@@ -526,16 +570,12 @@ class ApiQueryApp:
         for item in self.profile_tree.get_children():
             self.profile_tree.delete(item)
 
-        self.stats_data = load_stats()
-        sites = self.stats_data.get("sites", [])
+        sites = snapshot.sites
 
         if hasattr(self, "sidebar_site_count_var"):
             self.sidebar_site_count_var.set(f"{len(sites)} 个站点")
 
         # 排序
-        sort_key = getattr(self, "_sort_key", "balance")
-        sort_reverse = getattr(self, "_sort_reverse", True)
-
         if sort_key == "balance":
             sites_sorted = sorted(sites, key=lambda s: s.get("balance", 0), reverse=sort_reverse)
         else:
@@ -561,7 +601,7 @@ class ApiQueryApp:
         if selected_id:
             self.profile_tree.selection_set(selected_id)
             self.profile_tree.focus(selected_id)
-            site = get_site_by_id(self.stats_data, selected_id)
+            site = self.site_repo.get(selected_id)
             if site:
                 self._current_site = site
                 self._sync_site_to_modules()
@@ -569,9 +609,7 @@ class ApiQueryApp:
             self._current_site = {}
             self._set_selected_site_hint()
 
-        # 同步更新 stats_frame 的数据引用
         if hasattr(self, "stats_frame"):
-            self.stats_frame.stats_data = self.stats_data
             self.stats_frame.update_summary()
 
     def sort_profile_list(self, key):
@@ -610,7 +648,7 @@ class ApiQueryApp:
             try:
                 self.profile_tree.selection_set(current_id)
                 # 更新 _current_site 引用
-                site = get_site_by_id(self.stats_data, current_id)
+                site = self.site_repo.get(current_id)
                 if site:
                     self._current_site = site
             except Exception:
@@ -625,7 +663,7 @@ class ApiQueryApp:
             return
 
         site_id = selection[0]
-        site = get_site_by_id(self.stats_data, site_id)
+        site = self.site_repo.get(site_id)
         if site:
             self._current_site = site
             self._sync_site_to_modules()
@@ -673,11 +711,11 @@ class ApiQueryApp:
 
     def add_site_from_list(self):
         """添加新站点"""
-        from konata_api.stats import create_site, add_site, SITE_TYPE_PAID
+        from konata_api.stats import create_site, SITE_TYPE_PAID
 
         site = create_site(name="新站点", url="https://", site_type=SITE_TYPE_PAID)
-        add_site(self.stats_data, site)
-        save_stats(self.stats_data)
+        self.site_repo.add(site)
+        self.site_repo.save()
         self.refresh_profile_list()
 
         # 选中新站点并同步
@@ -691,26 +729,24 @@ class ApiQueryApp:
 
     def delete_site_from_list(self):
         """删除选中的站点"""
-        from konata_api.stats import delete_site
-
         selection = self.profile_tree.selection()
         if not selection:
             messagebox.showwarning("提示", "请先选择要删除的站点")
             return
 
         site_id = selection[0]
-        site = get_site_by_id(self.stats_data, site_id)
+        site = self.site_repo.get(site_id)
         if not site:
             return
 
         if messagebox.askyesno("确认", f"确定删除站点「{site.get('name', '')}」吗？"):
-            delete_site(self.stats_data, site_id)
-            save_stats(self.stats_data)
+            self.site_repo.delete(site_id)
+            self.site_repo.save()
+            delete_balance_history(site_id)
             self.refresh_profile_list()
 
             # 同步刷新统计模块
             if hasattr(self, 'stats_frame'):
-                self.stats_frame.stats_data = self.stats_data
                 self.stats_frame.current_site_id = None
                 self.stats_frame.clear_form()
                 self.stats_frame.update_summary()
@@ -725,7 +761,8 @@ class ApiQueryApp:
         api_sites = []  # 有 checkin_url + session_cookie 的站点，自动签到
         browser_sites = []  # 有 checkin_url 但没 cookie 的站点，打开浏览器
 
-        for site in self.stats_data.get("sites", []):
+        # 工作线程只读取快照，签到结果最后一次性提交
+        for site in self.site_repo.snapshot().sites:
             checkin_url = site.get("checkin_url", "").strip()
             checkin_path = site.get("checkin_api_path", "").strip()
             if not checkin_url and not checkin_path:
@@ -764,9 +801,10 @@ class ApiQueryApp:
             threading.Thread(target=self._do_batch_checkin, args=(api_sites,), daemon=True).start()
 
     def _do_batch_checkin(self, sites):
-        """批量执行自动签到（后台线程）"""
+        """批量执行自动签到（后台线程，sites 为只读快照）"""
         results = []
         total_quota = 0
+        balance_updates = {}
 
         for site in sites:
             site_name = site.get("name", "未命名")
@@ -776,8 +814,7 @@ class ApiQueryApp:
             user_id = site.get("checkin_user_id", "")
             checkin_path = site.get("checkin_api_path", "/api/user/checkin")
             extra_headers = site.get("checkin_headers", {})
-            if not isinstance(extra_headers, dict):
-                extra_headers = {}
+            extra_headers = dict(extra_headers) if isinstance(extra_headers, Mapping) else {}
 
             result = do_checkin(
                 base_url,
@@ -802,7 +839,8 @@ class ApiQueryApp:
                 balance_result = query_balance_by_cookie(base_url, session_cookie, user_id)
                 if balance_result.get("success"):
                     new_balance = balance_result.get("balance", 0)
-                    update_site(self.stats_data, site_id, {"balance": new_balance, "balance_unit": "USD"})
+                    balance_updates[site_id] = {"balance": new_balance, "balance_unit": "USD"}
+                    record_balance(site_id, new_balance, "USD", SOURCE_CHECKIN)
 
                 # 记录日志（记录 USD 值）
                 add_checkin_log(site_name, site_id, True, quota_usd, result.get("message", ""))
@@ -810,8 +848,8 @@ class ApiQueryApp:
                 results.append(f"❌ {site_name}: {result.get('message', '失败')}")
                 add_checkin_log(site_name, site_id, False, 0, result.get("message", ""))
 
-        # 保存数据
-        save_stats(self.stats_data)
+        # 一次提交全部余额更新并保存
+        self.site_repo.commit(balance_updates)
 
         # 在主线程更新 UI
         self.root.after(0, lambda: self._show_checkin_results(results, total_quota))
@@ -820,9 +858,11 @@ class ApiQueryApp:
         """显示签到结果"""
         self.status_var.set(f"签到完成，共获得 ${total_quota:.2f}")
 
+        # 刷新列表（余额已更新）
+        self.refresh_profile_list()
+
         # 刷新统计模块
         if hasattr(self, 'stats_frame'):
-            self.stats_frame.stats_data = self.stats_data
             self.stats_frame.refresh_site_list()
             self.stats_frame.update_summary()
 
@@ -899,12 +939,13 @@ class ApiQueryApp:
 
         def on_save(updated_profile):
             # 更新 stats.json 中的站点数据
-            site["balance_auth_type"] = updated_profile.get("balance_auth_type", "bearer")
-            site["log_auth_type"] = updated_profile.get("log_auth_type", "url_key")
-            site["proxy"] = updated_profile.get("proxy", "")
-            site["endpoints"] = updated_profile.get("endpoints", {})
-
-            save_stats(self.stats_data)
+            self.site_repo.update(site.get("id", ""), {
+                "balance_auth_type": updated_profile.get("balance_auth_type", "bearer"),
+                "log_auth_type": updated_profile.get("log_auth_type", "url_key"),
+                "proxy": updated_profile.get("proxy", ""),
+                "endpoints": updated_profile.get("endpoints", {}),
+            })
+            self.site_repo.save()
             self.status_var.set(f"✅ 站点 '{site.get('name', '')}' 高级设置已保存")
 
             # 更新内存中的配置
@@ -968,6 +1009,13 @@ class ApiQueryApp:
         sub_api = profile_endpoints.get("balance_subscription") or global_endpoints.get("balance_subscription", "/v1/dashboard/billing/subscription")
         usage_api = profile_endpoints.get("balance_usage") or global_endpoints.get("balance_usage", "/v1/dashboard/billing/usage")
         auth_type = getattr(self, "_current_profile_balance_auth_type", "bearer")
+        parallel = global_endpoints.get("parallel_probe", True)
+
+        # 站点上次识别到的接口格式（URL 未被修改时才复用）
+        site = getattr(self, "_current_site", None) or {}
+        if site.get("url", "").rstrip("/") != url.rstrip("/"):
+            site = {}
+        api_format = get_site_api_format(site, auth_type) if site else None
 
         current_name = self.name_var.get().strip() or url
         self.status_var.set(f"⏳ 正在查询余额：{current_name}")
@@ -975,10 +1023,20 @@ class ApiQueryApp:
         self._set_balance_summary(state="查询中", state_style="warning")
         self.root.update()
 
+        def on_result(result):
+            if site and self.site_repo.set_api_format(site.get("id", ""), auth_type, result.get("api_format")):
+                self.site_repo.save()
+            if site:
+                self._record_balance_result(site, result, SOURCE_QUERY)
+            self.on_balance_result(result, current_name)
+
         def query_thread():
             try:
-                result = query_balance(key, url, subscription_api=sub_api, usage_api=usage_api, auth_type=auth_type)
-                self.root.after(0, lambda: self.on_balance_result(result, current_name))
+                result = query_balance(
+                    key, url, subscription_api=sub_api, usage_api=usage_api, auth_type=auth_type,
+                    parallel=parallel, api_format=api_format,
+                )
+                self.root.after(0, lambda: on_result(result))
             except Exception as e:
                 error_message = str(e)
                 self.root.after(0, lambda msg=error_message: self.on_query_error(msg))
@@ -1010,9 +1068,14 @@ class ApiQueryApp:
         self._set_balance_summary(balance="--", cost="--", traffic="--", state="查询失败", state_style="danger")
         self.status_var.set("❌ 查询出错")
 
-    def query_all_balance(self):
-        """查询所有配置的余额"""
-        sites = self.stats_data.get("sites", [])
+    def query_all_balance(self, auto: bool = False):
+        """查询所有配置的余额（后台并发执行，结果逐个显示）；auto 为自动定时查询"""
+        if self._balance_batch is not None and self._balance_batch.is_running():
+            self.status_var.set("⏳ 批量查询进行中，请等待完成或在汇总窗口中取消")
+            return
+
+        # 工作线程只读取快照，结果回到主线程后再修改站点
+        sites = self.site_repo.snapshot().sites
         if not sites:
             messagebox.showwarning("提示", "没有保存的站点配置")
             return
@@ -1023,74 +1086,144 @@ class ApiQueryApp:
         self.result_text.insert("end", f"{'═'*50}\n\n")
 
         global_endpoints = self.config.get("api_endpoints", {})
+        batch_config = self.config.get("batch_query", {})
 
-        # 汇总数据
+        # 使用全局接口配置
+        sub_api = global_endpoints.get("balance_subscription", "/v1/dashboard/billing/subscription")
+        usage_api = global_endpoints.get("balance_usage", "/v1/dashboard/billing/usage")
+        auth_type = "bearer"
+        parallel = global_endpoints.get("parallel_probe", True)
+
+        # 汇总数据（由汇总对话框随结果到达逐步填充）
         summary_data = {
             "success": 0,
             "failed": 0,
             "skipped": 0,
             "sites": []
         }
+        threshold = self.config.get("low_balance_threshold", 10)
+        dialog = BalanceSummaryDialog(
+            self.root, summary_data, low_balance_threshold=threshold,
+            total=len(sites), on_cancel=self.cancel_balance_batch,
+            depletion_warning_days=self.config.get("depletion_warning_days", DEFAULT_DEPLETION_WARNING_DAYS),
+        )
+        # 充值记录有变化的站点重新计算消耗速度
+        get_forecaster().sync_recharges(sites)
 
+        jobs = []
         for i, site in enumerate(sites):
             name = site.get("name", f"站点{i+1}")
-            url = site.get("url", "")
-            key = site.get("api_key", "")
-
-            if not url or not key:
+            if not site.get("url", "") or not site.get("api_key", ""):
                 self.result_text.insert("end", f"⚠️ 【{name}】配置不完整，跳过\n\n")
-                summary_data["skipped"] += 1
-                summary_data["sites"].append({
+                dialog.add_site({
                     "name": name,
                     "balance": 0,
                     "unit": "",
                     "today_cost": 0,
                     "error": "配置不完整"
-                })
+                }, "skipped")
                 continue
+            jobs.append((name, site))
 
-            self.status_var.set(f"⏳ 正在查询: {name} ({i+1}/{len(sites)})")
-            self.root.update()
-
-            # 使用全局接口配置
-            sub_api = global_endpoints.get("balance_subscription", "/v1/dashboard/billing/subscription")
-            usage_api = global_endpoints.get("balance_usage", "/v1/dashboard/billing/usage")
-            auth_type = "bearer"
-
-            try:
-                result = query_balance(key, url, subscription_api=sub_api, usage_api=usage_api, auth_type=auth_type)
-                self.display_balance_result(name, result, show_header=False)
-
-                # 收集站点数据
-                site_data = self.extract_site_summary(name, result)
-                summary_data["sites"].append(site_data)
+        skipped = len(sites) - len(jobs)
+        batch_state = {
+            "total": len(sites), "skipped": skipped, "done": skipped, "formats_changed": False, "dialog": dialog,
+            "source": SOURCE_AUTO if auto else SOURCE_BATCH, "site_ids": [],
+        }
 
-                if site_data.get("error"):
-                    summary_data["failed"] += 1
-                else:
-                    summary_data["success"] += 1
+        def worker(job):
+            # 工作线程：只做网络请求，结果回到主线程处理
+            name, site = job
+            return query_balance(
+                site.get("api_key", ""), site.get("url", ""),
+                subscription_api=sub_api, usage_api=usage_api, auth_type=auth_type,
+                parallel=parallel, api_format=get_site_api_format(site, auth_type),
+            )
 
-            except Exception as e:
-                self.result_text.insert("end", f"❌ 【{name}】查询出错: {e}\n\n")
-                summary_data["failed"] += 1
-                summary_data["sites"].append({
-                    "name": name,
-                    "balance": 0,
-                    "unit": "",
-                    "today_cost": 0,
-                    "error": str(e)
-                })
+        def on_result(job, result, error):
+            self.root.after(0, lambda: self._on_batch_balance_result(batch_state, job, auth_type, result, error))
+
+        def on_progress(completed, total):
+            self.root.after(0, lambda: self._on_batch_balance_progress(batch_state, completed))
+
+        def on_finish(cancelled):
+            self.root.after(0, lambda: self._on_batch_balance_finish(batch_state, cancelled))
+
+        self.status_var.set(f"⏳ 批量查询中: {skipped}/{len(sites)}")
+        dialog.set_progress(skipped, len(sites))
+        self._balance_batch = run_batch(
+            jobs, worker,
+            key_func=lambda job: host_of(job[1].get("url", "")),
+            max_workers=batch_config.get("max_workers", DEFAULT_MAX_WORKERS),
+            per_host_limit=batch_config.get("per_host_limit", DEFAULT_PER_HOST_LIMIT),
+            on_result=on_result,
+            on_progress=on_progress,
+            on_finish=on_finish,
+        )
 
-        self.status_var.set(f"✅ 批量查询完成，共 {len(sites)} 个站点")
+    def cancel_balance_batch(self):
+        """取消正在进行的批量余额查询"""
+        if self._balance_batch is not None and self._balance_batch.is_running():
+            self._balance_batch.cancel()
+            self.status_var.set("⏳ 正在取消批量查询，等待进行中的请求结束...")
+
+    def _on_batch_balance_result(self, batch_state, job, auth_type, result, error):
+        """批量查询单个站点完成（主线程）"""
+        name, site = job
+        dialog = batch_state["dialog"]
+
+        if error is not None:
+            self.result_text.insert("end", f"❌ 【{name}】查询出错: {error}\n\n")
+            dialog.add_site({
+                "name": name,
+                "balance": 0,
+                "unit": "",
+                "today_cost": 0,
+                "error": str(error)
+            }, "failed")
+            return
 
-        # 弹出汇总对话框
-        threshold = self.config.get("low_balance_threshold", 10)
-        BalanceSummaryDialog(self.root, summary_data, low_balance_threshold=threshold)
+        if self.site_repo.set_api_format(site.get("id", ""), auth_type, result.get("api_format")):
+            batch_state["formats_changed"] = True
+        self._record_balance_result(site, result, batch_state["source"])
+        self.display_balance_result(name, result, show_header=False)
+
+        # 收集站点数据
+        site_data = self.extract_site_summary(name, result)
+        site_id = site.get("id", "")
+        site_data["site_id"] = site_id
+        if not site_data.get("error") and site_id:
+            # 余额已记入历史，预测器已增量更新
+            site_data["forecast"] = get_forecaster().forecast([site_id]).get(site_id)
+            batch_state["site_ids"].append(site_id)
+        dialog.add_site(site_data, "failed" if site_data.get("error") else "success")
+
+    def _on_batch_balance_progress(self, batch_state, completed):
+        """更新批量查询进度（主线程）"""
+        done = batch_state["done"] = batch_state["skipped"] + completed
+        total = batch_state["total"]
+        self.status_var.set(f"⏳ 批量查询中: {done}/{total}")
+        batch_state["dialog"].set_progress(done, total)
+
+    def _on_batch_balance_finish(self, batch_state, cancelled):
+        """批量查询结束（主线程）"""
+        # 保存新识别到的接口格式，下次批量查询直接命中
+        if batch_state["formats_changed"]:
+            self.site_repo.save()
+
+        total = batch_state["total"]
+        if cancelled:
+            self.status_var.set(f"⛔ 批量查询已取消，完成 {batch_state['done']}/{total} 个站点")
+        else:
+            self.status_var.set(f"✅ 批量查询完成，共 {total} 个站点")
+        # 本轮查询结束后统一重算全部站点的预测
+        batch_state["dialog"].update_forecasts(get_forecaster().forecast(batch_state["site_ids"]))
+        batch_state["dialog"].finish(cancelled)
 
     def query_all_balance_by_cookie_and_save(self):
         """使用 Cookie 查询所有站点余额并保存到 stats.json"""
-        sites = self.stats_data.get("sites", [])
-        # 筛选有 session_cookie 的站点
+        sites = self.site_repo.snapshot().sites
+        # 筛选有 session_cookie 的站点（工作线程只读取快照）
         cookie_sites = [s for s in sites if s.get("session_cookie", "").strip()]
 
         if not cookie_sites:
@@ -1104,10 +1237,11 @@ class ApiQueryApp:
         threading.Thread(target=self._do_batch_balance_query, args=(cookie_sites,), daemon=True).start()
 
     def _do_batch_balance_query(self, sites):
-        """批量查询余额（后台线程）"""
+        """批量查询余额（后台线程，sites 为只读快照）"""
         results = []
         success_count = 0
         fail_count = 0
+        balance_updates = {}
 
         for site in sites:
             site_name = site.get("name", "未命名")
@@ -1122,15 +1256,16 @@ class ApiQueryApp:
 
             if result.get("success"):
                 new_balance = result.get("balance", 0)
-                update_site(self.stats_data, site_id, {"balance": new_balance, "balance_unit": "USD"})
+                balance_updates[site_id] = {"balance": new_balance, "balance_unit": "USD"}
+                record_balance(site_id, new_balance, "USD", SOURCE_COOKIE)
                 results.append(f"✅ {site_name}: ${new_balance:.2f}")
                 success_count += 1
             else:
                 results.append(f"❌ {site_name}: {result.get('message', '查询失败')}")
                 fail_count += 1
 
-        # 保存数据
-        save_stats(self.stats_data)
+        # 一次提交全部余额更新并保存
+        self.site_repo.commit(balance_updates)
 
         # 在主线程更新 UI
         self.root.after(0, lambda: self._show_balance_query_results(results, success_count, fail_count))
@@ -1144,7 +1279,6 @@ class ApiQueryApp:
 
         # 刷新统计模块
         if hasattr(self, 'stats_frame'):
-            self.stats_frame.stats_data = self.stats_data
             self.stats_frame.refresh_site_list()
             self.stats_frame.update_summary()
 
@@ -1152,6 +1286,12 @@ class ApiQueryApp:
         result_text = "\n".join(results)
         messagebox.showinfo("余额查询结果", result_text)
 
+    def _record_balance_result(self, site, result, source):
+        """把余额查询结果记入站点的余额历史（查询失败或结果中没有余额时不记录）"""
+        balance = balance_from_result(result)
+        if balance is not None:
+            record_balance(site.get("id", ""), *balance, source)
+
     def extract_site_summary(self, name, result):
         """从查询结果中提取站点汇总数据"""
         site_data = {
@@ -1289,17 +1429,19 @@ class ApiQueryApp:
         self._set_logs_meta(f"正在查询站点「{current_name}」日志...")
         self.root.update()
 
+        initial_max_pages = self.config.get("log_sync", {}).get("initial_max_pages", DEFAULT_INITIAL_MAX_PAGES)
+
         def query_thread():
             try:
-                result = query_logs(
+                # 增量同步到本地日志库，只拉取上次同步之后的新日志
+                result = sync_logs(
                     key,
                     url,
                     page_size=page_size,
-                    page=1,
-                    order="desc",
                     custom_api_path=logs_api,
                     proxy_url=proxy_url,
                     auth_type=auth_type,
+                    initial_max_pages=initial_max_pages,
                 )
                 self.root.after(0, lambda: self.on_logs_result(result, current_name))
             except Exception as e:
@@ -1310,6 +1452,9 @@ class ApiQueryApp:
 
     def on_logs_result(self, result, name):
         """处理日志查询结果"""
+        store = result.pop("store", None)
+        self._logs_view = {"store": store, "loaded": len(result.get("items", []))} if store else None
+
         raw_data = result.get("raw_response", result)
         self.last_raw_response["logs"] = raw_data
         self.save_raw_response_to_file()
@@ -1317,7 +1462,7 @@ class ApiQueryApp:
         self.save_result(name, "logs", result)
 
         if "error" in result:
-            self.status_var.set("⚠️ 日志查询完成，但接口返回错误")
+            self.status_var.set("⚠️ 日志同步失败，当前显示本地已保存的记录" if result.get("items") else "⚠️ 日志查询完成，但接口返回错误")
         else:
             self.status_var.set("✅ 日志查询完成")
 
@@ -1365,9 +1510,10 @@ class ApiQueryApp:
         for item in self.logs_tree.get_children():
             self.logs_tree.delete(item)
 
-        if "error" in result:
+        if "error" in result and not result.get("items"):
             self.logs_tree.insert("", "end", values=("错误", result["error"], "", "", "", ""), tags=("error_row",))
             self._set_logs_meta(f"日志查询失败: {result['error']}")
+            self._update_logs_more_button()
             return
 
         total = result.get("total", 0)
@@ -1376,10 +1522,25 @@ class ApiQueryApp:
         if not items:
             self.logs_tree.insert("", "end", values=("无数据", "没有查询到日志记录", "", "", "", ""), tags=("oddrow",))
             self._set_logs_meta("未查询到日志记录")
+            self._update_logs_more_button()
             return
 
-        latest_time = "未知"
-        for idx, item in enumerate(items):
+        latest_time = self._insert_log_rows(items)
+
+        meta = f"共 {total} 条，当前展示 {len(items)} 条，最新: {latest_time}"
+        if "added" in result:
+            meta += f"，本次新增 {result['added']} 条"
+        if "error" in result:
+            meta += f"（同步失败，显示本地记录: {result['error']}）"
+        self._set_logs_meta(meta)
+        self.status_var.set(f"✅ 共查询到 {total} 条日志记录")
+        self._update_logs_more_button()
+
+    def _insert_log_rows(self, items, start_index=0):
+        """向日志表格追加记录，返回第一条记录的时间文本"""
+        first_time = "未知"
+        for offset, item in enumerate(items):
+            idx = start_index + offset
             created_at = item.get("created_at", 0)
             if created_at:
                 try:
@@ -1389,8 +1550,8 @@ class ApiQueryApp:
             else:
                 time_str = "未知"
 
-            if idx == 0:
-                latest_time = time_str
+            if offset == 0:
+                first_time = time_str
 
             model_name = item.get("model_name", "未知")
             token_name = item.get("token_name", "-")
@@ -1417,15 +1578,40 @@ class ApiQueryApp:
                 ),
                 tags=tuple(tags),
             )
+        return first_time
+
+    def _update_logs_more_button(self):
+        """根据本地日志库剩余条数更新「加载更早日志」按钮"""
+        view = self._logs_view
+        has_more = bool(view) and view["loaded"] < view["store"].count
+        self.logs_more_btn.configure(state="normal" if has_more else "disabled")
+
+    def load_more_logs(self):
+        """从本地日志库加载更早的一页日志"""
+        view = self._logs_view
+        if not view:
+            return
 
-        self._set_logs_meta(f"共 {total} 条，当前展示 {len(items)} 条，最新: {latest_time}")
-        self.status_var.set(f"✅ 共查询到 {total} 条日志记录")
+        page_size = self.config.get("api_endpoints", {}).get("logs_page_size", 50)
+        items = view["store"].read_latest(page_size, offset=view["loaded"])
+        if items:
+            self._insert_log_rows(items, start_index=view["loaded"])
+            view["loaded"] += len(items)
+            oldest = items[-1].get("created_at", 0)
+            try:
+                oldest_str = datetime.fromtimestamp(oldest).strftime("%m-%d %H:%M:%S") if oldest else "未知"
+            except (ValueError, OSError, OverflowError):
+                oldest_str = str(oldest)
+            self._set_logs_meta(f"共 {view['store'].count} 条，当前展示 {view['loaded']} 条，最早: {oldest_str}（本地记录）")
+        self._update_logs_more_button()
 
     def clear_result(self):
         """清空结果"""
         self.result_text.delete("1.0", "end")
         for item in self.logs_tree.get_children():
             self.logs_tree.delete(item)
+        self._logs_view = None
+        self._update_logs_more_button()
         self.balance_hint_var.set("等待查询。请选择站点后点击“查询余额”。")
         self._set_logs_meta("等待查询日志。")
         self._reset_balance_summary()
@@ -1497,6 +1683,26 @@ class ApiQueryApp:
         self.root.deiconify()
         self.root.lift()
         self.root.focus_force()
+        if self._chart_warmup_state == "deferred":
+            self.root.after(CHART_WARMUP_DELAY_MS, self._start_chart_warmup)
+
+    def _start_chart_warmup(self):
+        """在后台线程中启动图表渲染进程并预渲染一次（窗口隐藏在托盘时推迟到显示窗口后）"""
+        if self._chart_warmup_state == "started":
+            return
+        if self.root.state() == "withdrawn":
+            self._chart_warmup_state = "deferred"
+            return
+        self._chart_warmup_state = "started"
+
+        def warm_up():
+            try:
+                warm_up_charts()
+            except Exception:
+                # 预加载失败不影响使用，绘制图表时会重新启动渲染进程并显示错误
+                pass
+
+        threading.Thread(target=warm_up, name="chart-warmup", daemon=True).start()
 
     def hide_window(self):
         """隐藏主窗口到托盘"""
@@ -1512,8 +1718,13 @@ class ApiQueryApp:
     def quit_app(self):
         """真正退出程序"""
         self.stop_auto_query()
+        self.cancel_balance_batch()
         if hasattr(self, 'tray'):
             self.tray.stop()
+        close_http_pool()
+        shutdown_chart_render()
+        close_stats_storage()
+        flush_debug_log()
         self.root.destroy()
 
     # === 自动查询功能 ===
@@ -1539,7 +1750,7 @@ class ApiQueryApp:
     def _auto_query_tick(self):
         """自动查询定时器回调"""
         # 执行批量查询
-        self.query_all_balance()
+        self.query_all_balance(auto=True)
 
         # 重新设置下一次定时
         auto_query = self.config.get("auto_query", {})
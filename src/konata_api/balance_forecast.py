@@ -0,0 +1,265 @@
+"""余额预测模块 - 根据余额历史估算消耗速度和预计耗尽时间
+
+消耗按相邻两次余额记录的下降量计算，余额上升（充值、签到奖励）不算消耗；
+两次记录之间既有充值又有消耗时，用充值记录补回被充值掩盖的那部分消耗。
+在最近 24 小时 / 7 天等滚动窗口内求日均消耗，再用最新余额推算耗尽时间。
+
+每个站点在内存中只保留最长窗口内的逐段消耗，新的余额记录到达时增量追加；
+所有站点的窗口统计拼成一个数组后用 bincount 一次算完，批量查询后全部重算只需几毫秒。
+"""
+
+import threading
+from datetime import datetime
+from typing import Iterable, Optional
+
+import numpy as np
+
+from konata_api.balance_history import UNITS, add_balance_listener, get_balance_history
+
+
+DAY_SECONDS = 86400
+DEFAULT_WINDOWS = (("24h", DAY_SECONDS), ("7d", 7 * DAY_SECONDS))  # (名称, 秒数)，从短到长
+MIN_COVERAGE_SECONDS = 3600                # 窗口内记录覆盖不足 1 小时时不计算速度
+RECHARGE_MATCH_SECONDS = 2 * DAY_SECONDS   # 充值记录只有日期：匹配该日零点之后 2 天内第一次余额上升
+DEFAULT_DEPLETION_WARNING_DAYS = 3         # 预计几天内耗尽时在汇总中警告
+
+_TOKEN_UNIT = UNITS.index("Token")
+
+_forecaster = None
+_forecaster_lock = threading.Lock()
+
+
+def _recharge_arrays(records: list):
+    """充值记录 -> (按时间排序的时间戳数组, 金额数组)，日期取当天零点"""
+    times = []
+    amounts = []
+    for record in records or []:
+        try:
+            amount = float(record.get("amount", 0) or 0)
+            day = datetime.strptime(str(record.get("date", ""))[:10], "%Y-%m-%d")
+        except (TypeError, ValueError):
+            continue
+        if amount > 0:
+            times.append(int(day.timestamp()))
+            amounts.append(amount)
+    order = np.argsort(np.asarray(times, dtype=np.int64), kind="stable")
+    return np.asarray(times, dtype=np.int64)[order], np.asarray(amounts, dtype=np.float64)[order]
+
+
+def interval_spend(ts: np.ndarray, balance: np.ndarray, recharge_ts: Optional[np.ndarray] = None,
+                   recharge_amount: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    相邻余额记录之间的消耗（向量化）
+
+    每条充值记录匹配其日期之后第一次余额上升的区间，从该区间的余额变化中扣除，
+    扣除后仍为上升（未记录的签到奖励等）的区间消耗记为 0。
+
+    Args:
+        ts / balance: 按时间排序的余额记录
+        recharge_ts / recharge_amount: 按时间排序的充值记录（见 _recharge_arrays）
+
+    Returns:
+        与 ts 等长的数组，第 i 项为 ts[i-1] ~ ts[i] 之间的消耗（第 0 项为 0）
+    """
+    spend = np.zeros(len(ts))
+    if len(ts) < 2:
+        return spend
+    change = np.diff(np.asarray(balance, dtype=np.float64))
+    if recharge_ts is not None and len(recharge_ts):
+        rising = np.flatnonzero(change > 0)
+        rising_end = np.asarray(ts)[1:][rising]
+        slot = np.searchsorted(rising_end, recharge_ts, side="left")
+        matched = slot < len(rising)
+        matched[matched] = rising_end[slot[matched]] - recharge_ts[matched] <= RECHARGE_MATCH_SECONDS
+        np.add.at(change, rising[slot[matched]], -recharge_amount[matched])
+    spend[1:] = np.maximum(0.0, -change)
+    return spend
+
+
+class _SiteSeries:
+    """单个站点最长窗口内的余额记录与逐段消耗"""
+
+    __slots__ = ("unit", "ts", "spend", "balance", "last_rise_ts")
+
+    def __init__(self, unit: int, ts: np.ndarray, spend: np.ndarray, balance: float, last_rise_ts: int):
+        self.unit = unit
+        self.ts = ts
+        self.spend = spend
+        self.balance = balance
+        self.last_rise_ts = last_rise_ts
+
+    def trim(self, keep_seconds: int):
+        """只保留窗口起点之前的最后一条及之后的记录（用于计算窗口覆盖时间）"""
+        start = int(np.searchsorted(self.ts, self.ts[-1] - keep_seconds, side="left")) - 1
+        if start > 0:
+            self.ts = self.ts[start:]
+            self.spend = self.spend[start:]
+
+
+class BalanceForecaster:
+    """
+    各站点的消耗速度与耗尽预测（线程安全）
+
+    Args:
+        windows: 滚动窗口 ((名称, 秒数), ...)，从短到长；预测优先使用最长的有效窗口
+    """
+
+    def __init__(self, windows=DEFAULT_WINDOWS):
+        self.windows = tuple(windows)
+        self.keep_seconds = max(seconds for _, seconds in self.windows)
+        self._lock = threading.RLock()
+        self._series = {}     # site_id -> _SiteSeries（None 表示暂无记录）
+        self._recharges = {}  # site_id -> (签名, 时间戳数组, 金额数组)
+
+    def sync_recharges(self, sites: Iterable[dict]):
+        """同步各站点的充值记录，有变化的站点下次预测时重新计算"""
+        with self._lock:
+            for site in sites:
+                site_id = site.get("id")
+                if not site_id:
+                    continue
+                records = site.get("recharge_records", []) or []
+                signature = tuple((r.get("date"), r.get("amount")) for r in records)
+                cached = self._recharges.get(site_id)
+                if cached is not None and cached[0] == signature:
+                    continue
+                self._recharges[site_id] = (signature, *_recharge_arrays(records))
+                self._series.pop(site_id, None)
+
+    def invalidate(self, site_id: Optional[str] = None):
+        """丢弃站点（留空为全部）的缓存，下次预测时从余额历史重新计算"""
+        with self._lock:
+            if site_id is None:
+                self._series.clear()
+            else:
+                self._series.pop(site_id, None)
+
+    def _load(self, site_id: str) -> Optional[_SiteSeries]:
+        """从余额历史计算站点的消耗序列（只用最新单位的记录）"""
+        data = get_balance_history(site_id).read()
+        if not len(data):
+            return None
+        unit = int(data["unit"][-1])
+        data = data[data["unit"] == unit]
+        ts = data["ts"]
+        balance = data["balance"]
+
+        recharge_ts = recharge_amount = None
+        if unit != _TOKEN_UNIT:   # Token 余额与充值金额不可比，不做充值扣除
+            _, recharge_ts, recharge_amount = self._recharges.get(site_id, (None, None, None))
+        spend = interval_spend(ts, balance, recharge_ts, recharge_amount)
+
+        rising = np.flatnonzero(np.diff(balance) > 0)
+        last_rise_ts = int(ts[rising[-1] + 1]) if len(rising) else -1
+        series = _SiteSeries(unit, ts, spend, float(balance[-1]), last_rise_ts)
+        series.trim(self.keep_seconds)
+        return series
+
+    def add_sample(self, site_id: str, timestamp: int, balance: float, unit: str):
+        """
+        增量追加一条余额记录（由余额历史在记录后回调）
+
+        尚未加载的站点不处理（下次预测时从余额历史读取，已包含这条记录）；
+        单位变化或时间倒序时丢弃缓存重新计算。
+        """
+        with self._lock:
+            series = self._series.get(site_id)
+            if series is None:
+                self._series.pop(site_id, None)
+                return
+            unit_code = UNITS.index(unit) if unit in UNITS else len(UNITS) - 1
+            if unit_code != series.unit or timestamp < series.ts[-1]:
+                self._series.pop(site_id, None)
+                return
+
+            change = float(balance) - series.balance
+            if change > 0:
+                _, recharge_ts, recharge_amount = self._recharges.get(site_id, (None, None, None))
+                if recharge_ts is not None and len(recharge_ts) and unit != "Token":
+                    # 与 interval_spend 一致：匹配上次余额上升之后、本次之前 2 天内的充值
+                    low = max(
+                        int(np.searchsorted(recharge_ts, series.last_rise_ts, side="right")),
+                        int(np.searchsorted(recharge_ts, timestamp - RECHARGE_MATCH_SECONDS, side="left")),
+                    )
+                    high = int(np.searchsorted(recharge_ts, timestamp, side="right"))
+                    if high > low:
+                        change -= float(recharge_amount[low:high].sum())
+                series.last_rise_ts = int(timestamp)
+
+            series.ts = np.append(series.ts, np.int64(timestamp))
+            series.spend = np.append(series.spend, max(0.0, -change))
+            series.balance = float(balance)
+            series.trim(self.keep_seconds)
+
+    def forecast(self, site_ids: Iterable[str]) -> dict:
+        """
+        计算站点的消耗速度和预计耗尽时间
+
+        Returns:
+            dict: 站点ID -> 预测结果（没有余额记录的站点不包含在内）
+                - balance / unit: 最新余额及单位
+                - updated_ts: 最新记录时间（Unix 秒）
+                - rates: {窗口名称: 日均消耗}，记录覆盖不足的窗口为 None
+                - rate_per_day: 用于预测的日均消耗（最长的有效窗口），无法计算时为 None
+                - days_to_zero: 预计剩余天数，没有消耗时为 None
+                - depletion_ts: 预计耗尽时间（Unix 秒），没有消耗时为 None
+        """
+        with self._lock:
+            ids = []
+            series_list = []
+            for site_id in dict.fromkeys(site_ids):
+                if site_id not in self._series:
+                    self._series[site_id] = self._load(site_id)
+                series = self._series[site_id]
+                if series is not None:
+                    ids.append(site_id)
+                    series_list.append(series)
+            if not series_list:
+                return {}
+
+            counts = np.array([len(s.ts) for s in series_list])
+            site_index = np.repeat(np.arange(len(series_list)), counts)
+            ts = np.concatenate([s.ts for s in series_list])
+            spend = np.concatenate([s.spend for s in series_list])
+            end = np.array([s.ts[-1] for s in series_list], dtype=np.int64)
+            first = np.array([s.ts[0] for s in series_list], dtype=np.int64)
+            balance = np.array([s.balance for s in series_list])
+            units = [UNITS[s.unit] if s.unit < len(UNITS) else "" for s in series_list]
+
+        rates = {}
+        primary = np.full(len(ids), np.nan)
+        for name, seconds in self.windows:
+            start = end - seconds
+            in_window = ts > start[site_index]
+            spent = np.bincount(site_index, weights=np.where(in_window, spend, 0.0), minlength=len(ids))
+            covered = end - np.maximum(start, first)
+            rate = np.where(covered >= MIN_COVERAGE_SECONDS, spent / np.maximum(covered, 1) * DAY_SECONDS, np.nan)
+            rates[name] = rate
+            primary = np.where(np.isnan(rate), primary, rate)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            days = np.where(primary > 0, np.maximum(balance, 0) / primary, np.nan)
+
+        results = {}
+        for i, site_id in enumerate(ids):
+            has_days = not np.isnan(days[i])
+            results[site_id] = {
+                "balance": float(balance[i]),
+                "unit": units[i],
+                "updated_ts": int(end[i]),
+                "rates": {name: (None if np.isnan(rate[i]) else float(rate[i])) for name, rate in rates.items()},
+                "rate_per_day": None if np.isnan(primary[i]) else float(primary[i]),
+                "days_to_zero": float(days[i]) if has_days else None,
+                "depletion_ts": int(end[i] + days[i] * DAY_SECONDS) if has_days else None,
+            }
+        return results
+
+
+def get_forecaster() -> BalanceForecaster:
+    """获取全局预测器（首次调用时订阅余额历史的新记录）"""
+    global _forecaster
+    with _forecaster_lock:
+        if _forecaster is None:
+            _forecaster = BalanceForecaster()
+            add_balance_listener(_forecaster.add_sample)
+        return _forecaster
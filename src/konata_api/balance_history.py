@@ -0,0 +1,277 @@
+"""余额历史模块 - 每个站点的余额时间序列
+
+每次查询到站点余额时记录一个点 (时间, 余额, 单位, 来源)。每个站点一个二进制文件
+（config/balance_history/<站点ID>.bin），记录为定长结构（18 字节）按时间顺序追加；
+读取时整体载入为 NumPy 结构化数组，时间范围查询用二分查找，
+降采样（每个时间段的最后值 / 最小 / 最大 / 平均）为向量化运算，几个月的 5 分钟自动查询记录也能直接画图。
+"""
+
+import os
+import threading
+import time
+from typing import Optional
+
+import numpy as np
+
+from konata_api.utils import get_exe_dir
+
+
+_RECORD_DTYPE = np.dtype([
+    ("ts", "<i8"),        # Unix 秒
+    ("balance", "<f8"),
+    ("unit", "u1"),       # UNITS 下标
+    ("source", "u1"),     # SOURCES 下标
+])
+
+UNITS = ("USD", "CNY", "Token", "")   # 其他单位记为 ""
+
+# 余额来源
+SOURCE_QUERY = "query"        # 单站点查询
+SOURCE_BATCH = "batch"        # 批量查询
+SOURCE_AUTO = "auto"          # 自动定时查询
+SOURCE_COOKIE = "cookie"      # Cookie 查询
+SOURCE_CHECKIN = "checkin"    # 签到后查询
+SOURCE_MANUAL = "manual"      # 手动修改
+SOURCES = (SOURCE_QUERY, SOURCE_BATCH, SOURCE_AUTO, SOURCE_COOKIE, SOURCE_CHECKIN, SOURCE_MANUAL)
+
+DEFAULT_MAX_POINTS = 500  # 降采样默认点数上限
+
+_histories = {}
+_histories_lock = threading.Lock()
+_listeners = []   # record_balance 成功后回调 (site_id, ts, balance, unit)
+
+
+def get_balance_history_dir() -> str:
+    """获取余额历史目录"""
+    return os.path.join(get_exe_dir(), "config", "balance_history")
+
+
+def _unit_code(unit: str) -> int:
+    return UNITS.index(unit) if unit in UNITS else len(UNITS) - 1
+
+
+def _source_code(source: str) -> int:
+    return SOURCES.index(source) if source in SOURCES else 0
+
+
+class BalanceHistory:
+    """单个站点的余额历史（线程安全）"""
+
+    def __init__(self, site_id: str, history_dir: Optional[str] = None):
+        self.site_id = site_id
+        safe_id = "".join(c if c.isalnum() or c in "-_" else "_" for c in str(site_id))
+        self.path = os.path.join(history_dir or get_balance_history_dir(), f"{safe_id}.bin")
+        self._lock = threading.RLock()
+        self._buffer = None   # 容量按需翻倍的结构化数组，前 _size 条有效
+        self._size = 0
+        self._sorted = True
+
+    def _ensure_loaded(self):
+        if self._buffer is not None:
+            return
+        data = np.zeros(0, dtype=_RECORD_DTYPE)
+        if os.path.exists(self.path):
+            file_size = os.path.getsize(self.path)
+            valid_size = file_size - file_size % _RECORD_DTYPE.itemsize
+            if valid_size != file_size:
+                # 上次写入中断留下的不完整记录，截掉以免之后的记录错位
+                with open(self.path, "rb+") as f:
+                    f.truncate(valid_size)
+            if valid_size:
+                data = np.fromfile(self.path, dtype=_RECORD_DTYPE)
+        self._buffer = data
+        self._size = len(data)
+        self._sorted = bool(np.all(np.diff(data["ts"]) >= 0)) if self._size > 1 else True
+
+    def _data(self) -> np.ndarray:
+        """按时间排序的有效记录"""
+        self._ensure_loaded()
+        if not self._sorted:
+            valid = self._buffer[:self._size]
+            valid[:] = valid[np.argsort(valid["ts"], kind="stable")]
+            self._sorted = True
+        return self._buffer[:self._size]
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._ensure_loaded()
+            return self._size
+
+    def append(self, balance: float, unit: str = "USD", source: str = SOURCE_QUERY, timestamp: Optional[float] = None) -> bool:
+        """记录一个余额点"""
+        record = np.zeros(1, dtype=_RECORD_DTYPE)
+        record["ts"] = int(timestamp if timestamp is not None else time.time())
+        record["balance"] = float(balance or 0)
+        record["unit"] = _unit_code(unit)
+        record["source"] = _source_code(source)
+
+        with self._lock:
+            self._ensure_loaded()
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                with open(self.path, "ab") as f:
+                    f.write(record.tobytes())
+            except OSError:
+                return False
+
+            if self._size == len(self._buffer):
+                grown = np.zeros(max(64, len(self._buffer) * 2), dtype=_RECORD_DTYPE)
+                grown[:self._size] = self._buffer[:self._size]
+                self._buffer = grown
+            if self._size and record["ts"][0] < self._buffer["ts"][self._size - 1]:
+                self._sorted = False
+            self._buffer[self._size] = record[0]
+            self._size += 1
+            return True
+
+    def read(self, since: Optional[float] = None, until: Optional[float] = None) -> np.ndarray:
+        """
+        读取 [since, until) 范围内的记录（副本，按时间排序）
+
+        Returns:
+            结构化数组，字段 ts / balance / unit / source（unit、source 为 UNITS、SOURCES 的下标）
+        """
+        with self._lock:
+            data = self._data()
+            start = 0 if since is None else int(np.searchsorted(data["ts"], since, side="left"))
+            end = len(data) if until is None else int(np.searchsorted(data["ts"], until, side="left"))
+            return data[start:end].copy()
+
+    def latest(self) -> Optional[dict]:
+        """最近一次记录"""
+        with self._lock:
+            data = self._data()
+            if not len(data):
+                return None
+            last = data[-1]
+            return {
+                "ts": int(last["ts"]),
+                "balance": float(last["balance"]),
+                "unit": UNITS[last["unit"]] if last["unit"] < len(UNITS) else "",
+                "source": SOURCES[last["source"]] if last["source"] < len(SOURCES) else "",
+            }
+
+    def resample(
+        self,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        bucket_seconds: Optional[int] = None,
+        max_points: int = DEFAULT_MAX_POINTS,
+        unit: Optional[str] = None,
+    ) -> dict:
+        """
+        按时间段降采样（用于图表）
+
+        Args:
+            since / until: 时间范围
+            bucket_seconds: 时间段长度；留空时按 max_points 自动计算
+            max_points: 自动计算时间段长度时的点数上限
+            unit: 只统计该单位的记录（单位变化过的站点避免混在一起）
+
+        Returns:
+            dict: 各值为等长数组
+                - ts: 时间段起点（Unix 秒）
+                - last / min / max / mean: 时间段内的最后值、最小值、最大值、平均值
+                - count: 时间段内的记录数
+        """
+        data = self.read(since, until)
+        if unit is not None:
+            data = data[data["unit"] == _unit_code(unit)]
+        return downsample(data["ts"], data["balance"], bucket_seconds=bucket_seconds, max_points=max_points)
+
+    def delete(self):
+        """删除该站点的余额历史"""
+        with self._lock:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+            self._buffer = np.zeros(0, dtype=_RECORD_DTYPE)
+            self._size = 0
+            self._sorted = True
+
+
+def downsample(ts: np.ndarray, values: np.ndarray, bucket_seconds: Optional[int] = None, max_points: int = DEFAULT_MAX_POINTS) -> dict:
+    """
+    按固定时间段降采样已排序的时间序列（见 BalanceHistory.resample）
+    """
+    empty = np.zeros(0)
+    if len(ts) == 0:
+        return {"ts": np.zeros(0, dtype=np.int64), "last": empty, "min": empty, "max": empty, "mean": empty,
+                "count": np.zeros(0, dtype=np.int64)}
+
+    ts = np.asarray(ts, dtype=np.int64)
+    values = np.asarray(values, dtype=np.float64)
+    if not bucket_seconds:
+        span = int(ts[-1] - ts[0]) + 1
+        bucket_seconds = max(60, -(-span // max(1, max_points)))  # 向上取整
+        bucket_seconds = -(-bucket_seconds // 60) * 60             # 对齐到整分钟
+
+    buckets = ts // bucket_seconds
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(buckets)) + 1))
+    ends = np.concatenate((starts[1:], [len(ts)]))
+    counts = ends - starts
+    return {
+        "ts": buckets[starts] * bucket_seconds,
+        "last": values[ends - 1],
+        "min": np.minimum.reduceat(values, starts),
+        "max": np.maximum.reduceat(values, starts),
+        "mean": np.add.reduceat(values, starts) / counts,
+        "count": counts,
+    }
+
+
+def get_balance_history(site_id: str) -> BalanceHistory:
+    """获取站点的余额历史（同一站点共用一个对象）"""
+    with _histories_lock:
+        history = _histories.get(site_id)
+        if history is None:
+            history = _histories[site_id] = BalanceHistory(site_id)
+        return history
+
+
+def add_balance_listener(callback):
+    """订阅新的余额记录，callback(site_id, ts, balance, unit) 在记录成功后于记录线程中调用"""
+    if callback not in _listeners:
+        _listeners.append(callback)
+
+
+def record_balance(site_id: str, balance: float, unit: str = "USD", source: str = SOURCE_QUERY, timestamp: Optional[float] = None) -> bool:
+    """为站点记录一个余额点（没有站点ID时忽略）"""
+    if not site_id:
+        return False
+    ts = int(timestamp if timestamp is not None else time.time())
+    if not get_balance_history(site_id).append(balance, unit, source, ts):
+        return False
+    for callback in list(_listeners):
+        callback(site_id, ts, float(balance or 0), unit)
+    return True
+
+
+def balance_from_result(result: dict) -> Optional[tuple]:
+    """
+    从余额查询结果中取出实际返回的余额
+
+    Returns:
+        (余额, 单位)；查询失败或结果中没有余额字段（remaining_usd / total_available / balance）时为 None
+    """
+    if not isinstance(result, dict) or "error" in result:
+        return None
+    if "hard_limit_usd" in result:
+        balance, unit = result.get("remaining_usd"), "USD"
+    elif "total_granted" in result:
+        balance, unit = result.get("total_available"), "Token"
+    else:
+        balance, unit = result.get("balance"), result.get("unit", "USD") or "USD"
+    if balance is None:
+        return None
+    return balance, unit
+
+
+def delete_balance_history(site_id: str):
+    """删除站点的余额历史（删除站点时调用）"""
+    if not site_id:
+        return
+    get_balance_history(site_id).delete()
+    with _histories_lock:
+        _histories.pop(site_id, None)
@@ -0,0 +1,157 @@
+"""批量任务模块 - 多站点并发查询引擎
+
+在后台线程池中执行批量任务：全局并发上限 + 每个主机的并发上限，
+每完成一项立即回调，支持取消和进度（已完成/总数）通知。
+回调均在工作线程中执行，GUI 调用方需要自行用 root.after 切回主线程。
+"""
+
+import threading
+from urllib.parse import urlsplit
+
+from konata_api.debug_log import log_debug as _log_debug
+
+
+DEFAULT_MAX_WORKERS = 8       # 全局同时执行的任务数
+DEFAULT_PER_HOST_LIMIT = 2    # 同一主机同时执行的任务数
+
+
+def host_of(url: str) -> str:
+    """提取 URL 的主机名（用于每主机并发限制）"""
+    return (urlsplit(url or "").hostname or "").lower()
+
+
+class BatchJob:
+    """
+    一次批量执行
+
+    Args:
+        items: 任务参数列表
+        worker: worker(item) 执行单个任务并返回结果
+        key_func: key_func(item) 返回任务所属主机（同一主机受 per_host_limit 限制）
+        max_workers: 全局并发上限
+        per_host_limit: 每个主机的并发上限
+        on_result: on_result(item, result, error) 每完成一项调用，出错时 result 为 None
+        on_progress: on_progress(completed, total) 每完成一项调用
+        on_finish: on_finish(cancelled) 全部结束（或取消后在途任务结束）时调用一次
+    """
+
+    def __init__(
+        self,
+        items,
+        worker,
+        key_func=None,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        per_host_limit: int = DEFAULT_PER_HOST_LIMIT,
+        on_result=None,
+        on_progress=None,
+        on_finish=None,
+    ):
+        self._pending = list(items)
+        self.total = len(self._pending)
+        self.completed = 0
+        self._worker = worker
+        self._key_func = key_func or (lambda item: "")
+        self._max_workers = max(1, int(max_workers or 1))
+        self._per_host_limit = max(1, int(per_host_limit or 1))
+        self._on_result = on_result
+        self._on_progress = on_progress
+        self._on_finish = on_finish
+
+        self._cond = threading.Condition()
+        self._active_by_host = {}
+        self._alive_workers = 0
+        self._cancel_event = threading.Event()
+        self._done_event = threading.Event()
+
+    def start(self) -> "BatchJob":
+        """启动工作线程（守护线程，退出程序时不会被未完成的请求阻塞）"""
+        worker_count = min(self._max_workers, self.total)
+        if worker_count == 0:
+            self._finish()
+            return self
+
+        self._alive_workers = worker_count
+        for _ in range(worker_count):
+            threading.Thread(target=self._worker_loop, daemon=True).start()
+        return self
+
+    def cancel(self):
+        """取消尚未开始的任务（进行中的请求会在超时内自然结束）"""
+        self._cancel_event.set()
+        with self._cond:
+            self._cond.notify_all()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    def is_running(self) -> bool:
+        return not self._done_event.is_set()
+
+    def wait(self, timeout: float = None) -> bool:
+        """等待批量执行结束，返回是否已结束"""
+        return self._done_event.wait(timeout)
+
+    def _take_next(self):
+        """取出下一个所属主机未达上限的任务；没有任务或已取消时返回 None"""
+        with self._cond:
+            while True:
+                if self._cancel_event.is_set() or not self._pending:
+                    return None
+                for index, item in enumerate(self._pending):
+                    host = self._key_func(item)
+                    if self._active_by_host.get(host, 0) < self._per_host_limit:
+                        del self._pending[index]
+                        self._active_by_host[host] = self._active_by_host.get(host, 0) + 1
+                        return host, item
+                # 剩余任务的主机都已达到上限，等待其他任务完成
+                self._cond.wait()
+
+    def _worker_loop(self):
+        try:
+            while True:
+                task = self._take_next()
+                if task is None:
+                    break
+                host, item = task
+
+                result, error = None, None
+                try:
+                    result = self._worker(item)
+                except Exception as e:
+                    error = e
+
+                with self._cond:
+                    self._active_by_host[host] -= 1
+                    self.completed += 1
+                    completed = self.completed
+                    self._cond.notify_all()
+
+                if self._on_result:
+                    self._call_safely(self._on_result, item, result, error)
+                if self._on_progress:
+                    self._call_safely(self._on_progress, completed, self.total)
+        finally:
+            with self._cond:
+                self._alive_workers -= 1
+                last_worker = self._alive_workers == 0
+            if last_worker:
+                self._finish()
+
+    @staticmethod
+    def _call_safely(callback, *args):
+        """调用回调；回调出错（如 Tk 主循环已退出时的 root.after）只记录日志，不终止工作线程"""
+        try:
+            callback(*args)
+        except Exception as e:
+            _log_debug(f"batch callback {getattr(callback, '__name__', callback)} failed: {e!r}")
+
+    def _finish(self):
+        self._done_event.set()
+        if self._on_finish:
+            self._call_safely(self._on_finish, self.cancelled)
+
+
+def run_batch(items, worker, key_func=None, **kwargs) -> BatchJob:
+    """创建并启动一次批量执行，参数同 BatchJob"""
+    return BatchJob(items, worker, key_func=key_func, **kwargs).start()
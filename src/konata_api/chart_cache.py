@@ -0,0 +1,178 @@
+"""图表缓存模块 - 按输入内容缓存渲染好的统计图表
+
+缓存键是图表名称、图表用到的那部分数据（以及日志等外部数据的版本）、尺寸和 DPI 的哈希，
+数据没有变化时重新打开统计页或重启程序都直接显示缓存的图片，数据变化后自然得到新的键。
+内存中保留最近使用的若干张（LRU），同时以 zlib 压缩的 RGBA 像素保存到 config/chart_cache/，
+超出数量上限时删除最久未使用的文件。
+"""
+
+import hashlib
+import json
+import os
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Optional
+
+from konata_api.utils import get_exe_dir, get_config_snapshot, atomic_write
+
+
+CACHE_FORMAT = 1                  # 图表样式或文件格式变化时加 1，旧缓存自动失效
+DEFAULT_MEMORY_ENTRIES = 24       # 内存中保留的图表数
+DEFAULT_DISK_ENTRIES = 48         # 磁盘上保留的图表数
+
+_HEADER = struct.Struct("<4sII")  # 文件头：标识、宽、高
+_MAGIC = b"KCC1"
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_chart_cache_dir() -> str:
+    """获取图表缓存目录"""
+    return os.path.join(get_exe_dir(), "config", "chart_cache")
+
+
+def chart_cache_key(name: str, inputs: dict) -> str:
+    """
+    计算图表的缓存键
+
+    Args:
+        name: 图表名称
+        inputs: 决定图表内容的全部输入（构建参数、数据版本、日期等），需可 JSON 序列化
+
+    Returns:
+        str: 十六进制哈希
+    """
+    payload = json.dumps([CACHE_FORMAT, name, inputs], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class ChartCache:
+    """
+    图表缓存（线程安全）
+
+    Args:
+        cache_dir: 磁盘缓存目录，留空使用 config/chart_cache
+        memory_entries: 内存中保留的图表数，0 为不使用内存缓存
+        disk_entries: 磁盘上保留的图表数，0 为不使用磁盘缓存
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, memory_entries: int = DEFAULT_MEMORY_ENTRIES,
+                 disk_entries: int = DEFAULT_DISK_ENTRIES):
+        self.cache_dir = cache_dir or get_chart_cache_dir()
+        self.memory_entries = max(0, int(memory_entries))
+        self.disk_entries = max(0, int(disk_entries))
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()   # key -> (宽, 高, RGBA bytes)，最近使用的在后
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.bin")
+
+    def get(self, key: str) -> Optional[tuple]:
+        """读取缓存的图表 (宽, 高, RGBA bytes)，内存中没有时读磁盘"""
+        with self._lock:
+            image = self._memory.get(key)
+            if image is not None:
+                self._memory.move_to_end(key)
+                return image
+        if not self.disk_entries:
+            return None
+
+        image = self._read_file(self._path(key))
+        if image is not None:
+            self._remember(key, image)
+        return image
+
+    def put(self, key: str, image: tuple):
+        """保存渲染好的图表"""
+        self._remember(key, image)
+        if self.disk_entries:
+            self._write_file(self._path(key), image)
+            self._prune_disk()
+
+    def clear(self):
+        """清空内存和磁盘缓存"""
+        with self._lock:
+            self._memory.clear()
+        for path in self._disk_files():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _remember(self, key: str, image: tuple):
+        if not self.memory_entries:
+            return
+        with self._lock:
+            self._memory[key] = image
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    @staticmethod
+    def _read_file(path: str) -> Optional[tuple]:
+        try:
+            with open(path, "rb") as f:
+                content = f.read()
+            magic, width, height = _HEADER.unpack_from(content)
+            if magic != _MAGIC:
+                return None
+            pixels = zlib.decompress(content[_HEADER.size:])
+        except (OSError, struct.error, zlib.error):
+            return None
+        if len(pixels) != width * height * 4:
+            return None
+        try:
+            os.utime(path)   # 记录最近使用时间，清理时保留常用的
+        except OSError:
+            pass
+        return width, height, pixels
+
+    def _write_file(self, path: str, image: tuple):
+        width, height, pixels = image
+        content = _HEADER.pack(_MAGIC, width, height) + zlib.compress(pixels, 1)
+        try:
+            atomic_write(path, content)
+        except OSError:
+            pass
+
+    def _disk_files(self) -> list:
+        try:
+            names = os.listdir(self.cache_dir)
+        except OSError:
+            return []
+        return [os.path.join(self.cache_dir, name) for name in names if name.endswith(".bin")]
+
+    def _prune_disk(self):
+        """删除超出数量上限、最久未使用的缓存文件"""
+        files = self._disk_files()
+        if len(files) <= self.disk_entries:
+            return
+
+        def last_used(path):
+            try:
+                return os.path.getmtime(path)
+            except OSError:
+                return 0
+        for path in sorted(files, key=last_used)[:len(files) - self.disk_entries]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def get_chart_cache() -> ChartCache:
+    """获取全局图表缓存（数量上限见 config.json 中 charts.cache_memory_entries / cache_disk_entries）"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            settings = get_config_snapshot().get("charts", {}) or {}
+            try:
+                memory_entries = int(settings.get("cache_memory_entries", DEFAULT_MEMORY_ENTRIES))
+                disk_entries = int(settings.get("cache_disk_entries", DEFAULT_DISK_ENTRIES))
+            except (TypeError, ValueError):
+                memory_entries, disk_entries = DEFAULT_MEMORY_ENTRIES, DEFAULT_DISK_ENTRIES
+            _cache = ChartCache(memory_entries=memory_entries, disk_entries=disk_entries)
+        return _cache
@@ -0,0 +1,193 @@
+"""图表渲染模块 - 在进程池中并行绘制统计图表
+
+Agg 渲染几乎全程持有 GIL，线程池无法并行；这里在子进程中构建并绘制图表，
+只把 RGBA 像素 (宽, 高, bytes) 传回主进程，Tk 主线程只负责把像素贴成图片
+（通过缓冲区协议直接构造 PIL 图片，不经过 PNG 编码 / 解码，尺寸相同时贴入已有的 PhotoImage）。
+进程池在第一次使用时创建并常驻（每个子进程只导入一次 matplotlib，结构固定的图表复用
+charts.get_chart_template() 的 Figure，再次绘制时只原地更新数据），
+无法创建子进程时退回单个后台线程（与主线程之外的 pyplot 调用串行）。
+提交时给出缓存键的图表先查 chart_cache，命中时不再渲染。
+"""
+
+import atexit
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+import numpy as np
+from PIL import Image, ImageTk
+
+from konata_api.chart_cache import get_chart_cache
+from konata_api.utils import get_config_snapshot
+
+
+DEFAULT_RENDER_WORKERS = 4   # 同时渲染的图表数上限（实际不超过 CPU 核数）
+
+# 图表名称 -> charts 模块中的构建函数
+CHART_BUILDERS = {
+    "balance": "create_balance_bar_chart",
+    "type": "create_type_stats_chart",
+    "recharge": "create_recharge_trend_chart",
+    "checkin": "create_checkin_activity_chart",
+    "model": "create_model_usage_chart",
+    "usage": "create_usage_trend_chart",
+}
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_render_workers() -> int:
+    """渲染进程数（config.json 中 charts.render_workers，不超过 CPU 核数）"""
+    settings = get_config_snapshot().get("charts", {}) or {}
+    try:
+        workers = int(settings.get("render_workers", DEFAULT_RENDER_WORKERS))
+    except (TypeError, ValueError):
+        workers = DEFAULT_RENDER_WORKERS
+    return max(1, min(workers, os.cpu_count() or 1))
+
+
+def render_chart(name: str, kwargs: dict) -> tuple:
+    """
+    构建并绘制一张图表（在渲染进程中执行）
+
+    Args:
+        name: 图表名称（见 CHART_BUILDERS）
+        kwargs: 传给构建函数的参数（需可 pickle）
+
+    Returns:
+        tuple: (宽, 高, RGBA 像素 bytes)
+    """
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    import matplotlib.pyplot as plt
+    from konata_api import charts
+
+    kwargs = dict(kwargs)
+    figsize = kwargs.pop("figsize", (6, 4))
+    dpi = kwargs.pop("dpi", 100)
+    template = charts.get_chart_template(name, figsize, dpi)
+    if template is not None:
+        # 本进程上次渲染过的同一图表：只原地更新数据，不重建 Figure
+        fig = template.render(**kwargs)
+    else:
+        fig = getattr(charts, CHART_BUILDERS[name])(figsize=figsize, dpi=dpi, **kwargs)
+    try:
+        canvas = fig.canvas if template is not None else FigureCanvasAgg(fig)
+        canvas.draw()
+        rgba = np.asarray(canvas.buffer_rgba())
+        height, width = rgba.shape[:2]
+        return width, height, rgba.tobytes()
+    finally:
+        if template is None:
+            plt.close(fig)
+
+
+def rgba_to_pil(width: int, height: int, pixels) -> Image.Image:
+    """RGBA 像素（bytes 或 memoryview）-> PIL 图片，直接引用像素缓冲区，不复制、不压缩"""
+    return Image.frombuffer("RGBA", (width, height), pixels, "raw", "RGBA", 0, 1)
+
+
+def to_photo_image(image: Image.Image, photo: Optional[ImageTk.PhotoImage] = None) -> ImageTk.PhotoImage:
+    """
+    PIL 图片 -> tkinter 图片（需在 Tk 主线程调用）
+
+    Args:
+        image: PIL 图片
+        photo: 上次显示的图片，尺寸相同时直接贴入新像素复用，不再新建 Tk 图片
+
+    Returns:
+        ImageTk.PhotoImage
+    """
+    if photo is not None and (photo.width(), photo.height()) == image.size:
+        photo.paste(image)
+        return photo
+    return ImageTk.PhotoImage(image)
+
+
+def _warm_up_worker():
+    from konata_api.charts import warm_up as warm_up_charts
+    warm_up_charts()
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            try:
+                _pool = ProcessPoolExecutor(max_workers=get_render_workers())
+            except (OSError, NotImplementedError, ImportError):
+                _pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chart-render")
+        return _pool
+
+
+def _reset_pool(broken):
+    """丢弃已损坏的进程池（子进程被杀死等），下次使用时重建"""
+    global _pool
+    with _pool_lock:
+        if _pool is broken:
+            _pool = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def submit_chart(name: str, kwargs: dict, callback, cache_key: Optional[str] = None):
+    """
+    提交一张图表的渲染任务
+
+    Args:
+        name / kwargs: 见 render_chart
+        callback: callback(result, error) 在渲染完成后于后台线程中调用（缓存命中时在当前线程立即调用），
+                  result 为 (宽, 高, RGBA bytes)，失败时 result 为 None、error 为错误信息
+        cache_key: 缓存键（见 chart_cache.chart_cache_key），留空则不使用缓存
+    """
+    if cache_key is not None:
+        cached = get_chart_cache().get(cache_key)
+        if cached is not None:
+            callback(cached, None)
+            return
+
+    def on_done(future):
+        try:
+            result = future.result()
+        except BrokenProcessPool as e:
+            _reset_pool(pool)
+            callback(None, f"渲染进程异常退出: {e}")
+        except Exception as e:
+            callback(None, str(e))
+        else:
+            callback(result, None)
+            if cache_key is not None:
+                get_chart_cache().put(cache_key, result)
+
+    pool = _get_pool()
+    try:
+        future = pool.submit(render_chart, name, kwargs)
+    except (BrokenProcessPool, RuntimeError) as e:
+        _reset_pool(pool)
+        callback(None, str(e))
+        return
+    future.add_done_callback(on_done)
+
+
+def warm_up():
+    """预先启动渲染进程并在每个进程中导入 matplotlib（后台调用，失败时忽略）"""
+    pool = _get_pool()
+    workers = get_render_workers() if isinstance(pool, ProcessPoolExecutor) else 1
+    try:
+        for _ in range(workers):
+            pool.submit(_warm_up_worker)
+    except (BrokenProcessPool, RuntimeError):
+        _reset_pool(pool)
+
+
+def shutdown():
+    """关闭渲染进程池（退出程序时调用），不等待未完成的渲染"""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+atexit.register(shutdown)
@@ -0,0 +1,684 @@
+"""
+图表模块 - 站点统计与调用日志图表
+
+导入本模块时才加载 matplotlib（并设置字体和样式），程序启动时不再为图表付出导入开销；
+主窗口显示后可调用 warm_up() 在后台线程中预先加载。
+
+结构固定的图表（余额排名、充值趋势、签到活跃度、调用趋势）由 ChartTemplate 子类实现：
+Figure 和坐标轴只构建一次，数据更新时原地修改柱高、折线、文字和坐标范围，
+get_chart_template() 在渲染进程中按 (名称, 尺寸, DPI) 复用同一个对象。
+"""
+import warnings
+from datetime import datetime, timedelta
+from typing import Optional
+
+import numpy as np
+
+# 过滤 matplotlib 字体警告
+warnings.filterwarnings('ignore', message='Glyph .* missing from')
+
+import matplotlib
+matplotlib.use('Agg')  # 非交互式后端，避免 tkinter 冲突
+import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from matplotlib.font_manager import FontProperties
+from matplotlib.ticker import FuncFormatter
+
+# 设置中文字体（在导入后立即设置）
+FONT_FAMILY_STACK = [
+    "Times New Roman",  # English
+    "SimSun",           # Chinese (宋体)
+    "DejaVu Serif",     # fallback
+]
+
+FONT_DEFAULT = FontProperties(family=FONT_FAMILY_STACK, size=10)
+FONT_SMALL = FontProperties(family=FONT_FAMILY_STACK, size=9)
+FONT_TITLE = FontProperties(family=FONT_FAMILY_STACK, size=12, weight="bold")
+FONT_SUBTITLE = FontProperties(family=FONT_FAMILY_STACK, size=11, weight="bold")
+
+plt.rcParams["font.family"] = FONT_FAMILY_STACK
+plt.rcParams["axes.unicode_minus"] = False
+plt.rcParams["figure.facecolor"] = "#f8fafc"
+plt.rcParams["axes.facecolor"] = "#f8fafc"
+plt.rcParams["savefig.facecolor"] = "#f8fafc"
+
+from konata_api.stats import (
+    SITE_TYPE_PAID, SITE_TYPE_FREE, SITE_TYPE_SUBSCRIPTION, SITE_TYPE_LABELS,
+    CheckinColumns, load_checkin_columns, get_stats_summary,
+)
+from konata_api.log_analytics import (
+    QUOTA_PER_USD, load_all_log_columns, group_by, top_n,
+)
+
+
+def warm_up():
+    """预先完成字体查找和首次渲染的初始化（在后台线程中调用，不使用 pyplot）"""
+    fig = Figure(figsize=(1, 1), dpi=50)
+    ax = fig.add_subplot()
+    ax.set_title("预热", fontproperties=FONT_TITLE)
+    ax.text(0.5, 0.5, "$0", fontproperties=FONT_SMALL)
+    FigureCanvasAgg(fig).draw()
+
+
+def _draw_placeholder(fig: Figure, message: str):
+    """Draw a centered placeholder message on an empty figure."""
+    ax = fig.add_subplot()
+    ax.text(0.5, 0.5, message, ha="center", va="center", color="#64748b", fontproperties=FONT_SUBTITLE)
+    ax.set_xlim(0, 1)
+    ax.set_ylim(0, 1)
+    ax.axis("off")
+
+
+def _create_placeholder_chart(message: str, figsize=(6, 4), dpi=100) -> Figure:
+    """Create a simple placeholder chart when no data is available."""
+    fig = plt.figure(figsize=figsize, dpi=dpi)
+    _draw_placeholder(fig, message)
+    fig.tight_layout()
+    return fig
+
+
+def _set_axis_style(ax, grid_axis: str = "x"):
+    """Apply a unified modern style to axes."""
+    ax.grid(axis=grid_axis, linestyle="--", linewidth=0.8, color="#cbd5e1", alpha=0.6)
+    ax.tick_params(colors="#334155", labelsize=9)
+    ax.spines["top"].set_visible(False)
+    ax.spines["right"].set_visible(False)
+    ax.spines["left"].set_color("#cbd5e1")
+    ax.spines["bottom"].set_color("#cbd5e1")
+
+
+
+def _apply_tick_font(ax):
+    for tick in ax.get_xticklabels():
+        tick.set_fontproperties(FONT_SMALL)
+    for tick in ax.get_yticklabels():
+        tick.set_fontproperties(FONT_SMALL)
+
+
+
+def _shorten_name(name: str, max_len: int = 14) -> str:
+    if len(name) <= max_len:
+        return name
+    return name[: max_len - 3] + "..."
+
+
+def _iter_recent_month_keys(months: int = 12):
+    cursor = datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    keys = []
+    for _ in range(max(months, 1)):
+        keys.append(cursor.strftime("%Y-%m"))
+        cursor = (cursor - timedelta(days=1)).replace(day=1)
+    return list(reversed(keys))
+
+
+_PLACEHOLDER = object()
+
+
+class ChartTemplate:
+    """Long-lived chart whose figure and axes are built once.
+
+    ``render`` rebuilds the artists only when ``structure_key`` changes (e.g. the bar count);
+    otherwise ``update`` changes bar heights, line data, labels and axis limits in place, and
+    ``tight_layout`` runs again only when ``layout_key`` (the tick labels shown after the
+    update) changes. It always starts from the default subplot parameters and value labels are
+    kept out of the layout, so a reused figure is laid out exactly like a freshly built one.
+    Templates use the object-oriented API, so their figures are not registered with pyplot.
+    """
+
+    placeholder = "暂无数据"
+
+    def __init__(self, figsize=(6, 4), dpi=100):
+        self.fig = Figure(figsize=figsize, dpi=dpi)
+        FigureCanvasAgg(self.fig)
+        pars = self.fig.subplotpars
+        self._default_margins = {"left": pars.left, "right": pars.right, "bottom": pars.bottom, "top": pars.top}
+        self._structure = None
+        self._layout = None
+
+    def prepare(self, **kwargs) -> Optional[dict]:
+        """Turn builder arguments into plot data; ``None`` shows the placeholder."""
+        raise NotImplementedError
+
+    def structure_key(self, data: dict):
+        """Value that requires new artists when it changes."""
+        return None
+
+    def layout_key(self):
+        """Tick labels that will be drawn on every axis; ``tight_layout`` re-runs when they change."""
+        key = []
+        for ax in self.fig.axes:
+            for axis in (ax.xaxis, ax.yaxis):
+                locs = axis.get_majorticklocs()
+                labels = axis.get_major_formatter().format_ticks(locs)
+                ticks = axis.get_major_ticks(len(locs))
+                low, high = sorted(axis.get_view_interval())
+                margin = (high - low) * 1e-10
+                key.append(tuple(
+                    (label, tick.label1.get_visible(), tick.label2.get_visible())
+                    for loc, label, tick in zip(locs, labels, ticks)
+                    if low - margin <= loc <= high + margin
+                ))
+        return tuple(key)
+
+    def build(self, data: dict):
+        """Create axes and artists (values are filled in by ``update``)."""
+        raise NotImplementedError
+
+    def update(self, data: dict):
+        """Apply new data to the existing artists."""
+        raise NotImplementedError
+
+    def render(self, **kwargs) -> Figure:
+        """Update the figure for new data and return it (the same Figure every time)."""
+        data = self.prepare(**kwargs)
+        if data is None:
+            if self._structure is not _PLACEHOLDER:
+                self.fig.clear()
+                _draw_placeholder(self.fig, self.placeholder)
+                self.fig.tight_layout()
+                self._structure = _PLACEHOLDER
+                self._layout = None
+            return self.fig
+
+        structure = ("chart", self.structure_key(data))
+        if structure != self._structure:
+            self.fig.clear()
+            self.build(data)
+            self._structure = structure
+            self._layout = None
+        self.update(data)
+
+        layout = self.layout_key()
+        if layout != self._layout:
+            # tight_layout depends on the starting position; start from the defaults like a new Figure
+            self.fig.subplots_adjust(**self._default_margins)
+            self.fig.tight_layout()
+            self._layout = layout
+        return self.fig
+
+
+def _style_twin_axis(ax2):
+    ax2.spines["top"].set_visible(False)
+    ax2.spines["left"].set_visible(False)
+    ax2.spines["right"].set_color("#cbd5e1")
+    ax2.tick_params(colors="#334155", labelsize=9)
+
+
+def _add_combined_legend(ax1, ax2):
+    handles1, labels1 = ax1.get_legend_handles_labels()
+    handles2, labels2 = ax2.get_legend_handles_labels()
+    legend = ax1.legend(handles1 + handles2, labels1 + labels2, loc="upper left", frameon=False, fontsize=8.8)
+    for text_item in legend.get_texts():
+        text_item.set_fontproperties(FONT_SMALL)
+
+
+def _day_tick_positions(count: int) -> list:
+    step = max(1, count // 7)
+    return [idx for idx in range(count) if (idx % step == 0 or idx == count - 1)]
+
+
+def _recent_days(days: int) -> list:
+    today = datetime.now().date()
+    return [today - timedelta(days=offset) for offset in range(max(days, 1) - 1, -1, -1)]
+
+
+
+_SITE_TYPE_COLORS = {
+    SITE_TYPE_PAID: "#3b82f6",
+    SITE_TYPE_FREE: "#10b981",
+    SITE_TYPE_SUBSCRIPTION: "#f59e0b",
+}
+
+
+class BalanceBarChart(ChartTemplate):
+    """Horizontal ranking chart for site balances (top 10)."""
+
+    placeholder = "暂无余额数据"
+
+    def prepare(self, sites: list) -> Optional[dict]:
+        valid_sites = [
+            s for s in sites
+            if s.get("balance", 0) > 0 and s.get("balance_unit") in ("USD", "CNY", "")
+        ]
+        valid_sites = sorted(valid_sites, key=lambda x: x.get("balance", 0), reverse=True)[:10]
+        if not valid_sites:
+            return None
+
+        # barh draws from bottom to top, so the largest balance goes last
+        valid_sites.reverse()
+        return {
+            "labels": [_shorten_name(s.get("name", "未命名")) for s in valid_sites],
+            "values": [float(s.get("balance", 0) or 0) for s in valid_sites],
+            "colors": [_SITE_TYPE_COLORS.get(s.get("type", SITE_TYPE_PAID), "#94a3b8") for s in valid_sites],
+        }
+
+    def structure_key(self, data: dict):
+        return len(data["values"])
+
+    def build(self, data: dict):
+        count = len(data["values"])
+        ax = self.ax = self.fig.add_subplot()
+        self.bars = ax.barh(range(count), [0.0] * count, edgecolor="white", linewidth=1.0, height=0.58)
+        self.value_texts = [
+            ax.text(0, bar.get_y() + bar.get_height() / 2, "", va="center", ha="left",
+                    color="#1f2937", fontproperties=FONT_SMALL, in_layout=False)
+            for bar in self.bars
+        ]
+        ax.set_yticks(range(count))
+
+        ax.set_title("余额排名 Top 10", fontproperties=FONT_TITLE, color="#0f172a", pad=10)
+        ax.set_xlabel("Balance (USD)", fontproperties=FONT_DEFAULT, color="#334155")
+        ax.xaxis.set_major_formatter(FuncFormatter(lambda x, _: f"${x:,.0f}"))
+        _set_axis_style(ax, grid_axis="x")
+
+    def update(self, data: dict):
+        max_val = max(data["values"])
+        for bar, text, value, color in zip(self.bars, self.value_texts, data["values"], data["colors"]):
+            bar.set_width(value)
+            bar.set_facecolor(color)
+            text.set_x(value + max_val * 0.02)
+            text.set_text(f"${value:,.2f}")
+        self.ax.set_yticklabels(data["labels"])
+        self.ax.set_xlim(0, max_val * 1.24)
+        _apply_tick_font(self.ax)
+
+
+def create_balance_bar_chart(sites: list, figsize=(6, 4), dpi=100) -> Figure:
+    """Generate a horizontal ranking chart for site balances."""
+    return BalanceBarChart(figsize, dpi).render(sites=sites)
+
+
+
+def create_type_stats_chart(sites: list, figsize=(6, 4), dpi=100, summary: Optional[dict] = None) -> Figure:
+    """Generate type proportion and type balance comparison charts.
+
+    ``summary`` (from ``SiteRepository.summary()``) supplies precomputed per-type totals.
+    """
+    if summary is None:
+        summary = get_stats_summary(sites)
+    type_stats = summary["by_type"]
+
+    if not type_stats:
+        return _create_placeholder_chart("暂无站点分类数据", figsize=figsize, dpi=dpi)
+
+    color_map = {
+        SITE_TYPE_PAID: "#3b82f6",
+        SITE_TYPE_FREE: "#10b981",
+        SITE_TYPE_SUBSCRIPTION: "#f59e0b",
+    }
+
+    type_keys = list(type_stats.keys())
+    labels = [SITE_TYPE_LABELS.get(t, t) for t in type_keys]
+    counts = [type_stats[t]["count"] for t in type_keys]
+    balances = [type_stats[t]["balance"] for t in type_keys]
+    colors = [color_map.get(t, "#94a3b8") for t in type_keys]
+
+    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=figsize, dpi=dpi)
+
+    if sum(counts) > 0:
+        wedges, texts, autotexts = ax1.pie(
+            counts,
+            labels=labels,
+            colors=colors,
+            startangle=90,
+            autopct=lambda p: f"{p:.0f}%" if p >= 5 else "",
+            pctdistance=0.72,
+            labeldistance=1.07,
+            wedgeprops={"width": 0.40, "edgecolor": "white", "linewidth": 1.2},
+        )
+        for txt in texts:
+            txt.set_fontproperties(FONT_SMALL)
+            txt.set_color("#334155")
+        for txt in autotexts:
+            txt.set_fontproperties(FONT_SMALL)
+            txt.set_color("#0f172a")
+
+        ax1.text(
+            0,
+            0,
+            f"总计\n{sum(counts)}",
+            ha="center",
+            va="center",
+            color="#0f172a",
+            fontproperties=FONT_SUBTITLE,
+        )
+        ax1.set_title("站点类型占比", fontproperties=FONT_SUBTITLE, color="#0f172a", pad=6)
+    else:
+        ax1.text(0.5, 0.5, "无数据", ha="center", va="center", fontproperties=FONT_DEFAULT)
+        ax1.axis("off")
+
+    bars = ax2.bar(labels, balances, color=colors, width=0.58, edgecolor="white", linewidth=1.0)
+    max_balance = max(balances) if balances else 0
+    for bar, value in zip(bars, balances):
+        ax2.text(
+            bar.get_x() + bar.get_width() / 2,
+            value + (max_balance * 0.03 if max_balance > 0 else 0.1),
+            f"${value:,.0f}",
+            ha="center",
+            va="bottom",
+            color="#1f2937",
+            fontproperties=FONT_SMALL,
+        )
+
+    ax2.set_title("各类型余额对比", fontproperties=FONT_SUBTITLE, color="#0f172a", pad=6)
+    ax2.set_ylabel("Balance (USD)", fontproperties=FONT_DEFAULT, color="#334155")
+    ax2.yaxis.set_major_formatter(FuncFormatter(lambda y, _: f"${y:,.0f}"))
+    ax2.set_ylim(0, max_balance * 1.28 if max_balance > 0 else 1)
+
+    _set_axis_style(ax2, grid_axis="y")
+    _apply_tick_font(ax2)
+
+    fig.tight_layout()
+    return fig
+
+
+
+class RechargeTrendChart(ChartTemplate):
+    """Monthly recharge trend chart."""
+
+    placeholder = "暂无充值记录"
+
+    def prepare(self, sites: Optional[list] = None, months: int = 12, summary: Optional[dict] = None) -> Optional[dict]:
+        month_keys = _iter_recent_month_keys(months)
+        if summary is None:
+            summary = get_stats_summary(sites or [])
+        month_totals = summary["recharge_by_month"]
+
+        values = [float(month_totals.get(key, 0.0)) for key in month_keys]
+        if max(values, default=0) <= 0:
+            return None
+        return {
+            "labels": [datetime.strptime(key, "%Y-%m").strftime("%y-%m") for key in month_keys],
+            "values": values,
+        }
+
+    def structure_key(self, data: dict):
+        return len(data["values"])
+
+    def build(self, data: dict):
+        count = len(data["values"])
+        ax = self.ax = self.fig.add_subplot()
+        self.x_positions = list(range(count))
+        self.line, = ax.plot(self.x_positions, [0.0] * count, color="#2563eb", linewidth=2.2, marker="o", markersize=5.5)
+        self.fill = None
+        self.value_texts = [
+            ax.text(idx, 0, "", ha="center", va="bottom", color="#1f2937", fontproperties=FONT_SMALL,
+                    in_layout=False)
+            for idx in self.x_positions
+        ]
+        ax.set_xticks(self.x_positions)
+
+        ax.set_title("充值趋势（近12个月）", fontproperties=FONT_TITLE, color="#0f172a", pad=10)
+        ax.set_xlabel("Month", fontproperties=FONT_DEFAULT, color="#334155")
+        ax.set_ylabel("Amount (USD)", fontproperties=FONT_DEFAULT, color="#334155")
+        ax.yaxis.set_major_formatter(FuncFormatter(lambda y, _: f"${y:,.0f}"))
+        _set_axis_style(ax, grid_axis="y")
+
+    def update(self, data: dict):
+        values = data["values"]
+        ax = self.ax
+        self.line.set_ydata(values)
+        if self.fill is not None:
+            self.fill.remove()
+        self.fill = ax.fill_between(self.x_positions, values, color="#93c5fd", alpha=0.28)
+
+        peak = max(values)
+        for text, value in zip(self.value_texts, values):
+            text.set_visible(value > 0)
+            text.set_y(value + peak * 0.03)
+            text.set_text(f"${value:,.0f}")
+        ax.set_ylim(0, peak * 1.25)
+
+        labels = data["labels"]
+        ax.set_xticklabels(labels)
+        _apply_tick_font(ax)
+        # get_xticklabels() 只返回可见的标签，上次隐藏的需要通过刻度对象重新设置
+        step = max(1, len(labels) // 6)
+        for idx, tick in enumerate(ax.xaxis.get_major_ticks()):
+            tick.label1.set_visible(idx % step == 0 or idx == len(labels) - 1)
+
+
+def create_recharge_trend_chart(sites: list, months: int = 12, figsize=(6, 4), dpi=100, summary: Optional[dict] = None) -> Figure:
+    """Generate monthly recharge trend chart.
+
+    ``summary`` (from ``SiteRepository.summary()``) supplies precomputed monthly totals.
+    """
+    return RechargeTrendChart(figsize, dpi).render(sites=sites, months=months, summary=summary)
+
+
+
+class CheckinActivityChart(ChartTemplate):
+    """Recent check-in activity chart (success/failure + quota trend)."""
+
+    placeholder = "暂无签到记录"
+
+    def prepare(self, logs=None, days: int = 30) -> Optional[dict]:
+        columns = load_checkin_columns() if logs is None else CheckinColumns(logs)
+        date_list = _recent_days(days)
+
+        success_counts, fail_counts, quota_sums = columns.daily(np.datetime64(date_list[0], "D"), len(date_list))
+        success_values = success_counts.tolist()
+        fail_values = fail_counts.tolist()
+        quota_values = quota_sums.tolist()
+
+        if max(success_values + fail_values, default=0) <= 0 and max(quota_values, default=0) <= 0:
+            return None
+        return {
+            "labels": [day.strftime("%m-%d") for day in date_list],
+            "success": success_values,
+            "fail": fail_values,
+            "quota": quota_values,
+        }
+
+    def structure_key(self, data: dict):
+        return len(data["labels"])
+
+    def build(self, data: dict):
+        count = len(data["labels"])
+        x_positions = list(range(count))
+        zeros = [0.0] * count
+
+        ax1 = self.ax1 = self.fig.add_subplot()
+        self.success_bars = ax1.bar(
+            x_positions, zeros, color="#10b981", width=0.72, label="成功", edgecolor="white", linewidth=0.8,
+        )
+        self.fail_bars = ax1.bar(
+            x_positions, zeros, bottom=zeros, color="#f97316", width=0.72, label="失败", edgecolor="white", linewidth=0.8,
+        )
+
+        ax2 = self.ax2 = ax1.twinx()
+        self.quota_line, = ax2.plot(
+            x_positions, zeros, color="#6366f1", marker="o", markersize=3.8, linewidth=2.0, label="额度(USD)",
+        )
+
+        self.tick_positions = _day_tick_positions(count)
+        ax1.set_xticks(self.tick_positions)
+
+        ax1.set_title("签到活跃度（近30天）", fontproperties=FONT_TITLE, color="#0f172a", pad=10)
+        ax1.set_ylabel("Check-in Count", fontproperties=FONT_DEFAULT, color="#334155")
+        ax2.set_ylabel("Quota (USD)", fontproperties=FONT_DEFAULT, color="#334155")
+
+        _set_axis_style(ax1, grid_axis="y")
+        _style_twin_axis(ax2)
+        ax2.yaxis.set_major_formatter(FuncFormatter(lambda y, _: f"${y:,.1f}"))
+        _add_combined_legend(ax1, ax2)
+
+    def update(self, data: dict):
+        for success_bar, fail_bar, success, fail in zip(self.success_bars, self.fail_bars, data["success"], data["fail"]):
+            success_bar.set_height(success)
+            fail_bar.set_y(success)
+            fail_bar.set_height(fail)
+        self.quota_line.set_ydata(data["quota"])
+
+        self.ax1.set_xticklabels([data["labels"][idx] for idx in self.tick_positions])
+        _apply_tick_font(self.ax1)
+        _apply_tick_font(self.ax2)
+
+        peak_count = max(s + f for s, f in zip(data["success"], data["fail"]))
+        self.ax1.set_ylim(0, peak_count * 1.28 if peak_count > 0 else 1)
+        peak_quota = max(data["quota"], default=0)
+        self.ax2.set_ylim(0, peak_quota * 1.25 if peak_quota > 0 else 1)
+
+
+def create_checkin_activity_chart(logs=None, days: int = 30, figsize=(6, 4), dpi=100) -> Figure:
+    """Generate recent check-in activity chart (success/failure + quota trend).
+
+    Without ``logs`` the cached columns from ``load_checkin_columns`` are used.
+    """
+    return CheckinActivityChart(figsize, dpi).render(logs=logs, days=days)
+
+
+
+def create_model_usage_chart(columns=None, days: int = 30, top: int = 8, figsize=(6, 4), dpi=100) -> Figure:
+    """Generate top model spending chart from locally synced call logs."""
+    if columns is None:
+        columns = load_all_log_columns()
+    recent = columns.recent(days)
+    groups = top_n(group_by(recent, "model"), top, by="quota")
+
+    if len(groups["labels"]) == 0 or groups["quota"].max() <= 0:
+        return _create_placeholder_chart("暂无本地调用日志", figsize=figsize, dpi=dpi)
+
+    names = [_shorten_name(str(name), 18) for name in groups["labels"]]
+    spends = (groups["quota"] / QUOTA_PER_USD).tolist()
+    requests = groups["requests"].tolist()
+
+    fig, ax = plt.subplots(figsize=figsize, dpi=dpi)
+
+    y_labels = list(reversed(names))
+    y_values = list(reversed(spends))
+    y_requests = list(reversed(requests))
+
+    bars = ax.barh(y_labels, y_values, color="#6366f1", edgecolor="white", linewidth=1.0, height=0.58)
+
+    max_val = max(y_values) if y_values else 1.0
+    for bar, value, count in zip(bars, y_values, y_requests):
+        ax.text(
+            bar.get_width() + max_val * 0.02,
+            bar.get_y() + bar.get_height() / 2,
+            f"${value:,.2f} · {count:,}次",
+            va="center",
+            ha="left",
+            color="#1f2937",
+            fontproperties=FONT_SMALL,
+        )
+
+    ax.set_title(f"模型消耗 Top {top}（近{days}天）", fontproperties=FONT_TITLE, color="#0f172a", pad=10)
+    ax.set_xlabel("Spend (USD)", fontproperties=FONT_DEFAULT, color="#334155")
+    ax.xaxis.set_major_formatter(FuncFormatter(lambda x, _: f"${x:,.2f}"))
+    ax.set_xlim(0, max_val * 1.42)
+
+    _set_axis_style(ax, grid_axis="x")
+    _apply_tick_font(ax)
+
+    fig.tight_layout()
+    return fig
+
+
+
+class UsageTrendChart(ChartTemplate):
+    """Daily spending and request count trend from locally synced call logs."""
+
+    placeholder = "暂无本地调用日志"
+
+    def prepare(self, columns=None, days: int = 30) -> Optional[dict]:
+        if columns is None:
+            columns = load_all_log_columns()
+        by_day = group_by(columns.recent(days), "day")
+
+        # 补齐最近 days 天（首尾没有调用的日期计为 0）
+        date_list = _recent_days(days)
+        day_index = {str(label): idx for idx, label in enumerate(by_day["labels"])}
+        spend_values = []
+        request_values = []
+        for day in date_list:
+            idx = day_index.get(day.strftime("%Y-%m-%d"))
+            spend_values.append(float(by_day["quota"][idx]) / QUOTA_PER_USD if idx is not None else 0.0)
+            request_values.append(int(by_day["requests"][idx]) if idx is not None else 0)
+
+        if max(request_values, default=0) <= 0:
+            return None
+        return {
+            "labels": [day.strftime("%m-%d") for day in date_list],
+            "spend": spend_values,
+            "requests": request_values,
+        }
+
+    def structure_key(self, data: dict):
+        return len(data["labels"])
+
+    def build(self, data: dict):
+        count = len(data["labels"])
+        x_positions = list(range(count))
+        zeros = [0.0] * count
+
+        ax1 = self.ax1 = self.fig.add_subplot()
+        self.spend_bars = ax1.bar(
+            x_positions, zeros, color="#3b82f6", width=0.72, label="消耗(USD)", edgecolor="white", linewidth=0.8,
+        )
+
+        ax2 = self.ax2 = ax1.twinx()
+        self.request_line, = ax2.plot(
+            x_positions, zeros, color="#f59e0b", marker="o", markersize=3.8, linewidth=2.0, label="调用次数",
+        )
+
+        self.tick_positions = _day_tick_positions(count)
+        ax1.set_xticks(self.tick_positions)
+
+        ax1.set_title(f"调用趋势（近{count}天）", fontproperties=FONT_TITLE, color="#0f172a", pad=10)
+        ax1.set_ylabel("Spend (USD)", fontproperties=FONT_DEFAULT, color="#334155")
+        ax2.set_ylabel("Requests", fontproperties=FONT_DEFAULT, color="#334155")
+
+        _set_axis_style(ax1, grid_axis="y")
+        _style_twin_axis(ax2)
+        ax1.yaxis.set_major_formatter(FuncFormatter(lambda y, _: f"${y:,.2f}"))
+        ax2.yaxis.set_major_formatter(FuncFormatter(lambda y, _: f"{y:,.0f}"))
+        _add_combined_legend(ax1, ax2)
+
+    def update(self, data: dict):
+        for bar, spend in zip(self.spend_bars, data["spend"]):
+            bar.set_height(spend)
+        self.request_line.set_ydata(data["requests"])
+
+        self.ax1.set_xticklabels([data["labels"][idx] for idx in self.tick_positions])
+        _apply_tick_font(self.ax1)
+        _apply_tick_font(self.ax2)
+
+        peak_spend = max(data["spend"], default=0)
+        self.ax1.set_ylim(0, peak_spend * 1.28 if peak_spend > 0 else 1)
+        peak_requests = max(data["requests"], default=0)
+        self.ax2.set_ylim(0, peak_requests * 1.25 if peak_requests > 0 else 1)
+
+
+def create_usage_trend_chart(columns=None, days: int = 30, figsize=(6, 4), dpi=100) -> Figure:
+    """Generate daily spending and request count trend from locally synced call logs."""
+    return UsageTrendChart(figsize, dpi).render(columns=columns, days=days)
+
+
+# 图表名称 -> 可复用的模板类（其余图表每次重新构建）
+CHART_TEMPLATES = {
+    "balance": BalanceBarChart,
+    "recharge": RechargeTrendChart,
+    "checkin": CheckinActivityChart,
+    "usage": UsageTrendChart,
+}
+
+_templates = {}
+
+
+def get_chart_template(name: str, figsize=(6, 4), dpi=100) -> Optional[ChartTemplate]:
+    """
+    获取可复用的图表模板（同一进程内按 名称、尺寸、DPI 共用一个对象，非线程安全）
+
+    Returns:
+        ChartTemplate，该图表没有模板时为 None
+    """
+    template_cls = CHART_TEMPLATES.get(name)
+    if template_cls is None:
+        return None
+    key = (name, tuple(figsize), dpi)
+    template = _templates.get(key)
+    if template is None:
+        template = _templates[key] = template_cls(figsize, dpi)
+    return template
@@ -0,0 +1,206 @@
+"""签到日志模块 - 追加写入的 JSONL 签到日志
+
+签到日志保存在 config/checkin_log.jsonl，每条一行、按时间从旧到新追加，记录一次签到只写一行。
+文件超过大小上限（或条数达到保留条数的两倍）时压缩为最近的 keep 条。
+内存中按日期建立索引，"今天哪些站点已签到"只需查看当天的记录。
+首次使用时自动导入旧版 checkin_log.json（原文件保留不动）。
+"""
+
+import json
+import os
+import threading
+from collections import deque
+from itertools import islice
+from typing import Optional
+
+from konata_api.utils import get_exe_dir, atomic_write
+
+
+DEFAULT_KEEP = 500                        # 默认保留条数
+DEFAULT_MAX_FILE_BYTES = 512 * 1024       # 默认文件大小上限，超过后压缩
+
+
+def get_checkin_journal_path() -> str:
+    """获取签到日志文件路径"""
+    return os.path.join(get_exe_dir(), "config", "checkin_log.jsonl")
+
+
+def get_legacy_checkin_log_path() -> str:
+    """旧版签到日志文件路径（整体读写的 JSON 数组，最新的在前）"""
+    return os.path.join(get_exe_dir(), "config", "checkin_log.json")
+
+
+def _record_day(record: dict) -> str:
+    return str(record.get("time", ""))[:10]
+
+
+class CheckinJournal:
+    """
+    签到日志（线程安全）
+
+    Args:
+        path: 日志文件路径，留空使用 config/checkin_log.jsonl
+        keep: 保留条数
+        max_file_bytes: 文件大小上限，超过后压缩为最近 keep 条
+    """
+
+    def __init__(self, path: Optional[str] = None, keep: int = DEFAULT_KEEP, max_file_bytes: int = DEFAULT_MAX_FILE_BYTES):
+        self.path = path or get_checkin_journal_path()
+        self.keep = max(1, int(keep))
+        self.max_file_bytes = max(1024, int(max_file_bytes))
+        self._lock = threading.RLock()
+        self._records = None   # deque，从旧到新，最多 keep 条
+        self._by_day = {}      # "YYYY-MM-DD" -> [记录, ...]
+        self._line_count = 0   # 文件中的行数（含超出 keep 尚未压缩的）
+        self._file_state = None
+        self._needs_newline = False
+        self._version = 0      # 内存中的记录每次变化加 1
+
+    def configure(self, keep: int = None, max_file_bytes: int = None):
+        """修改保留条数 / 文件大小上限（下次写入时生效）"""
+        with self._lock:
+            if keep is not None and max(1, int(keep)) != self.keep:
+                self.keep = max(1, int(keep))
+                if self._records is not None:
+                    self._set_records(self._records)
+            if max_file_bytes is not None:
+                self.max_file_bytes = max(1024, int(max_file_bytes))
+
+    # === 读取 ===
+
+    def _stat(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _set_records(self, records: list):
+        self._version += 1
+        self._records = deque(list(records)[-self.keep:])
+        self._by_day = {}
+        for record in self._records:
+            self._by_day.setdefault(_record_day(record), []).append(record)
+
+    def _ensure_loaded(self):
+        """首次访问或文件被外部修改后重新读取"""
+        state = self._stat()
+        if self._records is not None and state == self._file_state:
+            return
+        if state is None:
+            self._file_state = None
+            self._line_count = 0
+            self._set_records(self._import_legacy())
+            return
+
+        with open(self.path, "rb") as f:
+            content = f.read()
+        # 上次写入中断留下的半行：之后追加的记录需另起一行
+        self._needs_newline = bool(content) and not content.endswith(b"\n")
+        records = []
+        for line in content.split(b"\n"):
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+        self._line_count = len(records)
+        self._file_state = state
+        self._set_records(records)
+
+    def _import_legacy(self) -> list:
+        """导入旧版 checkin_log.json（最新的在前），写入新文件"""
+        legacy_path = os.path.join(os.path.dirname(self.path), os.path.basename(get_legacy_checkin_log_path()))
+        try:
+            with open(legacy_path, "r", encoding="utf-8") as f:
+                legacy = json.load(f)
+        except (json.JSONDecodeError, IOError, OSError):
+            return []
+        if not isinstance(legacy, list) or not legacy:
+            return []
+        records = list(reversed(legacy))[-self.keep:]
+        self._rewrite(records)
+        return records
+
+    @property
+    def version(self) -> int:
+        """数据版本（追加、替换或文件被外部修改后变化），用于缓存解析结果"""
+        with self._lock:
+            self._ensure_loaded()
+            return self._version
+
+    def load(self, limit: Optional[int] = None) -> list:
+        """读取签到日志（从新到旧）"""
+        with self._lock:
+            self._ensure_loaded()
+            return list(islice(reversed(self._records), limit))
+
+    def records_on(self, day: str) -> list:
+        """某天（YYYY-MM-DD）的签到日志（从旧到新）"""
+        with self._lock:
+            self._ensure_loaded()
+            return list(self._by_day.get(day, []))
+
+    def site_ids_on(self, day: str) -> set:
+        """某天签到成功的站点ID集合"""
+        with self._lock:
+            self._ensure_loaded()
+            return {r.get("site_id") for r in self._by_day.get(day, []) if r.get("success")}
+
+    # === 写入 ===
+
+    def _rewrite(self, records: list) -> bool:
+        """原子地重写整个文件"""
+        payload = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records).encode("utf-8")
+        try:
+            # 原子写入，压缩中途退出不会截断签到日志
+            atomic_write(self.path, payload)
+        except OSError:
+            return False
+        self._line_count = len(records)
+        self._needs_newline = False
+        self._file_state = self._stat()
+        return True
+
+    def append(self, record: dict) -> bool:
+        """追加一条签到日志，必要时压缩文件"""
+        with self._lock:
+            self._ensure_loaded()
+            line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+            if self._needs_newline:
+                line = b"\n" + line
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                with open(self.path, "ab") as f:
+                    f.write(line)
+            except OSError:
+                return False
+
+            self._needs_newline = False
+            self._line_count += 1
+            self._version += 1
+            self._records.append(record)
+            self._by_day.setdefault(_record_day(record), []).append(record)
+            if len(self._records) > self.keep:
+                dropped = self._records.popleft()
+                same_day = self._by_day.get(_record_day(dropped), [])
+                if same_day and same_day[0] is dropped:
+                    same_day.pop(0)
+                if not same_day:
+                    self._by_day.pop(_record_day(dropped), None)
+
+            self._file_state = self._stat()
+            size = self._file_state[1] if self._file_state else 0
+            if self._line_count > self.keep and (size > self.max_file_bytes or self._line_count >= 2 * self.keep):
+                self._rewrite(self._records)
+            return True
+
+    def replace(self, records: list) -> bool:
+        """用给定的日志（从新到旧）替换全部签到日志"""
+        with self._lock:
+            ordered = list(reversed(records))[-self.keep:]
+            if not self._rewrite(ordered):
+                return False
+            self._set_records(ordered)
+            return True
@@ -22,6 +22,8 @@ import sys
 from typing import Callable, Optional, Generator
 import httpx
 
+from konata_api.http_pool import get_client
+
 
 # ============ 默认配置 ============
 
@@ -260,6 +262,65 @@ def run_model_detection_gui(
 
 # ============ 连通性测试 ============
 
+def _build_connectivity_request(url: str, api_key: str = "") -> tuple:
+    """构建连通性测试请求，返回 (base, models_url, headers)"""
+    base = url.rstrip("/")
+
+    headers = {}
+    if api_key:
+        headers["Authorization"] = f"Bearer {api_key}"
+    return base, f"{base}/v1/models", headers
+
+
+def _parse_connectivity_response(resp, latency_ms: float) -> dict:
+    """解析 /v1/models 响应（同步/异步客户端共用）"""
+    models = []
+    if resp.status_code == 200:
+        try:
+            data = resp.json()
+            if "data" in data:
+                models = [m.get("id", "") for m in data["data"] if m.get("id")]
+        except (ValueError, KeyError, TypeError):
+            pass
+
+        return {
+            "success": True,
+            "message": f"连接成功，认证有效",
+            "latency_ms": latency_ms,
+            "models": models
+        }
+    elif resp.status_code == 401:
+        return {
+            "success": True,
+            "message": f"服务器在线，但 API Key 无效",
+            "latency_ms": latency_ms,
+            "models": []
+        }
+    else:
+        return {
+            "success": True,
+            "message": f"服务器在线 (HTTP {resp.status_code})",
+            "latency_ms": latency_ms,
+            "models": []
+        }
+
+
+def _connectivity_error(error: Exception, base: str) -> dict:
+    """将连通性测试中的异常转换为结果字典"""
+    if isinstance(error, httpx.ConnectError):
+        message = f"连接失败：无法连接到 {base}"
+    elif isinstance(error, httpx.TimeoutException):
+        message = "连接超时"
+    else:
+        message = f"连接异常：{str(error)}"
+    return {
+        "success": False,
+        "message": message,
+        "latency_ms": 0,
+        "models": []
+    }
+
+
 def test_connectivity(url: str, api_key: str = "", timeout: float = 10.0) -> dict:
     """
     测试站点连通性
@@ -273,68 +334,15 @@ def test_connectivity(url: str, api_key: str = "", timeout: float = 10.0) -> dic
         dict: {"success": bool, "message": str, "latency_ms": float, "models": list}
     """
     import time
-    base = url.rstrip("/")
-
-    headers = {}
-    if api_key:
-        headers["Authorization"] = f"Bearer {api_key}"
+    base, models_url, headers = _build_connectivity_request(url, api_key)
 
     try:
         start_time = time.time()
-        with httpx.Client(timeout=timeout) as client:
-            resp = client.get(f"{base}/v1/models", headers=headers)
-            latency_ms = (time.time() - start_time) * 1000
-
-            models = []
-            if resp.status_code == 200:
-                try:
-                    data = resp.json()
-                    if "data" in data:
-                        models = [m.get("id", "") for m in data["data"] if m.get("id")]
-                except (ValueError, KeyError, TypeError):
-                    pass
-
-                return {
-                    "success": True,
-                    "message": f"连接成功，认证有效",
-                    "latency_ms": latency_ms,
-                    "models": models
-                }
-            elif resp.status_code == 401:
-                return {
-                    "success": True,
-                    "message": f"服务器在线，但 API Key 无效",
-                    "latency_ms": latency_ms,
-                    "models": []
-                }
-            else:
-                return {
-                    "success": True,
-                    "message": f"服务器在线 (HTTP {resp.status_code})",
-                    "latency_ms": latency_ms,
-                    "models": []
-                }
-    except httpx.ConnectError:
-        return {
-            "success": False,
-            "message": f"连接失败：无法连接到 {base}",
-            "latency_ms": 0,
-            "models": []
-        }
-    except httpx.TimeoutException:
-        return {
-            "success": False,
-            "message": "连接超时",
-            "latency_ms": 0,
-            "models": []
-        }
+        resp = get_client(base).get(models_url, headers=headers, timeout=timeout)
+        latency_ms = (time.time() - start_time) * 1000
+        return _parse_connectivity_response(resp, latency_ms)
     except Exception as e:
-        return {
-            "success": False,
-            "message": f"连接异常：{str(e)}",
-            "latency_ms": 0,
-            "models": []
-        }
+        return _connectivity_error(e, base)
 
 
 # ============ 流式请求（GUI 回调版） ============
@@ -380,80 +388,81 @@ def send_request_stream(
     full_response = ""
 
     try:
-        with httpx.Client(timeout=600.0) as client:
-            with client.stream(
-                "POST",
-                url,
-                headers=headers,
-                json=body,
-                params={"beta": "true"}
-            ) as response:
-
-                if response.status_code != 200:
-                    error = response.read().decode('utf-8')
-                    if on_status:
-                        on_status(f"❌ 请求失败 [{response.status_code}]: {error}")
-                    return ""
-
+        client = get_client(url)
+        with client.stream(
+            "POST",
+            url,
+            headers=headers,
+            json=body,
+            params={"beta": "true"},
+            timeout=600.0
+        ) as response:
+
+            if response.status_code != 200:
+                error = response.read().decode('utf-8')
                 if on_status:
-                    on_status(f"✅ 连接成功，等待响应...")
-
-                in_thinking = False
-                buffer = ""
-
-                for chunk in response.iter_bytes():
-                    buffer += chunk.decode('utf-8', errors='ignore')
-
-                    while '\n' in buffer:
-                        line, buffer = buffer.split('\n', 1)
-                        line = line.strip()
-
-                        if not line.startswith("data: "):
-                            continue
-
-                        data = line[6:]
-                        if data == "[DONE]":
-                            break
-
-                        try:
-                            event = json.loads(data)
-                            event_type = event.get("type", "")
-
-                            if event_type == "content_block_start":
-                                block = event.get("content_block", {})
-                                if block.get("type") == "thinking":
-                                    in_thinking = True
-                                    if on_status:
-                                        on_status("[💭 思考中...]")
-                                elif block.get("type") == "text":
-                                    if in_thinking:
-                                        in_thinking = False
-                                    if on_status:
-                                        on_status("[💬 回复中...]")
-
-                            elif event_type == "content_block_delta":
-                                delta = event.get("delta", {})
-                                if delta.get("type") == "text_delta":
-                                    text = delta.get("text", "")
-                                    full_response += text
-                                    if on_text:
-                                        on_text(text)
-                                elif delta.get("type") == "thinking_delta":
-                                    if on_thinking:
-                                        on_thinking(delta.get("thinking", ""))
-
-                            elif event_type == "message_start":
-                                usage = event.get("message", {}).get("usage", {})
-                                if usage and on_status:
-                                    on_status(f"[📊 输入 tokens: {usage.get('input_tokens', 'N/A')}]")
-
-                            elif event_type == "message_delta":
-                                usage = event.get("usage", {})
-                                if usage and on_status:
-                                    on_status(f"[📊 输出 tokens: {usage.get('output_tokens', 'N/A')}]")
-
-                        except json.JSONDecodeError:
-                            pass
+                    on_status(f"❌ 请求失败 [{response.status_code}]: {error}")
+                return ""
+
+            if on_status:
+                on_status(f"✅ 连接成功，等待响应...")
+
+            in_thinking = False
+            buffer = ""
+
+            for chunk in response.iter_bytes():
+                buffer += chunk.decode('utf-8', errors='ignore')
+
+                while '\n' in buffer:
+                    line, buffer = buffer.split('\n', 1)
+                    line = line.strip()
+
+                    if not line.startswith("data: "):
+                        continue
+
+                    data = line[6:]
+                    if data == "[DONE]":
+                        break
+
+                    try:
+                        event = json.loads(data)
+                        event_type = event.get("type", "")
+
+                        if event_type == "content_block_start":
+                            block = event.get("content_block", {})
+                            if block.get("type") == "thinking":
+                                in_thinking = True
+                                if on_status:
+                                    on_status("[💭 思考中...]")
+                            elif block.get("type") == "text":
+                                if in_thinking:
+                                    in_thinking = False
+                                if on_status:
+                                    on_status("[💬 回复中...]")
+
+                        elif event_type == "content_block_delta":
+                            delta = event.get("delta", {})
+                            if delta.get("type") == "text_delta":
+                                text = delta.get("text", "")
+                                full_response += text
+                                if on_text:
+                                    on_text(text)
+                            elif delta.get("type") == "thinking_delta":
+                                if on_thinking:
+                                    on_thinking(delta.get("thinking", ""))
+
+                        elif event_type == "message_start":
+                            usage = event.get("message", {}).get("usage", {})
+                            if usage and on_status:
+                                on_status(f"[📊 输入 tokens: {usage.get('input_tokens', 'N/A')}]")
+
+                        elif event_type == "message_delta":
+                            usage = event.get("usage", {})
+                            if usage and on_status:
+                                on_status(f"[📊 输出 tokens: {usage.get('output_tokens', 'N/A')}]")
+
+                    except json.JSONDecodeError:
+                        pass
 
         if on_complete:
             on_complete(full_response)
@@ -504,80 +513,81 @@ def send_request(
     full_response = ""
 
     try:
-        with httpx.Client(timeout=600.0) as client:
-            with client.stream(
-                "POST",
-                url,
-                headers=headers,
-                json=body,
-                params={"beta": "true"}
-            ) as response:
-
-                if response.status_code != 200:
-                    error = response.read().decode('utf-8')
-                    print(f"❌ 请求失败 [{response.status_code}]: {error}")
-                    return ""
-
-                in_thinking = False
-                buffer = ""
-
-                # 使用 iter_bytes 手动处理流
-                for chunk in response.iter_bytes():
-                    buffer += chunk.decode('utf-8', errors='ignore')
-
-                    # 按行分割处理
-                    while '\n' in buffer:
-                        line, buffer = buffer.split('\n', 1)
-                        line = line.strip()
-
-                        if not line.startswith("data: "):
-                            continue
-
-                        data = line[6:]
-                        if data == "[DONE]":
-                            break
-
-                        try:
-                            event = json.loads(data)
-                            event_type = event.get("type", "")
-
-                            if event_type == "content_block_start":
-                                block = event.get("content_block", {})
-                                if block.get("type") == "thinking":
-                                    in_thinking = True
-                                    if show_thinking:
-                                        print("[💭 思考]")
-                                        print("-" * 40)
-                                elif block.get("type") == "text":
-                                    if in_thinking:
-                                        in_thinking = False
-                                        if show_thinking:
-                                            print("\n" + "-" * 40)
-                                    print("\n[💬 回复]")
+        client = get_client(url)
+        with client.stream(
+            "POST",
+            url,
+            headers=headers,
+            json=body,
+            params={"beta": "true"},
+            timeout=600.0
+        ) as response:
+
+            if response.status_code != 200:
+                error = response.read().decode('utf-8')
+                print(f"❌ 请求失败 [{response.status_code}]: {error}")
+                return ""
+
+            in_thinking = False
+            buffer = ""
+
+            # 使用 iter_bytes 手动处理流
+            for chunk in response.iter_bytes():
+                buffer += chunk.decode('utf-8', errors='ignore')
+
+                # 按行分割处理
+                while '\n' in buffer:
+                    line, buffer = buffer.split('\n', 1)
+                    line = line.strip()
+
+                    if not line.startswith("data: "):
+                        continue
+
+                    data = line[6:]
+                    if data == "[DONE]":
+                        break
+
+                    try:
+                        event = json.loads(data)
+                        event_type = event.get("type", "")
+
+                        if event_type == "content_block_start":
+                            block = event.get("content_block", {})
+                            if block.get("type") == "thinking":
+                                in_thinking = True
+                                if show_thinking:
+                                    print("[💭 思考]")
                                     print("-" * 40)
-
-                            elif event_type == "content_block_delta":
-                                delta = event.get("delta", {})
-                                if delta.get("type") == "text_delta":
-                                    text = delta.get("text", "")
-                                    print(text, end="", flush=True)
-                                    full_response += text
-                                elif delta.get("type") == "thinking_delta":
+                            elif block.get("type") == "text":
+                                if in_thinking:
+                                    in_thinking = False
                                     if show_thinking:
-                                        print(delta.get("thinking", ""), end="", flush=True)
-
-                            elif event_type == "message_start":
-                                usage = event.get("message", {}).get("usage", {})
-                                if usage:
-                                    print(f"[📊 输入 tokens: {usage.get('input_tokens', 'N/A')}]")
-
-                            elif event_type == "message_delta":
-                                usage = event.get("usage", {})
-                                if usage:
-                                    print(f"\n[📊 输出 tokens: {usage.get('output_tokens', 'N/A')}]")
-
-                        except json.JSONDecodeError:
-                            pass
+                                        print("\n" + "-" * 40)
+                                print("\n[💬 回复]")
+                                print("-" * 40)
+
+                        elif event_type == "content_block_delta":
+                            delta = event.get("delta", {})
+                            if delta.get("type") == "text_delta":
+                                text = delta.get("text", "")
+                                print(text, end="", flush=True)
+                                full_response += text
+                            elif delta.get("type") == "thinking_delta":
+                                if show_thinking:
+                                    print(delta.get("thinking", ""), end="", flush=True)
+
+                        elif event_type == "message_start":
+                            usage = event.get("message", {}).get("usage", {})
+                            if usage:
+                                print(f"[📊 输入 tokens: {usage.get('input_tokens', 'N/A')}]")
+
+                        elif event_type == "message_delta":
+                            usage = event.get("usage", {})
+                            if usage:
+                                print(f"\n[📊 输出 tokens: {usage.get('output_tokens', 'N/A')}]")
+
+                    except json.JSONDecodeError:
+                        pass
 
         print(f"\n{'='*60}\n")
         return full_response
@@ -0,0 +1,92 @@
+"""调试日志模块 - 后台写入的请求调试日志
+
+log_debug 只把消息放入内存队列，由后台线程写入 debug/requests.log（按大小轮转）。
+是否启用由 config.json 的 debug.enable_api_log 决定（读取缓存的配置快照，
+配置文件变化后自动刷新），在设置中修改后无需重启即可生效。程序退出时写入队列中剩余的日志。
+"""
+
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+
+from konata_api.utils import get_exe_dir, get_config_snapshot
+
+
+LOG_MAX_BYTES = 2 * 1024 * 1024  # 单个日志文件上限
+LOG_BACKUP_COUNT = 3             # 保留的历史日志文件数
+
+_logger = logging.getLogger("konata_api.requests")
+_logger.setLevel(logging.INFO)
+_logger.propagate = False
+
+_lock = threading.Lock()
+_listener = None
+_queue_handler = None
+
+
+class _QuietRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """写入失败时静默忽略（调试日志不应影响正常请求）"""
+
+    def handleError(self, record):
+        pass
+
+
+def is_enabled() -> bool:
+    """是否启用请求调试日志"""
+    return bool(get_config_snapshot().get("debug", {}).get("enable_api_log", False))
+
+
+def _ensure_listener():
+    """首次写日志时创建队列和后台写入线程"""
+    global _listener, _queue_handler
+    with _lock:
+        if _listener is not None:
+            return
+        try:
+            log_dir = os.path.join(get_exe_dir(), "debug")
+            os.makedirs(log_dir, exist_ok=True)
+            file_handler = _QuietRotatingFileHandler(
+                os.path.join(log_dir, "requests.log"),
+                maxBytes=LOG_MAX_BYTES,
+                backupCount=LOG_BACKUP_COUNT,
+                encoding="utf-8",
+                delay=True,
+            )
+        except OSError:
+            return
+        file_handler.setFormatter(logging.Formatter("[%(asctime)s] %(message)s", datefmt="%Y-%m-%d %H:%M:%S"))
+
+        log_queue = queue.SimpleQueue()
+        _queue_handler = logging.handlers.QueueHandler(log_queue)
+        _logger.addHandler(_queue_handler)
+        _listener = logging.handlers.QueueListener(log_queue, file_handler)
+        _listener.start()
+
+
+def log_debug(message: str):
+    """记录一条请求调试日志（未启用时直接返回）"""
+    if not is_enabled():
+        return
+    _ensure_listener()
+    _logger.info(message)
+
+
+def flush():
+    """写入队列中剩余的日志并关闭日志文件（之后再记录会重新打开）"""
+    global _listener, _queue_handler
+    with _lock:
+        listener, handler = _listener, _queue_handler
+        _listener = None
+        _queue_handler = None
+    if handler is not None:
+        _logger.removeHandler(handler)
+    if listener is not None:
+        listener.stop()
+        for file_handler in listener.handlers:
+            file_handler.close()
+
+
+atexit.register(flush)
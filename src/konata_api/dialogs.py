@@ -5,6 +5,7 @@ from ttkbootstrap.constants import *
 from ttkbootstrap.scrolled import ScrolledFrame
 from ttkbootstrap.widgets.scrolled import ScrolledText
 from tkinter import messagebox, Button
+import bisect
 import json
 
 from konata_api.utils import (
@@ -578,7 +579,7 @@ class ProfileAdvancedDialog:
 
 class BalanceSummaryDialog:
     """批量查询汇总统计对话框"""
-    def __init__(self, parent, summary_data, low_balance_threshold=10):
+    def __init__(self, parent, summary_data, low_balance_threshold=10, total=None, on_cancel=None, depletion_warning_days=3):
         """
         summary_data 格式:
         {
@@ -591,12 +592,23 @@ class BalanceSummaryDialog:
                 {"name": "站点C", "balance": 0, "unit": "", "today_cost": 0, "error": "连接超时"},
             ]
         }
+
+        total: 批量查询进行中时传入站点总数，之后通过 add_site / set_progress / finish 逐步更新
+        on_cancel: 查询进行中点击「取消查询」时的回调
+        depletion_warning_days: 站点数据带有 forecast（见 balance_forecast）时，预计这么多天内耗尽也列入警告
         """
         self.summary_data = summary_data
         self.threshold = low_balance_threshold
+        self.total = total
+        self.on_cancel = on_cancel
+        self.depletion_days = depletion_warning_days
+        self.site_rows = {}  # 站点ID -> 表格行
+        self.totals = {"balance_by_unit": {}, "total_today_cost": 0}
+        self.summary_labels = []   # 汇总区的标签（按行）
+        self.warning_labels = []   # (余额, 标签)，按余额从低到高
         self.dialog = ttk.Toplevel(parent)
         self.dialog.title("📊 批量查询汇总统计")
-        fit_toplevel(self.dialog, preferred_width=720, preferred_height=620, min_width=600, min_height=500)
+        fit_toplevel(self.dialog, preferred_width=820, preferred_height=620, min_width=640, min_height=500)
         self.dialog.resizable(True, True)
 
         # 设置窗口图标
@@ -619,28 +631,31 @@ class BalanceSummaryDialog:
         stats_frame = ttk.Labelframe(main_frame, text=" 站点统计 ", padding=10)
         stats_frame.pack(fill=X, pady=(0, 10))
 
-        success = self.summary_data.get("success", 0)
-        failed = self.summary_data.get("failed", 0)
-        skipped = self.summary_data.get("skipped", 0)
-        total = success + failed + skipped
+        self.stats_label = ttk.Label(stats_frame, font=("Microsoft YaHei", 10))
+        self.stats_label.pack(anchor=W)
 
-        stats_text = f"✅ 成功: {success}    ❌ 失败: {failed}    ⚠️ 跳过: {skipped}    📊 总计: {total}"
-        ttk.Label(stats_frame, text=stats_text, font=("Microsoft YaHei", 10)).pack(anchor=W)
+        # 查询进度（仅在查询进行中显示）
+        self.progress_var = ttk.DoubleVar(value=0)
+        self.progress_bar = ttk.Progressbar(stats_frame, variable=self.progress_var, maximum=max(self.total or 1, 1), bootstyle="info-striped")
+        if self.total is not None:
+            self.progress_bar.pack(fill=X, pady=(8, 0))
 
         # === 各站点详情表格 ===
         detail_frame = ttk.Labelframe(main_frame, text=" 各站点详情 ", padding=10)
         detail_frame.pack(fill=BOTH, expand=YES, pady=(0, 10))
 
-        columns = ("name", "balance", "today_cost", "status")
+        columns = ("name", "balance", "today_cost", "depletion", "status")
         self.detail_tree = ttk.Treeview(detail_frame, columns=columns, show="headings", height=10, bootstyle="info")
         self.detail_tree.heading("name", text="站点名称")
         self.detail_tree.heading("balance", text="余额")
         self.detail_tree.heading("today_cost", text="今日消耗")
+        self.detail_tree.heading("depletion", text="预计耗尽")
         self.detail_tree.heading("status", text="状态")
 
         self.detail_tree.column("name", width=150)
         self.detail_tree.column("balance", width=120)
         self.detail_tree.column("today_cost", width=100)
+        self.detail_tree.column("depletion", width=110)
         self.detail_tree.column("status", width=100)
 
         # 滚动条
@@ -653,14 +668,58 @@ class BalanceSummaryDialog:
         self.populate_detail_tree()
 
         # === 汇总统计 ===
-        summary_frame = ttk.Labelframe(main_frame, text=" 汇总 ", padding=10)
-        summary_frame.pack(fill=X, pady=(0, 10))
+        self.summary_frame = ttk.Labelframe(main_frame, text=" 汇总 ", padding=10)
+        self.summary_frame.pack(fill=X, pady=(0, 10))
+
+        # === 低余额警告（有低余额站点时显示） ===
+        self.warning_frame = ttk.Labelframe(
+            main_frame, text=f" ⚠️ 低余额警告 (阈值: ${self.threshold}，或预计 {self.depletion_days} 天内耗尽) ",
+            padding=10, bootstyle="warning"
+        )
+
+        # === 底部按钮 ===
+        self.btn_frame = ttk.Frame(main_frame)
+        self.btn_frame.pack(fill=X)
+
+        ttk.Button(self.btn_frame, text="关闭", command=self.dialog.destroy, bootstyle="secondary", width=12).pack(side=RIGHT)
+        self.cancel_btn = ttk.Button(self.btn_frame, text="取消查询", command=self.cancel_query, bootstyle="danger-outline", width=12)
+        if self.total is not None and self.on_cancel:
+            self.cancel_btn.pack(side=RIGHT, padx=(0, 10))
+
+        self.refresh_stats()
+
+    def refresh_stats(self):
+        """完整刷新站点统计、汇总和低余额警告（重新遍历全部站点）"""
+        self.totals = self.calculate_totals()
+        self.update_stats_label()
+        self.show_summary()
+
+        for child in self.warning_frame.winfo_children():
+            child.destroy()
+        self.warning_labels = []
+        for site in self.get_low_balance_sites():
+            self.add_warning(site)
+        if not self.warning_labels:
+            self.warning_frame.pack_forget()
+
+    def update_stats_label(self):
+        """更新成功 / 失败 / 跳过计数"""
+        success = self.summary_data.get("success", 0)
+        failed = self.summary_data.get("failed", 0)
+        skipped = self.summary_data.get("skipped", 0)
+        done = success + failed + skipped
 
-        totals = self.calculate_totals()
+        stats_text = f"✅ 成功: {success}    ❌ 失败: {failed}    ⚠️ 跳过: {skipped}    📊 总计: {done}"
+        if self.total is not None:
+            stats_text += f"    ⏳ 进度: {done}/{self.total}"
+        self.stats_label.configure(text=stats_text)
+
+    def show_summary(self):
+        """按 self.totals 显示汇总（已有的标签直接改文字，不重新创建）"""
         summary_lines = []
 
         # 按币种显示总余额
-        for unit, amount in totals["balance_by_unit"].items():
+        for unit, amount in self.totals["balance_by_unit"].items():
             if unit == "USD" or unit == "CNY" or unit == "":
                 symbol = "$" if unit == "USD" else ("¥" if unit == "CNY" else "$")
                 summary_lines.append(f"💵 总余额 {unit or 'USD'}: {symbol}{amount:,.2f}")
@@ -670,104 +729,212 @@ class BalanceSummaryDialog:
                 summary_lines.append(f"💰 总余额 {unit}: {amount:,.2f}")
 
         # 总消耗
-        if totals["total_today_cost"] > 0:
-            summary_lines.append(f"📊 今日总消耗: ${totals['total_today_cost']:,.2f}")
-
-        for line in summary_lines:
-            ttk.Label(summary_frame, text=line, font=("Microsoft YaHei", 10)).pack(anchor=W, pady=2)
-
-        if not summary_lines:
-            ttk.Label(summary_frame, text="暂无汇总数据", font=("Microsoft YaHei", 10), bootstyle="secondary").pack(anchor=W)
-
-        # === 低余额警告 ===
-        low_balance_sites = self.get_low_balance_sites()
-        if low_balance_sites:
-            warning_frame = ttk.Labelframe(main_frame, text=f" ⚠️ 低余额警告 (阈值: ${self.threshold}) ", padding=10, bootstyle="warning")
-            warning_frame.pack(fill=X, pady=(0, 10))
-
-            for site in low_balance_sites:
-                ttk.Label(
-                    warning_frame,
-                    text=f"• {site['name']}: ${site['balance']:.2f}",
-                    font=("Microsoft YaHei", 10),
-                    bootstyle="warning"
-                ).pack(anchor=W)
-
-        # === 底部按钮 ===
-        btn_frame = ttk.Frame(main_frame)
-        btn_frame.pack(fill=X)
-
-        ttk.Button(btn_frame, text="关闭", command=self.dialog.destroy, bootstyle="secondary", width=12).pack(side=RIGHT)
+        if self.totals["total_today_cost"] > 0:
+            summary_lines.append(f"📊 今日总消耗: ${self.totals['total_today_cost']:,.2f}")
+
+        lines = [(line, "default") for line in summary_lines] or [("暂无汇总数据", "secondary")]
+        for index, (text, style) in enumerate(lines):
+            if index < len(self.summary_labels):
+                label = self.summary_labels[index]
+                label.configure(text=text, bootstyle=style)
+            else:
+                label = ttk.Label(self.summary_frame, text=text, font=("Microsoft YaHei", 10), bootstyle=style)
+                label.pack(anchor=W, pady=2)
+                self.summary_labels.append(label)
+        for label in self.summary_labels[len(lines):]:
+            label.destroy()
+        del self.summary_labels[len(lines):]
+
+    def add_warning(self, site):
+        """在低余额警告中按余额从低到高的位置插入一个站点"""
+        text = f"• {site['name']}: {self.fmt_balance(site.get('balance', 0), site.get('unit', 'USD'))}"
+        forecast = site.get("forecast") or {}
+        if forecast.get("days_to_zero") is not None:
+            rate = self.fmt_balance(forecast["rate_per_day"], site.get("unit", "USD"))
+            text += f"（日均消耗 {rate}，预计 {self.fmt_duration(forecast['days_to_zero'])}后耗尽）"
+        label = ttk.Label(self.warning_frame, text=text, font=("Microsoft YaHei", 10), bootstyle="warning")
+
+        balance = site.get("balance", 0)
+        index = bisect.bisect_right([key for key, _ in self.warning_labels], balance)
+        if index < len(self.warning_labels):
+            label.pack(anchor=W, before=self.warning_labels[index][1])
+        else:
+            label.pack(anchor=W)
+        self.warning_labels.insert(index, (balance, label))
+        if not self.warning_frame.winfo_ismapped():
+            self.warning_frame.pack(fill=X, pady=(0, 10), before=self.btn_frame)
 
     def populate_detail_tree(self):
         """填充站点详情表格"""
-        sites = self.summary_data.get("sites", [])
-
-        for site in sites:
-            name = site.get("name", "未命名")
-            balance = site.get("balance", 0)
-            unit = site.get("unit", "USD")
-            today_cost = site.get("today_cost", 0)
-            error = site.get("error")
-
-            # 格式化余额
-            if error:
-                balance_str = "-"
-                status = "❌ 失败"
-            elif unit == "Token":
-                balance_str = self.fmt_num(balance)
-                status = "✅ 成功"
-            else:
-                symbol = "$" if unit in ("USD", "") else ("¥" if unit == "CNY" else "")
-                balance_str = f"{symbol}{balance:,.2f}" if balance else "-"
-                status = "✅ 成功" if balance or balance == 0 else "⚠️ 无数据"
+        for site in self.summary_data.get("sites", []):
+            self.insert_site_row(site)
+
+    def insert_site_row(self, site):
+        """在详情表格中插入一个站点"""
+        name = site.get("name", "未命名")
+        balance = site.get("balance", 0)
+        unit = site.get("unit", "USD")
+        today_cost = site.get("today_cost", 0)
+        error = site.get("error")
+
+        # 格式化余额
+        if error:
+            balance_str = "-"
+            status = "❌ 失败"
+        elif unit == "Token":
+            balance_str = self.fmt_num(balance)
+            status = "✅ 成功"
+        else:
+            symbol = "$" if unit in ("USD", "") else ("¥" if unit == "CNY" else "")
+            balance_str = f"{symbol}{balance:,.2f}" if balance else "-"
+            status = "✅ 成功" if balance or balance == 0 else "⚠️ 无数据"
+
+        # 格式化今日消耗
+        today_cost_str = f"${today_cost:.2f}" if today_cost > 0 else "-"
+
+        # 低余额 / 即将耗尽标记
+        if not error and self.is_low_balance(site):
+            name = f"⚠️ {name}"
+
+        item = self.detail_tree.insert(
+            "", "end", values=(name, balance_str, today_cost_str, self.fmt_depletion(site.get("forecast")), status)
+        )
+        if site.get("site_id"):
+            self.site_rows[site["site_id"]] = item
 
-            # 格式化今日消耗
-            today_cost_str = f"${today_cost:.2f}" if today_cost > 0 else "-"
+    # === 批量查询进行中的增量更新 ===
 
-            # 低余额标记
-            if not error and unit in ("USD", "CNY", "") and balance < self.threshold and balance > 0:
-                name = f"⚠️ {name}"
+    def is_open(self):
+        """对话框是否仍然打开"""
+        try:
+            return bool(self.dialog.winfo_exists())
+        except Exception:
+            return False
 
-            self.detail_tree.insert("", "end", values=(name, balance_str, today_cost_str, status))
+    def add_site(self, site_data, outcome):
+        """
+        追加一个已完成的站点
 
-    def calculate_totals(self):
-        """计算汇总数据"""
-        balance_by_unit = {}
-        total_today_cost = 0
+        Args:
+            site_data: 站点汇总数据（格式同 summary_data["sites"] 中的元素）
+            outcome: "success" / "failed" / "skipped"
+        """
+        self.summary_data.setdefault("sites", []).append(site_data)
+        self.summary_data[outcome] = self.summary_data.get(outcome, 0) + 1
+        if not self.is_open():
+            return
+        # 只处理新完成的站点（每完成一个都重新遍历全部站点，大批量时为 O(n²)），结束时再完整刷新
+        self.insert_site_row(site_data)
+        self.add_to_totals(self.totals, site_data)
+        self.update_stats_label()
+        self.show_summary()
+        if not site_data.get("error") and self.is_low_balance(site_data):
+            self.add_warning(site_data)
+
+    def update_forecasts(self, forecasts):
+        """
+        更新各站点的耗尽预测
 
+        Args:
+            forecasts: 站点ID -> 预测结果（见 BalanceForecaster.forecast）
+        """
         for site in self.summary_data.get("sites", []):
-            if site.get("error"):
-                continue
-
-            balance = site.get("balance", 0)
-            unit = site.get("unit", "USD") or "USD"
-            today_cost = site.get("today_cost", 0)
-
-            if balance:
-                balance_by_unit[unit] = balance_by_unit.get(unit, 0) + balance
+            site_id = site.get("site_id")
+            if site_id in forecasts:
+                site["forecast"] = forecasts[site_id]
+        if not self.is_open():
+            return
+        for site_id, item in self.site_rows.items():
+            if site_id in forecasts:
+                self.detail_tree.set(item, "depletion", self.fmt_depletion(forecasts[site_id]))
+        self.refresh_stats()
+
+    def set_progress(self, completed, total):
+        """更新查询进度"""
+        if not self.is_open():
+            return
+        self.progress_bar.configure(maximum=max(total, 1))
+        self.progress_var.set(completed)
+
+    def finish(self, cancelled=False):
+        """批量查询结束：隐藏进度条和取消按钮"""
+        if not self.is_open():
+            return
+        self.total = None
+        self.progress_bar.pack_forget()
+        self.cancel_btn.pack_forget()
+        if cancelled:
+            self.dialog.title("📊 批量查询汇总统计（已取消）")
+        self.refresh_stats()
+
+    def cancel_query(self):
+        """取消正在进行的批量查询"""
+        self.cancel_btn.configure(state="disabled", text="正在取消...")
+        if self.on_cancel:
+            self.on_cancel()
 
-            if today_cost:
-                total_today_cost += today_cost
-
-        return {
-            "balance_by_unit": balance_by_unit,
-            "total_today_cost": total_today_cost
-        }
+    def calculate_totals(self):
+        """计算汇总数据"""
+        totals = {"balance_by_unit": {}, "total_today_cost": 0}
+        for site in self.summary_data.get("sites", []):
+            self.add_to_totals(totals, site)
+        return totals
+
+    @staticmethod
+    def add_to_totals(totals, site):
+        """把一个站点计入汇总数据"""
+        if site.get("error"):
+            return
+
+        balance = site.get("balance", 0)
+        unit = site.get("unit", "USD") or "USD"
+        today_cost = site.get("today_cost", 0)
+
+        if balance:
+            balance_by_unit = totals["balance_by_unit"]
+            balance_by_unit[unit] = balance_by_unit.get(unit, 0) + balance
+
+        if today_cost:
+            totals["total_today_cost"] += today_cost
+
+    def is_low_balance(self, site):
+        """余额低于阈值（只对 USD/CNY 类型判断），或按当前消耗速度预计很快耗尽"""
+        unit = site.get("unit", "USD")
+        balance = site.get("balance", 0)
+        if unit in ("USD", "CNY", "") and 0 < balance < self.threshold:
+            return True
+        days_to_zero = (site.get("forecast") or {}).get("days_to_zero")
+        return days_to_zero is not None and days_to_zero <= self.depletion_days
 
     def get_low_balance_sites(self):
         """获取低余额站点列表"""
-        low_sites = []
-        for site in self.summary_data.get("sites", []):
-            if site.get("error"):
-                continue
-            unit = site.get("unit", "USD")
-            balance = site.get("balance", 0)
-            # 只对 USD/CNY 类型判断低余额
-            if unit in ("USD", "CNY", "") and 0 < balance < self.threshold:
-                low_sites.append(site)
+        low_sites = [
+            site for site in self.summary_data.get("sites", [])
+            if not site.get("error") and self.is_low_balance(site)
+        ]
         return sorted(low_sites, key=lambda x: x.get("balance", 0))
 
+    def fmt_balance(self, amount, unit):
+        """按单位格式化金额"""
+        if unit == "Token":
+            return f"{self.fmt_num(amount)} Token"
+        symbol = "¥" if unit == "CNY" else "$"
+        return f"{symbol}{amount:,.2f}"
+
+    def fmt_duration(self, days):
+        """格式化剩余时间"""
+        if days < 1:
+            return f"{max(days * 24, 0):.0f} 小时"
+        if days < 365:
+            return f"{days:.1f} 天"
+        return "1 年以上"
+
+    def fmt_depletion(self, forecast):
+        """表格中的预计耗尽列"""
+        if not forecast or forecast.get("days_to_zero") is None:
+            return "-"
+        return self.fmt_duration(forecast["days_to_zero"])
+
     def fmt_num(self, n):
         """格式化大数字"""
         if n >= 1_000_000_000:
@@ -0,0 +1,143 @@
+"""HTTP 连接池模块 - 进程内共享的 keep-alive 客户端
+
+按 (协议+主机+端口, 代理) 复用客户端，同一中转站的重复请求不再重新握手。
+api.py 使用 requests.Session，站点测试模块使用 httpx.Client，两者共用同一份连接池配置。
+"""
+
+import threading
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+
+DEFAULT_POOL_LIMITS = {
+    "max_connections": 20,             # 每个主机最大并发连接数（httpx）
+    "max_keepalive_connections": 10,   # 每个主机保留的空闲连接数
+    "keepalive_expiry": 30.0,          # 空闲连接保留时间（秒，httpx）
+}
+
+_lock = threading.Lock()
+_limits = dict(DEFAULT_POOL_LIMITS)
+_sessions = {}  # (origin, proxy) -> requests.Session
+_clients = {}   # (origin, proxy) -> httpx.Client
+
+
+def _pool_key(url: str, proxy: str = "") -> tuple:
+    """客户端注册表的键：协议 + 主机 + 端口，加上代理设置"""
+    parts = urlsplit(url)
+    scheme = (parts.scheme or "http").lower()
+    host = (parts.hostname or "").lower()
+    port = parts.port or (443 if scheme == "https" else 80)
+    return f"{scheme}://{host}:{port}", proxy or ""
+
+
+def _reject_all_cookies() -> DefaultCookiePolicy:
+    """共享客户端不保存服务端下发的 Cookie，Cookie 认证统一由请求头显式传入"""
+    return DefaultCookiePolicy(allowed_domains=[])
+
+
+def _httpx_limits(limits_config: dict) -> httpx.Limits:
+    """按连接池配置构建 httpx.Limits"""
+    return httpx.Limits(
+        max_connections=int(limits_config["max_connections"]),
+        max_keepalive_connections=int(limits_config["max_keepalive_connections"]),
+        keepalive_expiry=float(limits_config["keepalive_expiry"]),
+    )
+
+
+def configure_pool(limits: dict = None):
+    """
+    设置连接池上限（通常来自 config.json 的 http_pool 字段）
+
+    配置变化时关闭已有客户端，后续请求按新配置重新创建
+    """
+    new_limits = dict(DEFAULT_POOL_LIMITS)
+    for key, value in (limits or {}).items():
+        if key in new_limits and isinstance(value, (int, float)) and value > 0:
+            new_limits[key] = value
+
+    with _lock:
+        if new_limits == _limits:
+            return
+        _limits.update(new_limits)
+    close_all()
+
+
+def get_pool_limits() -> dict:
+    """获取当前连接池上限"""
+    with _lock:
+        return dict(_limits)
+
+
+def get_session(url: str, proxy: str = "") -> requests.Session:
+    """获取指定主机共享的 requests.Session"""
+    key = _pool_key(url, proxy)
+    with _lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=int(_limits["max_keepalive_connections"]))
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.cookies.set_policy(_reject_all_cookies())
+            if proxy:
+                session.proxies = {"http": proxy, "https": proxy}
+            _sessions[key] = session
+        return session
+
+
+def get_client(url: str, proxy: str = "") -> httpx.Client:
+    """获取指定主机共享的 httpx.Client（超时时间由每次请求单独指定）"""
+    key = _pool_key(url, proxy)
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            limits = _httpx_limits(_limits)
+            # 直接传入 CookieJar（传 httpx.Cookies 会被复制到默认策略的新 jar）
+            cookies = CookieJar(policy=_reject_all_cookies())
+            if proxy:
+                # 显式代理：通过 transport 指定（未指定时保留环境变量代理）；
+                # httpx 0.26 之前 transport 只接受 httpx.Proxy，不接受字符串
+                transport = httpx.HTTPTransport(limits=limits, proxy=httpx.Proxy(proxy))
+                client = httpx.Client(transport=transport, cookies=cookies)
+            else:
+                client = httpx.Client(limits=limits, cookies=cookies)
+            _clients[key] = client
+        return client
+
+
+def create_async_client(proxy: str = "") -> httpx.AsyncClient:
+    """
+    创建使用相同连接池上限的 httpx.AsyncClient
+
+    异步客户端绑定事件循环，不放入共享注册表，由调用方负责关闭（推荐 async with）
+    """
+    limits = _httpx_limits(get_pool_limits())
+    cookies = CookieJar(policy=_reject_all_cookies())
+    if proxy:
+        transport = httpx.AsyncHTTPTransport(limits=limits, proxy=httpx.Proxy(proxy))
+        return httpx.AsyncClient(transport=transport, cookies=cookies)
+    return httpx.AsyncClient(limits=limits, cookies=cookies)
+
+
+def close_all():
+    """关闭所有共享客户端（程序退出时调用）"""
+    with _lock:
+        sessions = list(_sessions.values())
+        clients = list(_clients.values())
+        _sessions.clear()
+        _clients.clear()
+
+    for session in sessions:
+        try:
+            session.close()
+        except Exception:
+            pass
+    for client in clients:
+        try:
+            client.close()
+        except Exception:
+            pass
@@ -0,0 +1,376 @@
+"""日志分析模块 - 基于 NumPy 列式数组的调用日志统计
+
+把本地日志库（见 log_sync）中的调用日志加载为列式数组：每个字段一个 NumPy 数组，
+模型名和 Token 名按类别编码为整数。按模型 / Key / 小时 / 天分组汇总、消耗排行和分位数
+都是对整列的向量化运算（bincount / lexsort），不再逐条遍历字典，几十万条日志也能快速统计。
+"""
+
+import glob
+import json
+import os
+import time
+from typing import Iterable, Optional
+
+import numpy as np
+
+from konata_api.log_sync import LogStore, get_log_store_dir
+
+
+QUOTA_PER_USD = 500000                 # quota 单位：500000 = $1
+DEFAULT_PERCENTILES = (50, 90, 99)
+DEFAULT_TOP_N = 10
+
+UNKNOWN_MODEL = "未知"
+UNKNOWN_TOKEN = "-"
+
+# 分组维度：model / token 为类别，hour / day 为本地时间的连续时间段，hour_of_day 为一天中的 0-23 点
+GROUP_KEYS = ("model", "token", "hour", "day", "hour_of_day")
+NUMERIC_FIELDS = ("quota", "prompt_tokens", "completion_tokens")
+_BUCKET_SECONDS = {"hour": 3600, "day": 86400}
+_BUCKET_UNITS = {"hour": "datetime64[h]", "day": "datetime64[D]"}
+
+
+def _numeric_column(values: list, dtype) -> np.ndarray:
+    """转换为数值数组，缺失或无法解析的值记为 0"""
+    try:
+        column = np.array(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        column = np.empty(len(values), dtype=np.float64)
+        for index, value in enumerate(values):
+            try:
+                column[index] = float(value)
+            except (TypeError, ValueError):
+                column[index] = 0
+    return np.nan_to_num(column, nan=0.0, posinf=0.0, neginf=0.0).astype(dtype)
+
+
+def _encode_categories(values: list):
+    """字符串列按类别编码，返回 (codes, names)"""
+    if not values:
+        return np.zeros(0, dtype=np.int32), np.array([], dtype=object)
+    names, codes = np.unique(np.array(values, dtype=object), return_inverse=True)
+    return codes.astype(np.int32).ravel(), names
+
+
+def _local_offsets(created_at: np.ndarray) -> np.ndarray:
+    """每条记录所在时刻的本地时区偏移（秒），按整点去重后查询，兼容夏令时"""
+    if created_at.size == 0:
+        return np.zeros(0, dtype=np.int64)
+    hours, inverse = np.unique(created_at // 3600, return_inverse=True)
+    offsets = np.array([time.localtime(int(hour) * 3600).tm_gmtoff for hour in hours], dtype=np.int64)
+    return offsets[inverse.ravel()]
+
+
+class LogColumns:
+    """
+    调用日志的列式存储（各数组下标对应同一条记录）
+
+    Attributes:
+        created_at: 调用时间（Unix 秒）
+        quota / prompt_tokens / completion_tokens: 消耗额度与输入、输出 Token 数
+        model_codes / models: 模型名编码与类别表（models[model_codes[i]] 为第 i 条的模型名）
+        token_codes / tokens: Token 名编码与类别表
+    """
+
+    def __init__(self, created_at, quota, prompt_tokens, completion_tokens, model_codes, models, token_codes, tokens):
+        self.created_at = created_at
+        self.quota = quota
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        self.model_codes = model_codes
+        self.models = models
+        self.token_codes = token_codes
+        self.tokens = tokens
+        self._local_seconds = None
+
+    def __len__(self) -> int:
+        return int(self.created_at.size)
+
+    @classmethod
+    def from_records(cls, records: Iterable[dict]) -> "LogColumns":
+        """从日志记录（query_logs 返回的 items 格式）构建"""
+        records = list(records)
+        model_codes, models = _encode_categories([str(r.get("model_name") or UNKNOWN_MODEL) for r in records])
+        token_codes, tokens = _encode_categories([str(r.get("token_name") or UNKNOWN_TOKEN) for r in records])
+        return cls(
+            created_at=_numeric_column([r.get("created_at") for r in records], np.int64),
+            quota=_numeric_column([r.get("quota") for r in records], np.float64),
+            prompt_tokens=_numeric_column([r.get("prompt_tokens") for r in records], np.int64),
+            completion_tokens=_numeric_column([r.get("completion_tokens") for r in records], np.int64),
+            model_codes=model_codes,
+            models=models,
+            token_codes=token_codes,
+            tokens=tokens,
+        )
+
+    @classmethod
+    def concat(cls, parts: list) -> "LogColumns":
+        """合并多个 LogColumns（例如多个站点的日志库），类别表重新编码"""
+        parts = [part for part in parts if len(part)]
+        if not parts:
+            return cls.from_records([])
+        if len(parts) == 1:
+            return parts[0]
+
+        def merge_categories(codes_attr, names_attr):
+            names, remap = np.unique(
+                np.concatenate([getattr(part, names_attr) for part in parts]), return_inverse=True
+            )
+            remap = remap.ravel()
+            codes = []
+            start = 0
+            for part in parts:
+                part_names = getattr(part, names_attr)
+                codes.append(remap[start:start + len(part_names)][getattr(part, codes_attr)])
+                start += len(part_names)
+            return np.concatenate(codes).astype(np.int32), names
+
+        model_codes, models = merge_categories("model_codes", "models")
+        token_codes, tokens = merge_categories("token_codes", "tokens")
+        return cls(
+            created_at=np.concatenate([part.created_at for part in parts]),
+            quota=np.concatenate([part.quota for part in parts]),
+            prompt_tokens=np.concatenate([part.prompt_tokens for part in parts]),
+            completion_tokens=np.concatenate([part.completion_tokens for part in parts]),
+            model_codes=model_codes,
+            models=models,
+            token_codes=token_codes,
+            tokens=tokens,
+        )
+
+    def select(self, mask: np.ndarray) -> "LogColumns":
+        """按布尔掩码或下标筛选记录（类别表保持不变）"""
+        return LogColumns(
+            created_at=self.created_at[mask],
+            quota=self.quota[mask],
+            prompt_tokens=self.prompt_tokens[mask],
+            completion_tokens=self.completion_tokens[mask],
+            model_codes=self.model_codes[mask],
+            models=self.models,
+            token_codes=self.token_codes[mask],
+            tokens=self.tokens,
+        )
+
+    def between(self, since: Optional[int] = None, until: Optional[int] = None) -> "LogColumns":
+        """筛选 [since, until) 时间范围内的记录"""
+        mask = np.ones(len(self), dtype=bool)
+        if since is not None:
+            mask &= self.created_at >= since
+        if until is not None:
+            mask &= self.created_at < until
+        return self.select(mask)
+
+    def recent(self, days: int) -> "LogColumns":
+        """最近 days 天（含今天，本地时间）的记录"""
+        today_start = time.mktime(time.localtime()[:3] + (0, 0, 0, 0, 0, -1))
+        return self.between(since=int(today_start) - (max(days, 1) - 1) * 86400)
+
+    @property
+    def local_seconds(self) -> np.ndarray:
+        """本地时间的秒数（用于按小时 / 天分组）"""
+        if self._local_seconds is None:
+            self._local_seconds = self.created_at + _local_offsets(self.created_at)
+        return self._local_seconds
+
+
+def _read_jsonl(path: str, size: Optional[int] = None) -> list:
+    """读取 JSONL 文件；整体拼成一个 JSON 数组解析，有损坏行时退回逐行解析"""
+    try:
+        with open(path, "rb") as f:
+            content = f.read(size) if size else f.read()
+    except (IOError, OSError):
+        return []
+
+    lines = [line for line in content.split(b"\n") if line.strip()]
+    if not lines:
+        return []
+    try:
+        return json.loads(b"[" + b",".join(lines) + b"]")
+    except ValueError:
+        records = []
+        for line in lines:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+        return records
+
+
+def load_store_columns(store: LogStore) -> LogColumns:
+    """加载单个本地日志库"""
+    size = store.meta.get("size", 0)
+    if not size:
+        return LogColumns.from_records([])
+    return LogColumns.from_records(_read_jsonl(store.data_path, size))
+
+
+def get_log_store_signature(store_dir: Optional[str] = None) -> list:
+    """日志目录下各本地日志库的 [文件名, 大小, 修改时间]，任一日志同步后变化（用于图表缓存）"""
+    store_dir = store_dir or get_log_store_dir()
+    signature = []
+    for path in sorted(glob.glob(os.path.join(store_dir, "*.jsonl"))):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        signature.append([os.path.basename(path), stat.st_size, stat.st_mtime_ns])
+    return signature
+
+
+def load_all_log_columns(store_dir: Optional[str] = None) -> LogColumns:
+    """加载日志目录下所有本地日志库（所有站点和 Key）并合并"""
+    store_dir = store_dir or get_log_store_dir()
+    parts = [
+        LogColumns.from_records(_read_jsonl(path))
+        for path in sorted(glob.glob(os.path.join(store_dir, "*.jsonl")))
+    ]
+    return LogColumns.concat(parts)
+
+
+# === 分组统计 ===
+
+def _group_codes(columns: LogColumns, key: str):
+    """
+    返回 (参与分组的记录, 每条记录的分组编号, 分组标签数组)
+
+    按时间分组时跳过没有调用时间的记录（created_at 缺失记为 0，否则分组会从 1970 年开始）
+    """
+    if key == "model":
+        return columns, columns.model_codes, columns.models
+    if key == "token":
+        return columns, columns.token_codes, columns.tokens
+    if key != "hour_of_day" and key not in _BUCKET_SECONDS:
+        raise ValueError(f"未知的分组维度: {key}，可选 {', '.join(GROUP_KEYS)}")
+
+    timed = columns.created_at > 0
+    if not timed.all():
+        columns = columns.select(timed)
+    if key == "hour_of_day":
+        return columns, (columns.local_seconds // 3600 % 24).astype(np.int32), np.arange(24)
+    # 连续时间段：最早到最晚之间没有调用的时段也会出现（计数为 0）
+    if len(columns) == 0:
+        return columns, np.zeros(0, dtype=np.int32), np.array([], dtype=_BUCKET_UNITS[key])
+    buckets = columns.local_seconds // _BUCKET_SECONDS[key]
+    first = buckets.min()
+    labels = (np.arange(first, buckets.max() + 1) * _BUCKET_SECONDS[key]).astype("datetime64[s]")
+    return columns, (buckets - first).astype(np.int32), labels.astype(_BUCKET_UNITS[key])
+
+
+def group_by(columns: LogColumns, key: str) -> dict:
+    """
+    按维度分组汇总
+
+    Args:
+        columns: 日志列
+        key: 分组维度，见 GROUP_KEYS
+
+    Returns:
+        dict: 各值均为与 labels 等长的数组
+            - labels: 分组标签（模型名 / Token 名 / 本地时间 datetime64 / 0-23 点）
+            - requests: 调用次数
+            - quota / prompt_tokens / completion_tokens: 合计
+    """
+    columns, codes, labels = _group_codes(columns, key)
+    size = len(labels)
+    result = {
+        "labels": labels,
+        "requests": np.bincount(codes, minlength=size),
+    }
+    for field in NUMERIC_FIELDS:
+        totals = np.bincount(codes, weights=getattr(columns, field), minlength=size)
+        result[field] = totals if field == "quota" else totals.astype(np.int64)
+    return result
+
+
+def top_n(groups: dict, n: int = DEFAULT_TOP_N, by: str = "quota") -> dict:
+    """
+    取分组结果中按 by 字段降序的前 n 项（跳过调用次数为 0 的分组）
+
+    Args:
+        groups: group_by 的返回值
+        n: 数量
+        by: 排序字段（requests / quota / prompt_tokens / completion_tokens）
+    """
+    active = np.flatnonzero(groups["requests"] > 0)
+    order = active[np.argsort(-groups[by][active], kind="stable")[:n]]
+    return {field: values[order] for field, values in groups.items()}
+
+
+def percentiles(columns: LogColumns, field: str = "quota", q=DEFAULT_PERCENTILES, by: Optional[str] = None):
+    """
+    计算单次调用的分位数（线性插值，与 np.percentile 默认方法一致）
+
+    Args:
+        columns: 日志列
+        field: 数值字段（quota / prompt_tokens / completion_tokens）
+        q: 分位点（0-100）
+        by: 分组维度；为空时计算全部记录
+
+    Returns:
+        by 为空时返回形状为 (len(q),) 的数组；否则返回 (labels, 形状为 (分组数, len(q)) 的数组)，
+        没有记录的分组为 NaN
+    """
+    q = np.asarray(q, dtype=np.float64) / 100.0
+    if by is None:
+        values = getattr(columns, field).astype(np.float64)
+        if values.size == 0:
+            return np.full(q.shape, np.nan)
+        return np.percentile(values, q * 100)
+
+    columns, codes, labels = _group_codes(columns, by)
+    values = getattr(columns, field).astype(np.float64)
+    counts = np.bincount(codes, minlength=len(labels))
+    # 先按分组、再按数值排序，每个分组在 sorted_values 中占连续一段
+    sorted_values = values[np.lexsort((values, codes))]
+    starts = np.cumsum(counts) - counts
+
+    positions = starts[:, None] + (counts[:, None] - 1) * q[None, :]
+    valid = counts > 0
+    positions[~valid] = 0
+    lower = np.floor(positions).astype(np.int64)
+    upper = np.ceil(positions).astype(np.int64)
+    if sorted_values.size == 0:
+        return labels, np.full((len(labels), q.size), np.nan)
+    fraction = positions - lower
+    result = sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * fraction
+    result[~valid] = np.nan
+    return labels, result
+
+
+def analyze(
+    columns: LogColumns,
+    top: int = DEFAULT_TOP_N,
+    q=DEFAULT_PERCENTILES,
+) -> dict:
+    """
+    一次计算常用统计
+
+    Returns:
+        dict:
+            - total: {requests, quota, quota_usd, prompt_tokens, completion_tokens, first, last}
+            - by_model / by_token / by_day / by_hour_of_day: group_by 结果
+            - top_models / top_tokens: 按消耗排序的前 top 项
+            - quota_percentiles: 单次调用消耗的分位数 {分位点: quota}
+    """
+    total_quota = float(columns.quota.sum())
+    by_model = group_by(columns, "model")
+    by_token = group_by(columns, "token")
+    quota_percentiles = percentiles(columns, "quota", q)
+    return {
+        "total": {
+            "requests": len(columns),
+            "quota": total_quota,
+            "quota_usd": total_quota / QUOTA_PER_USD,
+            "prompt_tokens": int(columns.prompt_tokens.sum()),
+            "completion_tokens": int(columns.completion_tokens.sum()),
+            "first": int(columns.created_at.min()) if len(columns) else None,
+            "last": int(columns.created_at.max()) if len(columns) else None,
+        },
+        "by_model": by_model,
+        "by_token": by_token,
+        "by_day": group_by(columns, "day"),
+        "by_hour_of_day": group_by(columns, "hour_of_day"),
+        "top_models": top_n(by_model, top),
+        "top_tokens": top_n(by_token, top),
+        "quota_percentiles": {point: float(value) for point, value in zip(q, quota_percentiles)},
+    }
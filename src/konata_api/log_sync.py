@@ -0,0 +1,297 @@
+"""日志同步模块 - 调用日志的本地增量存储
+
+每个 站点 URL + API Key 对应一个本地日志库（config/logs/ 下的 JSONL 文件，按时间从旧到新追加）
+和一个记录水位线（最新 created_at 及该时刻的记录 ID）的元数据文件。
+每次同步只拉取水位线之后的日志，与已有记录重叠的部分去重后追加；
+浏览历史日志直接读取本地文件，不再请求网络。
+"""
+
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Optional
+
+from konata_api.api import iter_logs, _log_record_id
+from konata_api.utils import get_exe_dir, atomic_write
+
+
+DEFAULT_INITIAL_MAX_PAGES = 20  # 首次同步（无水位线）最多拉取的页数
+_READ_BLOCK_SIZE = 64 * 1024
+
+# 同一个日志库同时只允许一次同步
+_store_locks = {}
+_store_locks_guard = threading.Lock()
+
+
+def get_log_store_dir() -> str:
+    """获取本地日志库目录"""
+    return os.path.join(get_exe_dir(), "config", "logs")
+
+
+def _record_key(item: dict) -> str:
+    """记录 ID 的字符串形式（用于去重和保存水位线）"""
+    return json.dumps(_log_record_id(item), ensure_ascii=False, sort_keys=True, default=str)
+
+
+def _store_lock(store_id: str) -> threading.Lock:
+    with _store_locks_guard:
+        if store_id not in _store_locks:
+            _store_locks[store_id] = threading.Lock()
+        return _store_locks[store_id]
+
+
+def _iter_lines_reverse(path: str, end: int):
+    """从文件末尾（end 字节处）向前逐行读取"""
+    with open(path, "rb") as f:
+        position = end
+        remainder = b""
+        while position > 0:
+            read_size = min(_READ_BLOCK_SIZE, position)
+            position -= read_size
+            f.seek(position)
+            lines = (f.read(read_size) + remainder).split(b"\n")
+            remainder = lines.pop(0)
+            for line in reversed(lines):
+                if line.strip():
+                    yield line
+        if remainder.strip():
+            yield remainder
+
+
+def _complete_size(f, size: int) -> int:
+    """已打开文件前 size 字节中最后一个换行符之后的位置（从末尾按块向前查找，不读入整个文件）"""
+    position = size
+    while position > 0:
+        read_size = min(_READ_BLOCK_SIZE, position)
+        position -= read_size
+        f.seek(position)
+        index = f.read(read_size).rfind(b"\n")
+        if index >= 0:
+            return position + index + 1
+    return 0
+
+
+class LogStore:
+    """单个站点 + API Key 的本地日志库"""
+
+    def __init__(self, base_url: str, api_key: str, store_dir: Optional[str] = None):
+        self.base_url = base_url.rstrip("/")
+        digest = hashlib.sha256(f"{self.base_url}\n{api_key}".encode("utf-8")).hexdigest()
+        self.store_id = digest[:24]  # 文件名不包含明文 Key
+        store_dir = store_dir or get_log_store_dir()
+        self.data_path = os.path.join(store_dir, f"{self.store_id}.jsonl")
+        self.meta_path = os.path.join(store_dir, f"{self.store_id}.meta.json")
+        self.meta = self._load_meta()
+
+    # === 元数据 ===
+
+    def _empty_meta(self) -> dict:
+        return {
+            "url": self.base_url,
+            "watermark": None,  # {"created_at": int, "ids": [记录 ID, ...]}
+            "count": 0,
+            "size": 0,          # 数据文件已确认的字节数
+            "last_sync": "",
+        }
+
+    def _load_meta(self) -> dict:
+        meta = self._empty_meta()
+        if os.path.exists(self.meta_path):
+            try:
+                with open(self.meta_path, "r", encoding="utf-8") as f:
+                    meta.update(json.load(f))
+            except (json.JSONDecodeError, IOError, OSError):
+                pass
+
+        # 数据文件与元数据不一致（上次写入中断）时，根据数据文件重建
+        data_size = os.path.getsize(self.data_path) if os.path.exists(self.data_path) else 0
+        if data_size != meta.get("size", 0):
+            meta = self._rebuild_meta(data_size)
+        return meta
+
+    def _rebuild_meta(self, data_size: int) -> dict:
+        """扫描数据文件，重新计算记录数和水位线"""
+        meta = self._empty_meta()
+        if data_size == 0:
+            return meta
+
+        # 截掉末尾写了一半的记录，避免与之后追加的记录拼在同一行
+        with open(self.data_path, "rb+") as f:
+            content_end = _complete_size(f, data_size)
+            if content_end != data_size:
+                f.truncate(content_end)
+                data_size = content_end
+
+        count = 0
+        latest = None
+        ids = []
+        with open(self.data_path, "rb") as f:
+            for line in f:
+                try:
+                    item = json.loads(line)
+                except ValueError:
+                    continue
+                count += 1
+                created_at = item.get("created_at", 0)
+                if latest is None or created_at > latest:
+                    latest, ids = created_at, [_record_key(item)]
+                elif created_at == latest:
+                    ids.append(_record_key(item))
+
+        meta["count"] = count
+        meta["size"] = data_size
+        if latest is not None:
+            meta["watermark"] = {"created_at": latest, "ids": ids}
+        return meta
+
+    def _save_meta(self):
+        atomic_write(self.meta_path, json.dumps(self.meta, ensure_ascii=False, indent=2))
+
+    @property
+    def watermark(self) -> Optional[dict]:
+        return self.meta.get("watermark")
+
+    @property
+    def count(self) -> int:
+        return self.meta.get("count", 0)
+
+    # === 写入 ===
+
+    def is_new(self, item: dict) -> bool:
+        """记录是否在水位线之后（同一时刻的记录按 ID 去重）"""
+        watermark = self.watermark
+        if not watermark:
+            return True
+        created_at = item.get("created_at", 0)
+        if created_at != watermark["created_at"]:
+            return created_at > watermark["created_at"]
+        return _record_key(item) not in watermark["ids"]
+
+    def append(self, items: list) -> int:
+        """
+        追加新记录（水位线之前或重复的记录会被忽略）
+
+        Args:
+            items: 日志记录，按接口返回的从新到旧顺序
+
+        Returns:
+            int: 实际追加的条数
+        """
+        seen = set()
+        new_items = []
+        for item in items:
+            key = _record_key(item)
+            if key in seen or not self.is_new(item):
+                continue
+            seen.add(key)
+            new_items.append(item)
+        if not new_items:
+            return 0
+
+        # 转为从旧到新；同一秒内的记录保持接口返回的相对顺序
+        new_items.reverse()
+        new_items.sort(key=lambda x: x.get("created_at", 0))
+        payload = "".join(json.dumps(item, ensure_ascii=False) + "\n" for item in new_items).encode("utf-8")
+
+        os.makedirs(os.path.dirname(self.data_path), exist_ok=True)
+        with open(self.data_path, "ab") as f:
+            f.write(payload)
+
+        latest = new_items[-1].get("created_at", 0)
+        latest_ids = [_record_key(item) for item in new_items if item.get("created_at", 0) == latest]
+        watermark = self.watermark
+        if watermark and watermark["created_at"] == latest:
+            latest_ids = watermark["ids"] + latest_ids
+
+        self.meta["watermark"] = {"created_at": latest, "ids": latest_ids}
+        self.meta["count"] = self.count + len(new_items)
+        self.meta["size"] = self.meta.get("size", 0) + len(payload)
+        self.meta["last_sync"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self._save_meta()
+        return len(new_items)
+
+    # === 读取 ===
+
+    def read_latest(self, limit: int = 50, offset: int = 0) -> list:
+        """从新到旧读取本地日志（跳过最新的 offset 条，最多 limit 条）"""
+        size = self.meta.get("size", 0)
+        if not size or not os.path.exists(self.data_path):
+            return []
+
+        items = []
+        for index, line in enumerate(_iter_lines_reverse(self.data_path, size)):
+            if index < offset:
+                continue
+            if len(items) >= limit:
+                break
+            try:
+                items.append(json.loads(line))
+            except ValueError:
+                continue
+        return items
+
+
+def sync_logs(
+    api_key: str,
+    base_url: str,
+    page_size: int = 50,
+    custom_api_path: str = "",
+    proxy_url: str = "",
+    auth_type: str = "bearer",
+    initial_max_pages: int = DEFAULT_INITIAL_MAX_PAGES,
+    store_dir: Optional[str] = None,
+) -> dict:
+    """
+    增量同步调用日志到本地日志库
+
+    Args:
+        api_key / base_url / page_size / custom_api_path / proxy_url / auth_type: 同 api.query_logs
+        initial_max_pages: 首次同步（本地无记录）时最多拉取的页数
+        store_dir: 日志库目录，留空使用 config/logs
+
+    Returns:
+        dict: 同步结果
+            - added: 本次新增条数
+            - total: 本地日志总条数
+            - items: 最新一页日志（从新到旧，格式同 query_logs）
+            - store: LogStore 对象（用于继续读取更早的本地日志）
+            - error: 同步失败时的错误信息（本地已有数据不受影响）
+    """
+    store = LogStore(base_url, api_key, store_dir=store_dir)
+
+    with _store_lock(store.store_id):
+        # 锁内重新加载元数据，避免与其他同步并发写入
+        store.meta = store._load_meta()
+        watermark = store.watermark
+        logs = iter_logs(
+            api_key,
+            base_url,
+            page_size=page_size,
+            custom_api_path=custom_api_path,
+            proxy_url=proxy_url,
+            auth_type=auth_type,
+            since=watermark["created_at"] if watermark else None,
+            max_pages=None if watermark else initial_max_pages,
+        )
+        new_items = [item for item in logs if store.is_new(item)]
+
+        # 中途出错时不写入，避免水位线越过未拉取到的记录
+        if logs.error:
+            return {
+                "error": logs.error,
+                "added": 0,
+                "total": store.count,
+                "items": store.read_latest(page_size),
+                "store": store,
+            }
+
+        added = store.append(new_items)
+
+    return {
+        "added": added,
+        "total": store.count,
+        "items": store.read_latest(page_size),
+        "store": store,
+    }
@@ -0,0 +1,144 @@
+"""后台持久化模块 - 合并短时间内的多次保存
+
+数据修改后只标记为"待保存"，由后台线程在合并窗口结束时写入一次，
+连续的多次修改（批量签到、批量查询、连续编辑）只产生一次磁盘写入。
+写入失败（或写入时数据正被其他线程修改）时保留待保存状态，稍后重试；
+连续失败（只读目录、磁盘已满）时重试间隔逐次加倍，不会反复空转。
+程序退出时（close_stats_storage / atexit）立即写入所有尚未保存的修改。
+"""
+
+import atexit
+import threading
+import time
+import weakref
+
+
+DEFAULT_SAVE_DELAY = 1.0  # 默认合并窗口（秒）
+MIN_RETRY_DELAY = 1.0     # 写入失败后第一次重试的最短间隔（秒）
+MAX_RETRY_DELAY = 60.0    # 连续失败时重试间隔的上限（秒）
+
+_writers = weakref.WeakSet()
+_writers_lock = threading.Lock()
+
+
+class CoalescingWriter:
+    """
+    合并写入器（线程安全）
+
+    Args:
+        write: 执行一次完整保存的函数，返回是否成功；在后台线程或调用 flush 的线程中调用
+        delay: 合并窗口（秒），第一次标记后经过这段时间写入
+        name: 后台线程名称
+    """
+
+    def __init__(self, write, delay: float = DEFAULT_SAVE_DELAY, name: str = "coalescing-writer"):
+        self._write = write
+        self.delay = max(0.0, float(delay))
+        self.name = name
+        self._cond = threading.Condition()
+        self._dirty = False
+        self._dirty_since = 0.0
+        self._writing = False
+        self._failures = 0        # 连续写入失败次数
+        self._retry_at = 0.0      # 失败后下一次自动重试的时间（monotonic）
+        self._thread = None
+        with _writers_lock:
+            _writers.add(self)
+
+    @property
+    def pending(self) -> bool:
+        """是否有尚未写入的修改"""
+        with self._cond:
+            return self._dirty or self._writing
+
+    def mark_dirty(self):
+        """标记有修改，合并窗口结束后由后台线程写入"""
+        with self._cond:
+            if not self._dirty:
+                self._dirty = True
+                self._dirty_since = time.monotonic()
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def _take(self) -> bool:
+        """取走待保存标记并进入写入状态（调用方持有锁）"""
+        if not self._dirty:
+            return False
+        self._dirty = False
+        self._writing = True
+        return True
+
+    def _write_once(self):
+        """执行一次写入，失败时恢复待保存标记"""
+        try:
+            ok = bool(self._write())
+        except (OSError, RuntimeError, ValueError):
+            # RuntimeError：序列化时数据正被其他线程修改，下个窗口重试
+            ok = False
+        with self._cond:
+            self._writing = False
+            if ok:
+                self._failures = 0
+            else:
+                now = time.monotonic()
+                self._failures += 1
+                self._retry_at = now + self.retry_delay(self._failures)
+                if not self._dirty:
+                    self._dirty = True
+                    self._dirty_since = now
+            self._cond.notify_all()
+        return ok
+
+    def retry_delay(self, failures: int) -> float:
+        """连续失败 failures 次后到下一次重试的间隔：不短于合并窗口和 MIN_RETRY_DELAY，逐次加倍"""
+        return min(max(self.delay, MIN_RETRY_DELAY) * 2 ** (failures - 1), MAX_RETRY_DELAY)
+
+    def _time_until_due(self) -> float:
+        """距离下一次后台写入的秒数（调用方持有锁）"""
+        due = self._dirty_since + self.delay
+        if self._failures:
+            due = max(due, self._retry_at)
+        return due - time.monotonic()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._dirty or self._writing:
+                    self._cond.wait()
+                # 等到合并窗口结束（上次写入失败时还要等到重试时间），期间的新修改并入同一次写入
+                remaining = self._time_until_due()
+                while self._dirty and remaining > 0:
+                    self._cond.wait(remaining)
+                    remaining = self._time_until_due()
+                if self._writing or not self._take():
+                    continue
+            self._write_once()
+
+    def flush(self) -> bool:
+        """
+        立即写入尚未保存的修改（等待进行中的后台写入完成）
+
+        Returns:
+            bool: 没有待保存的修改或写入成功
+        """
+        with self._cond:
+            while self._writing:
+                self._cond.wait()
+            if not self._take():
+                return True
+        return self._write_once()
+
+
+def flush_all() -> bool:
+    """写入所有合并写入器中尚未保存的修改（程序退出时调用）"""
+    with _writers_lock:
+        writers = list(_writers)
+    ok = True
+    for writer in writers:
+        ok = writer.flush() and ok
+    return ok
+
+
+atexit.register(flush_all)
@@ -1,42 +1,25 @@
 """
-统计模块 - 站点档案管理与图表生成
+统计模块 - 站点档案管理与统计数据
+
+图表生成在 charts 模块中（首次绘制图表时才导入 matplotlib）。
 """
+import copy
 import json
 import os
+import threading
 import uuid
 import warnings
-from datetime import datetime, timedelta
+from collections.abc import Mapping
+from contextlib import contextmanager
+from datetime import datetime
 from typing import Optional
 
-# 过滤 matplotlib 字体警告
-warnings.filterwarnings('ignore', message='Glyph .* missing from')
-
-import matplotlib
-matplotlib.use('Agg')  # 非交互式后端，避免 tkinter 冲突
-import matplotlib.pyplot as plt
-from matplotlib.figure import Figure
-from matplotlib.font_manager import FontProperties
-from matplotlib.ticker import FuncFormatter
-
-# 设置中文字体（在导入后立即设置）
-FONT_FAMILY_STACK = [
-    "Times New Roman",  # English
-    "SimSun",           # Chinese (宋体)
-    "DejaVu Serif",     # fallback
-]
-
-FONT_DEFAULT = FontProperties(family=FONT_FAMILY_STACK, size=10)
-FONT_SMALL = FontProperties(family=FONT_FAMILY_STACK, size=9)
-FONT_TITLE = FontProperties(family=FONT_FAMILY_STACK, size=12, weight="bold")
-FONT_SUBTITLE = FontProperties(family=FONT_FAMILY_STACK, size=11, weight="bold")
-
-plt.rcParams["font.family"] = FONT_FAMILY_STACK
-plt.rcParams["axes.unicode_minus"] = False
-plt.rcParams["figure.facecolor"] = "#f8fafc"
-plt.rcParams["axes.facecolor"] = "#f8fafc"
-plt.rcParams["savefig.facecolor"] = "#f8fafc"
+import numpy as np
 
-from konata_api.utils import get_exe_dir
+from konata_api.utils import get_exe_dir, get_config_snapshot, freeze, atomic_write
+from konata_api.stats_db import StatsDatabase
+from konata_api.persistence import CoalescingWriter, DEFAULT_SAVE_DELAY, flush_all as flush_pending_saves
+from konata_api.checkin_journal import CheckinJournal, get_checkin_journal_path, DEFAULT_KEEP, DEFAULT_MAX_FILE_BYTES
 
 
 # 站点类型常量
@@ -51,6 +34,52 @@ SITE_TYPE_LABELS = {
 }
 
 
+# 存储后端（config.json 中 stats_storage.backend）
+STATS_BACKEND_JSON = "json"       # stats.json / checkin_log.json 整体读写
+STATS_BACKEND_SQLITE = "sqlite"   # config/stats.db，按行更新（首次启用时从 JSON 导入）
+
+_stats_db = None
+_stats_db_lock = threading.Lock()
+_checkin_journal = None
+_checkin_journal_lock = threading.Lock()
+
+
+def get_stats_backend() -> str:
+    """获取当前的统计数据存储后端"""
+    backend = get_config_snapshot().get("stats_storage", {}).get("backend", STATS_BACKEND_JSON)
+    return backend if backend in (STATS_BACKEND_JSON, STATS_BACKEND_SQLITE) else STATS_BACKEND_JSON
+
+
+def _get_stats_db() -> StatsDatabase:
+    """获取统计数据库（首次打开时从 JSON 文件导入现有数据）"""
+    global _stats_db
+    with _stats_db_lock:
+        if _stats_db is None:
+            db = StatsDatabase()
+            db.migrate_from_json(_load_stats_json(), _get_checkin_journal().load())
+            _stats_db = db
+        return _stats_db
+
+
+def get_stats_save_delay() -> float:
+    """站点数据的合并保存窗口（config.json 中 stats_storage.save_delay_ms）"""
+    try:
+        delay_ms = float(get_config_snapshot().get("stats_storage", {}).get("save_delay_ms", DEFAULT_SAVE_DELAY * 1000))
+    except (TypeError, ValueError):
+        return DEFAULT_SAVE_DELAY
+    return max(0.0, delay_ms / 1000)
+
+
+def close_stats_storage():
+    """写入尚未保存的站点数据并关闭统计数据库连接（程序退出时调用）"""
+    global _stats_db
+    flush_pending_saves()
+    with _stats_db_lock:
+        if _stats_db is not None:
+            _stats_db.close()
+            _stats_db = None
+
+
 def get_stats_path() -> str:
     """获取统计数据文件路径"""
     return os.path.join(get_exe_dir(), "config", "stats.json")
@@ -58,31 +87,44 @@ def get_stats_path() -> str:
 
 def get_checkin_log_path() -> str:
     """获取签到日志文件路径"""
-    return os.path.join(get_exe_dir(), "config", "checkin_log.json")
+    return get_checkin_journal_path()
+
+
+def get_checkin_log_keep() -> int:
+    """签到日志保留条数（config.json 中 checkin_log.keep）"""
+    try:
+        return max(1, int(get_config_snapshot().get("checkin_log", {}).get("keep", DEFAULT_KEEP)))
+    except (TypeError, ValueError):
+        return DEFAULT_KEEP
+
+
+def _get_checkin_journal() -> CheckinJournal:
+    """获取签到日志（保留条数和文件大小上限随配置更新）"""
+    global _checkin_journal
+    settings = get_config_snapshot().get("checkin_log", {})
+    try:
+        max_file_bytes = int(float(settings.get("max_file_kb", DEFAULT_MAX_FILE_BYTES / 1024)) * 1024)
+    except (TypeError, ValueError):
+        max_file_bytes = DEFAULT_MAX_FILE_BYTES
+    with _checkin_journal_lock:
+        if _checkin_journal is None:
+            _checkin_journal = CheckinJournal()
+        _checkin_journal.configure(keep=get_checkin_log_keep(), max_file_bytes=max_file_bytes)
+        return _checkin_journal
 
 
 def load_checkin_log() -> list:
-    """加载签到日志"""
-    path = get_checkin_log_path()
-    if os.path.exists(path):
-        try:
-            with open(path, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except (json.JSONDecodeError, IOError):
-            pass
-    return []
+    """加载签到日志（从新到旧）"""
+    if get_stats_backend() == STATS_BACKEND_SQLITE:
+        return _get_stats_db().load_checkin_log()
+    return _get_checkin_journal().load()
 
 
 def save_checkin_log(logs: list) -> bool:
-    """保存签到日志"""
-    path = get_checkin_log_path()
-    try:
-        os.makedirs(os.path.dirname(path), exist_ok=True)
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(logs, f, ensure_ascii=False, indent=2)
-        return True
-    except IOError:
-        return False
+    """保存签到日志（整体替换，logs 从新到旧）"""
+    if get_stats_backend() == STATS_BACKEND_SQLITE:
+        return _get_stats_db().replace_checkin_log(logs)
+    return _get_checkin_journal().replace(logs)
 
 
 def add_checkin_log(site_name: str, site_id: str, success: bool, quota_awarded: float = 0, message: str = "") -> dict:
@@ -99,7 +141,6 @@ def add_checkin_log(site_name: str, site_id: str, success: bool, quota_awarded:
     Returns:
         新增的日志记录
     """
-    logs = load_checkin_log()
     record = {
         "id": f"chk-{uuid.uuid4().hex[:6]}",
         "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
@@ -109,22 +150,22 @@ def add_checkin_log(site_name: str, site_id: str, success: bool, quota_awarded:
         "quota_awarded": quota_awarded,
         "message": message,
     }
-    logs.insert(0, record)  # 最新的在前面
-    # 只保留最近 500 条
-    logs = logs[:500]
-    save_checkin_log(logs)
+    if get_stats_backend() == STATS_BACKEND_SQLITE:
+        _get_stats_db().add_checkin_log(record, keep=get_checkin_log_keep())
+    else:
+        _get_checkin_journal().append(record)
     return record
 
 
 def get_today_checkin_sites() -> set:
     """获取今天已签到的站点ID集合"""
-    logs = load_checkin_log()
     today = datetime.now().strftime("%Y-%m-%d")
-    return {log["site_id"] for log in logs if log.get("time", "").startswith(today) and log.get("success")}
+    if get_stats_backend() == STATS_BACKEND_SQLITE:
+        return _get_stats_db().get_checkin_site_ids(today)
+    return _get_checkin_journal().site_ids_on(today)
 
 
-def load_stats() -> dict:
-    """加载统计数据"""
+def _load_stats_json() -> dict:
     path = get_stats_path()
     if os.path.exists(path):
         try:
@@ -135,17 +176,36 @@ def load_stats() -> dict:
     return {"sites": []}
 
 
+def load_stats() -> dict:
+    """加载统计数据"""
+    if get_stats_backend() == STATS_BACKEND_SQLITE:
+        return _get_stats_db().load_stats()
+    return _load_stats_json()
+
+
 def save_stats(data: dict) -> bool:
-    """保存统计数据"""
-    path = get_stats_path()
+    """保存统计数据（SQLite 后端只写入有变化的站点和充值记录）"""
+    if get_stats_backend() == STATS_BACKEND_SQLITE:
+        return _get_stats_db().save_stats(data)
+    content = json.dumps(data, ensure_ascii=False, indent=2)
     try:
-        # 确保目录存在
-        os.makedirs(os.path.dirname(path), exist_ok=True)
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-        return True
-    except IOError:
+        # 原子写入，写入中途退出不会损坏 stats.json
+        atomic_write(get_stats_path(), content)
+    except OSError:
         return False
+    return True
+
+
+def save_sites(sites: list) -> bool:
+    """
+    只保存给定的站点（站点的增删和顺序没有变化时使用，只序列化这些站点）
+
+    Returns:
+        bool: 是否保存成功；JSON 后端或数据库中没有这些站点时返回 False，由调用方改用 save_stats
+    """
+    if get_stats_backend() == STATS_BACKEND_SQLITE:
+        return _get_stats_db().save_sites(sites)
+    return False
 
 
 def generate_site_id() -> str:
@@ -278,390 +338,654 @@ def update_site_balance(data: dict, url: str, balance: float, unit: str = "USD")
     return False
 
 
-# ============ 图表生成 ============
-
-def _create_placeholder_chart(message: str, figsize=(6, 4), dpi=100) -> Figure:
-    """Create a simple placeholder chart when no data is available."""
-    fig, ax = plt.subplots(figsize=figsize, dpi=dpi)
-    ax.text(0.5, 0.5, message, ha="center", va="center", color="#64748b", fontproperties=FONT_SUBTITLE)
-    ax.set_xlim(0, 1)
-    ax.set_ylim(0, 1)
-    ax.axis("off")
-    fig.tight_layout()
-    return fig
+def normalize_site_url(url: str) -> str:
+    """站点 URL 的比较形式（去掉末尾的 /）"""
+    return str(url or "").strip().rstrip("/")
 
 
-def _set_axis_style(ax, grid_axis: str = "x"):
-    """Apply a unified modern style to axes."""
-    ax.grid(axis=grid_axis, linestyle="--", linewidth=0.8, color="#cbd5e1", alpha=0.6)
-    ax.tick_params(colors="#334155", labelsize=9)
-    ax.spines["top"].set_visible(False)
-    ax.spines["right"].set_visible(False)
-    ax.spines["left"].set_color("#cbd5e1")
-    ax.spines["bottom"].set_color("#cbd5e1")
+_UNSET = object()
 
 
-
-def _apply_tick_font(ax):
-    for tick in ax.get_xticklabels():
-        tick.set_fontproperties(FONT_SMALL)
-    for tick in ax.get_yticklabels():
-        tick.set_fontproperties(FONT_SMALL)
-
-
-
-def _shorten_name(name: str, max_len: int = 14) -> str:
-    if len(name) <= max_len:
-        return name
-    return name[: max_len - 3] + "..."
-
-
-
-def _parse_datetime(value: str):
-    if not value:
-        return None
-    raw = str(value).strip()
-    if not raw:
-        return None
-
-    formats = (
-        "%Y-%m-%d %H:%M:%S",
-        "%Y-%m-%d",
-        "%Y/%m/%d",
-        "%Y/%m/%d %H:%M:%S",
-    )
-    for fmt in formats:
-        try:
-            return datetime.strptime(raw, fmt)
-        except ValueError:
-            continue
-
+def _record_month(record: dict) -> Optional[str]:
+    """充值记录计入的月份（YYYY-MM），金额不为正或日期无效时为 None"""
     try:
-        return datetime.fromisoformat(raw)
-    except ValueError:
+        amount = float(record.get("amount", 0) or 0)
+    except (TypeError, ValueError):
         return None
+    if amount <= 0:
+        return None
+    record_dt = _parse_datetime(record.get("date", ""))
+    return record_dt.strftime("%Y-%m") if record_dt else None
 
 
+class SiteAggregates:
+    """
+    站点汇总的增量统计：按类型的站点数和余额、总余额、总充值、按月充值
 
-def _iter_recent_month_keys(months: int = 12):
-    cursor = datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    keys = []
-    for _ in range(max(months, 1)):
-        keys.append(cursor.strftime("%Y-%m"))
-        cursor = (cursor - timedelta(days=1)).replace(day=1)
-    return list(reversed(keys))
-
-
-
-def create_balance_bar_chart(sites: list, figsize=(6, 4), dpi=100) -> Figure:
-    """Generate a horizontal ranking chart for site balances."""
-    valid_sites = [
-        s for s in sites
-        if s.get("balance", 0) > 0 and s.get("balance_unit") in ("USD", "CNY", "")
-    ]
-    valid_sites = sorted(valid_sites, key=lambda x: x.get("balance", 0), reverse=True)[:10]
-
-    if not valid_sites:
-        return _create_placeholder_chart("暂无余额数据", figsize=figsize, dpi=dpi)
-
-    names = [_shorten_name(s.get("name", "未命名")) for s in valid_sites]
-    balances = [float(s.get("balance", 0) or 0) for s in valid_sites]
+    记录每个站点和每条充值记录已计入的数值，站点或记录变化时只减去旧值、加上新值，
+    修改后读取汇总不再遍历全部站点和充值记录。非线程安全，由 SiteRepository 在锁内调用。
+    """
 
-    color_map = {
-        SITE_TYPE_PAID: "#3b82f6",
-        SITE_TYPE_FREE: "#10b981",
-        SITE_TYPE_SUBSCRIPTION: "#f59e0b",
-    }
-    colors = [color_map.get(s.get("type", SITE_TYPE_PAID), "#94a3b8") for s in valid_sites]
-
-    fig, ax = plt.subplots(figsize=figsize, dpi=dpi)
-
-    y_labels = list(reversed(names))
-    y_values = list(reversed(balances))
-    y_colors = list(reversed(colors))
-
-    bars = ax.barh(y_labels, y_values, color=y_colors, edgecolor="white", linewidth=1.0, height=0.58)
-
-    max_val = max(y_values) if y_values else 1.0
-    for bar, value in zip(bars, y_values):
-        ax.text(
-            bar.get_width() + max_val * 0.02,
-            bar.get_y() + bar.get_height() / 2,
-            f"${value:,.2f}",
-            va="center",
-            ha="left",
-            color="#1f2937",
-            fontproperties=FONT_SMALL,
-        )
+    def __init__(self, sites: Optional[list] = None):
+        self.total_sites = 0
+        self.total_balance = 0.0
+        self.total_recharge = 0.0
+        self.by_type = {}            # 类型 -> {"count": 站点数, "balance": 余额}
+        self.recharge_by_month = {}  # "YYYY-MM" -> 充值金额
+        self._sites = {}             # id(站点) -> (站点, 类型, 计入的余额)
+        self._records = {}           # id(站点) -> {id(记录): (记录, 金额, 月份)}
+        # 首次计入时整列解析全部充值记录的日期
+        sites = list(sites or [])
+        records = [record for site in sites for record in (site.get("recharge_records", []) or [])]
+        months = {id(record): month for record, month in zip(records, _record_months(records))}
+        for site in sites:
+            self.add_site(site, months)
+
+    @staticmethod
+    def _site_values(site: dict):
+        site_type = site.get("type", SITE_TYPE_PAID)
+        # 只计 USD/CNY 余额
+        balance = (site.get("balance", 0) or 0) if site.get("balance_unit") in ("USD", "CNY", "") else 0
+        return site_type, balance
+
+    def _apply_site(self, site_type: str, balance: float, sign: int):
+        stats = self.by_type.setdefault(site_type, {"count": 0, "balance": 0})
+        stats["count"] += sign
+        stats["balance"] += sign * balance
+        if stats["count"] <= 0:
+            del self.by_type[site_type]
+        self.total_sites += sign
+        self.total_balance += sign * balance
+
+    def _apply_record(self, amount: float, month: Optional[str], sign: int):
+        self.total_recharge += sign * amount
+        if month:
+            total = self.recharge_by_month.get(month, 0.0) + sign * amount
+            if abs(total) < 1e-9:
+                self.recharge_by_month.pop(month, None)
+            else:
+                self.recharge_by_month[month] = total
+
+    def add_site(self, site: dict, months: Optional[dict] = None):
+        """计入新站点及其充值记录（months 为预先批量计算的 id(记录) -> 月份）"""
+        if id(site) in self._sites:
+            return
+        site_type, balance = self._site_values(site)
+        self._sites[id(site)] = (site, site_type, balance)
+        self._apply_site(site_type, balance, 1)
+        self._records[id(site)] = {}
+        for record in site.get("recharge_records", []) or []:
+            self.add_record(site, record, months.get(id(record)) if months is not None else _UNSET)
+
+    def remove_site(self, site: dict):
+        """减去已删除站点及其充值记录"""
+        entry = self._sites.pop(id(site), None)
+        if entry is None:
+            return
+        self._apply_site(entry[1], entry[2], -1)
+        for _, amount, month in self._records.pop(id(site), {}).values():
+            self._apply_record(amount, month, -1)
+
+    def update_site(self, site: dict):
+        """站点字段变化后更新（充值记录列表或任一记录的金额、日期与已计入的不一致时重新计入该站点的记录）"""
+        entry = self._sites.get(id(site))
+        if entry is None:
+            self.add_site(site)
+            return
+        site_type, balance = self._site_values(site)
+        if (site_type, balance) != entry[1:]:
+            self._apply_site(entry[1], entry[2], -1)
+            self._apply_site(site_type, balance, 1)
+            self._sites[id(site)] = (site, site_type, balance)
+        records = site.get("recharge_records", []) or []
+        if self._records_changed(site, records):
+            for _, amount, month in self._records.pop(id(site), {}).values():
+                self._apply_record(amount, month, -1)
+            self._records[id(site)] = {}
+            for record in records:
+                self.add_record(site, record)
+
+    @staticmethod
+    def _record_amount(record: dict) -> float:
+        try:
+            return float(record.get("amount", 0) or 0)
+        except (TypeError, ValueError):
+            return 0.0
+
+    def _records_changed(self, site: dict, records: list) -> bool:
+        """充值记录与已计入的是否不同（记录对象、金额或月份任一变化）"""
+        tracked = self._records.get(id(site), {})
+        if len(records) != len(tracked):
+            return True
+        for record in records:
+            entry = tracked.get(id(record))
+            if entry is None or entry[0] is not record:
+                return True
+            if entry[1:] != (self._record_amount(record), _record_month(record)):
+                return True
+        return False
 
-    ax.set_title("余额排名 Top 10", fontproperties=FONT_TITLE, color="#0f172a", pad=10)
-    ax.set_xlabel("Balance (USD)", fontproperties=FONT_DEFAULT, color="#334155")
-    ax.xaxis.set_major_formatter(FuncFormatter(lambda x, _: f"${x:,.0f}"))
-    ax.set_xlim(0, max_val * 1.24)
+    def add_record(self, site: dict, record: dict, month=_UNSET):
+        """计入一条充值记录"""
+        site_records = self._records.setdefault(id(site), {})
+        if id(record) in site_records:
+            return
+        amount = self._record_amount(record)
+        if month is _UNSET:
+            month = _record_month(record)
+        site_records[id(record)] = (record, amount, month)
+        self._apply_record(amount, month, 1)
+
+    def remove_record(self, site: dict, record: dict):
+        """减去一条已删除的充值记录"""
+        entry = self._records.get(id(site), {}).pop(id(record), None)
+        if entry is not None:
+            self._apply_record(entry[1], entry[2], -1)
+
+    def summary(self) -> dict:
+        """汇总结果（格式见 get_stats_summary）"""
+        return {
+            "total_sites": self.total_sites,
+            "total_balance_usd": self.total_balance,
+            "total_recharge": self.total_recharge,
+            "by_type": {site_type: dict(stats) for site_type, stats in self.by_type.items()},
+            "recharge_by_month": dict(self.recharge_by_month),
+        }
 
-    _set_axis_style(ax, grid_axis="x")
-    _apply_tick_font(ax)
 
-    fig.tight_layout()
-    return fig
+class SitesSnapshot:
+    """站点数据的只读快照（站点为 MappingProxyType，列表为 tuple），同一版本共用一个对象"""
 
+    __slots__ = ("version", "sites", "_by_id")
 
+    def __init__(self, version: int, sites: tuple):
+        self.version = version
+        self.sites = sites
+        self._by_id = {}
+        for site in sites:
+            self._by_id.setdefault(site.get("id"), site)
 
-def create_type_stats_chart(sites: list, figsize=(6, 4), dpi=100) -> Figure:
-    """Generate type proportion and type balance comparison charts."""
-    type_stats = {}
-    for site in sites:
-        site_type = site.get("type", SITE_TYPE_PAID)
-        if site_type not in type_stats:
-            type_stats[site_type] = {"count": 0, "balance": 0.0}
-        type_stats[site_type]["count"] += 1
-        if site.get("balance_unit") in ("USD", "CNY", ""):
-            type_stats[site_type]["balance"] += float(site.get("balance", 0) or 0)
-
-    if not type_stats:
-        return _create_placeholder_chart("暂无站点分类数据", figsize=figsize, dpi=dpi)
-
-    color_map = {
-        SITE_TYPE_PAID: "#3b82f6",
-        SITE_TYPE_FREE: "#10b981",
-        SITE_TYPE_SUBSCRIPTION: "#f59e0b",
-    }
+    def __len__(self) -> int:
+        return len(self.sites)
 
-    type_keys = list(type_stats.keys())
-    labels = [SITE_TYPE_LABELS.get(t, t) for t in type_keys]
-    counts = [type_stats[t]["count"] for t in type_keys]
-    balances = [type_stats[t]["balance"] for t in type_keys]
-    colors = [color_map.get(t, "#94a3b8") for t in type_keys]
-
-    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=figsize, dpi=dpi)
-
-    if sum(counts) > 0:
-        wedges, texts, autotexts = ax1.pie(
-            counts,
-            labels=labels,
-            colors=colors,
-            startangle=90,
-            autopct=lambda p: f"{p:.0f}%" if p >= 5 else "",
-            pctdistance=0.72,
-            labeldistance=1.07,
-            wedgeprops={"width": 0.40, "edgecolor": "white", "linewidth": 1.2},
-        )
-        for txt in texts:
-            txt.set_fontproperties(FONT_SMALL)
-            txt.set_color("#334155")
-        for txt in autotexts:
-            txt.set_fontproperties(FONT_SMALL)
-            txt.set_color("#0f172a")
-
-        ax1.text(
-            0,
-            0,
-            f"总计\n{sum(counts)}",
-            ha="center",
-            va="center",
-            color="#0f172a",
-            fontproperties=FONT_SUBTITLE,
-        )
-        ax1.set_title("站点类型占比", fontproperties=FONT_SUBTITLE, color="#0f172a", pad=6)
-    else:
-        ax1.text(0.5, 0.5, "无数据", ha="center", va="center", fontproperties=FONT_DEFAULT)
-        ax1.axis("off")
-
-    bars = ax2.bar(labels, balances, color=colors, width=0.58, edgecolor="white", linewidth=1.0)
-    max_balance = max(balances) if balances else 0
-    for bar, value in zip(bars, balances):
-        ax2.text(
-            bar.get_x() + bar.get_width() / 2,
-            value + (max_balance * 0.03 if max_balance > 0 else 0.1),
-            f"${value:,.0f}",
-            ha="center",
-            va="bottom",
-            color="#1f2937",
-            fontproperties=FONT_SMALL,
-        )
+    def __iter__(self):
+        return iter(self.sites)
 
-    ax2.set_title("各类型余额对比", fontproperties=FONT_SUBTITLE, color="#0f172a", pad=6)
-    ax2.set_ylabel("Balance (USD)", fontproperties=FONT_DEFAULT, color="#334155")
-    ax2.yaxis.set_major_formatter(FuncFormatter(lambda y, _: f"${y:,.0f}"))
-    ax2.set_ylim(0, max_balance * 1.28 if max_balance > 0 else 1)
-
-    _set_axis_style(ax2, grid_axis="y")
-    _apply_tick_font(ax2)
-
-    fig.tight_layout()
-    return fig
+    def get(self, site_id: str):
+        """根据ID获取站点"""
+        return self._by_id.get(site_id) if site_id else None
 
 
+class SiteRepository:
+    """
+    站点数据仓库：持有 load_stats 返回的数据，并维护按 ID 和按规范化 URL 的索引，
+    查找、更新、删除都不再遍历整个站点列表。
 
-def create_recharge_trend_chart(sites: list, months: int = 12, figsize=(6, 4), dpi=100) -> Figure:
-    """Generate monthly recharge trend chart."""
-    month_keys = _iter_recent_month_keys(months)
-    month_totals = {key: 0.0 for key in month_keys}
+    所有修改都需通过仓库的方法（update、commit、transaction 等）进行，不要直接修改站点字典：
+    仓库据此维护索引和统计摘要，并记录哪些站点有变化。
+    save() 只标记待保存，由后台线程合并写入（见 persistence），SQLite 后端只序列化有变化的站点；
+    需要立即落盘时调用 flush()。
 
-    for site in sites:
-        for record in site.get("recharge_records", []):
-            amount = float(record.get("amount", 0) or 0)
-            if amount <= 0:
-                continue
-            record_dt = _parse_datetime(record.get("date", ""))
-            if not record_dt:
-                continue
-            month_key = record_dt.strftime("%Y-%m")
-            if month_key in month_totals:
-                month_totals[month_key] += amount
+    线程安全：仓库的方法都在内部锁中执行，每次修改（含 save()）版本号加 1。
+    工作线程应读取 snapshot() 返回的只读快照，并通过 commit() / transaction() 一次提交一批修改。
+    界面可比较快照的版本号，没有变化时跳过重绘。
+    """
 
-    values = [month_totals[key] for key in month_keys]
-    labels = [datetime.strptime(key, "%Y-%m").strftime("%y-%m") for key in month_keys]
+    def __init__(self, data: Optional[dict] = None):
+        self._lock = threading.RLock()
+        self._version = 0
+        self._snapshot = None
+        self._aggregates = SiteAggregates()
+        self._writer = CoalescingWriter(self._write, delay=get_stats_save_delay(), name="stats-writer")
+        self.data = {"sites": []}
+        self._by_id = {}
+        self._by_url = {}
+        self._url_of = {}  # id(站点字典) -> 建立索引时的规范化 URL
+        self._changed_ids = set()  # 上次写入后修改过的站点ID
+        self._full_save = False    # 站点有增删等结构变化，需要整体保存
+        self._set_data(data if data is not None else {"sites": []})
+
+    @classmethod
+    def load(cls) -> "SiteRepository":
+        """从当前存储后端加载"""
+        return cls(load_stats())
+
+    def reload(self):
+        """重新从存储后端加载（仓库对象不变，共享它的模块会看到新数据）"""
+        self._writer.flush()
+        data = load_stats()
+        with self._lock:
+            self._set_data(data)
+            self._version += 1
+
+    def _write(self) -> bool:
+        # 在锁内取出待保存的修改并复制，写入期间其他线程可以继续提交修改
+        with self._lock:
+            changed_ids, self._changed_ids = self._changed_ids, set()
+            full_save, self._full_save = self._full_save or not changed_ids, False
+            changed_sites = None
+            if not full_save:
+                changed_sites = [copy.deepcopy(self._by_id[site_id]) for site_id in changed_ids if site_id in self._by_id]
+        if changed_sites is not None and save_sites(changed_sites):
+            return True
+        with self._lock:
+            data = copy.deepcopy(self.data)
+        if save_stats(data):
+            return True
+        # 写入失败，保留待保存的修改，下次重试时整体保存
+        with self._lock:
+            self._changed_ids |= changed_ids
+            self._full_save = True
+        return False
 
-    if max(values, default=0) <= 0:
-        return _create_placeholder_chart("暂无充值记录", figsize=figsize, dpi=dpi)
+    def _mark_changed(self, site: dict):
+        """记录有修改的站点（调用方持有锁）"""
+        site_id = site.get("id")
+        if site_id and self._by_id.get(site_id) is site:
+            self._changed_ids.add(site_id)
+        else:
+            self._full_save = True
 
-    fig, ax = plt.subplots(figsize=figsize, dpi=dpi)
+    def save(self) -> bool:
+        """标记修改待保存，合并窗口内的多次调用只写入一次（SQLite 后端只序列化有变化的站点）"""
+        with self._lock:
+            self._version += 1
+        self._writer.mark_dirty()
+        return True
 
-    ax.plot(labels, values, color="#2563eb", linewidth=2.2, marker="o", markersize=5.5)
-    ax.fill_between(labels, values, color="#93c5fd", alpha=0.28)
+    def flush(self) -> bool:
+        """立即写入尚未保存的修改"""
+        return self._writer.flush()
+
+    def summary(self) -> dict:
+        """
+        统计摘要（增量维护，不遍历站点）
+
+        Returns:
+            格式同 get_stats_summary，另有 recharge_by_month: {"YYYY-MM": 充值金额}
+        """
+        with self._lock:
+            return self._aggregates.summary()
+
+    # === 快照与批量提交 ===
+
+    @property
+    def version(self) -> int:
+        """数据版本号，每次修改加 1"""
+        with self._lock:
+            return self._version
+
+    def snapshot(self) -> SitesSnapshot:
+        """当前数据的只读快照（版本号不变时返回同一对象）"""
+        with self._lock:
+            if self._snapshot is None or self._snapshot.version != self._version:
+                self._snapshot = SitesSnapshot(self._version, freeze(self.data["sites"]))
+            return self._snapshot
+
+    @contextmanager
+    def transaction(self):
+        """
+        在锁内执行一组修改，结束后版本号加 1 并标记待保存
+
+        用法:
+            with repo.transaction():
+                repo.update(...)
+                repo.delete(...)
+        """
+        with self._lock:
+            try:
+                yield self
+            finally:
+                self._version += 1
+        self._writer.mark_dirty()
+
+    def commit(self, updates: dict) -> int:
+        """
+        一次提交多个站点的字段修改（工作线程收集结果后调用）
+
+        Args:
+            updates: 站点ID -> 要更新的字段
+
+        Returns:
+            int: 实际更新的站点数
+        """
+        if not updates:
+            return 0
+        with self.transaction():
+            return sum(1 for site_id, fields in updates.items() if self.update(site_id, fields))
+
+    def _set_data(self, data: dict):
+        if not isinstance(data.get("sites"), list):
+            data["sites"] = []
+        self.data = data
+        self._by_id = {}
+        self._by_url = {}
+        self._url_of = {}
+        for site in self.data["sites"]:
+            self._index(site)
+        self._aggregates = SiteAggregates(self.data["sites"])
+        self._changed_ids = set()
+        self._full_save = False
+
+    def _index(self, site: dict):
+        site_id = site.get("id")
+        if site_id and site_id not in self._by_id:
+            self._by_id[site_id] = site
+        url_key = normalize_site_url(site.get("url", ""))
+        self._by_url.setdefault(url_key, []).append(site)
+        self._url_of[id(site)] = url_key
+
+    def _unindex(self, site: dict):
+        site_id = site.get("id")
+        if site_id and self._by_id.get(site_id) is site:
+            del self._by_id[site_id]
+        url_key = self._url_of.pop(id(site), normalize_site_url(site.get("url", "")))
+        same_url = self._by_url.get(url_key, [])
+        for index, other in enumerate(same_url):
+            if other is site:
+                del same_url[index]
+                break
+        if not same_url:
+            self._by_url.pop(url_key, None)
+
+    # === 查询 ===
+
+    @property
+    def sites(self) -> list:
+        """站点列表（仅限 Tk 主线程读取，修改请通过仓库的方法，其他线程请用 snapshot()）"""
+        return self.data["sites"]
+
+    def __len__(self) -> int:
+        return len(self.data["sites"])
+
+    def __iter__(self):
+        return iter(self.data["sites"])
+
+    def get(self, site_id: str) -> Optional[dict]:
+        """根据ID获取站点"""
+        with self._lock:
+            return self._by_id.get(site_id) if site_id else None
+
+    def get_by_url(self, url: str) -> Optional[dict]:
+        """根据 URL 获取站点（忽略末尾的 /，有多个时返回最早添加的）"""
+        with self._lock:
+            same_url = self._by_url.get(normalize_site_url(url))
+            return same_url[0] if same_url else None
+
+    # === 修改 ===
+
+    def add(self, site: dict) -> dict:
+        """添加站点"""
+        with self._lock:
+            self.data["sites"].append(site)
+            self._index(site)
+            self._aggregates.add_site(site)
+            self._full_save = True
+            self._version += 1
+        return site
+
+    def add_many(self, sites: list) -> list:
+        """批量添加站点"""
+        with self._lock:
+            for site in sites:
+                self.add(site)
+        return sites
+
+    def update(self, site_id: str, updates: dict) -> bool:
+        """更新站点信息（包含 url 时同步更新 URL 索引）"""
+        with self._lock:
+            site = self.get(site_id)
+            if site is None:
+                return False
+            if "url" in updates and normalize_site_url(updates["url"]) != self._url_of.get(id(site)):
+                self._unindex(site)
+                site.update(updates)
+                self._index(site)
+            else:
+                site.update(updates)
+            self._aggregates.update_site(site)
+            if "id" in updates:
+                self._full_save = True
+            else:
+                self._mark_changed(site)
+            self._version += 1
+            return True
 
-    peak = max(values)
-    for idx, value in enumerate(values):
-        if value <= 0:
-            continue
-        ax.text(
-            idx,
-            value + peak * 0.03,
-            f"${value:,.0f}",
-            ha="center",
-            va="bottom",
-            color="#1f2937",
-            fontproperties=FONT_SMALL,
-        )
+    def delete(self, site_id: str) -> bool:
+        """删除站点"""
+        with self._lock:
+            site = self.get(site_id)
+            if site is None:
+                return False
+            self._unindex(site)
+            self._aggregates.remove_site(site)
+            sites = self.data["sites"]
+            for index, other in enumerate(sites):
+                if other is site:
+                    del sites[index]
+                    break
+            # 同 ID 的重复站点（旧数据）补回索引
+            for other in sites:
+                if other.get("id") == site_id:
+                    self._by_id[site_id] = other
+                    break
+            self._full_save = True
+            self._version += 1
+            return True
 
-    ax.set_title("充值趋势（近12个月）", fontproperties=FONT_TITLE, color="#0f172a", pad=10)
-    ax.set_xlabel("Month", fontproperties=FONT_DEFAULT, color="#334155")
-    ax.set_ylabel("Amount (USD)", fontproperties=FONT_DEFAULT, color="#334155")
-    ax.yaxis.set_major_formatter(FuncFormatter(lambda y, _: f"${y:,.0f}"))
-    ax.set_ylim(0, peak * 1.25)
+    def update_balance(self, url: str, balance: float, unit: str = "USD") -> bool:
+        """根据 URL 更新站点余额（查询后自动调用）"""
+        with self._lock:
+            site = self.get_by_url(url)
+            if site is None:
+                return False
+            site["balance"] = balance
+            site["balance_unit"] = unit
+            site["last_query_time"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            self._aggregates.update_site(site)
+            self._mark_changed(site)
+            self._version += 1
+            return True
 
-    _set_axis_style(ax, grid_axis="y")
-    _apply_tick_font(ax)
+    def add_recharge(self, site_id: str, amount: float, date: str = None, note: str = "") -> Optional[dict]:
+        """为站点添加充值记录，返回新记录（站点不存在时为 None）"""
+        with self._lock:
+            site = self.get(site_id)
+            if site is None:
+                return None
+            site.setdefault("recharge_records", [])
+            record = add_recharge_record(site, amount, date, note)
+            self._aggregates.add_record(site, record)
+            self._mark_changed(site)
+            self._version += 1
+            return record
+
+    def delete_recharge(self, site_id: str, record_id: str) -> bool:
+        """删除站点的充值记录"""
+        with self._lock:
+            site = self.get(site_id)
+            if site is None:
+                return False
+            for record in site.get("recharge_records", []) or []:
+                if record.get("id") == record_id:
+                    break
+            else:
+                return False
+            delete_recharge_record(site, record_id)
+            self._aggregates.remove_record(site, record)
+            self._mark_changed(site)
+            self._version += 1
+            return True
 
-    step = max(1, len(labels) // 6)
-    for idx, label in enumerate(ax.get_xticklabels()):
-        label.set_visible(idx % step == 0 or idx == len(labels) - 1)
+    def import_profiles(self, profiles: list) -> list:
+        """从配置文件的 profiles 导入站点（按 URL 去重），返回新导入的站点"""
+        with self._lock:
+            new_sites = import_from_profiles(profiles, [{"url": url} for url in self._by_url])
+            return self.add_many(new_sites)
+
+    def set_api_format(self, site_id: str, auth_type: str, api_format: list) -> bool:
+        """记录站点识别到的余额接口格式，有变化时返回 True"""
+        with self._lock:
+            site = self.get(site_id)
+            if site is None or not set_site_api_format(site, auth_type, api_format):
+                return False
+            self._mark_changed(site)
+            self._version += 1
+            return True
 
-    fig.tight_layout()
-    return fig
 
+def get_site_api_format(site: dict, auth_type: str = "bearer") -> list:
+    """获取站点上次识别到的余额接口格式（按认证方式区分）"""
+    formats = site.get("balance_api_format", {})
+    if not isinstance(formats, Mapping):
+        return []
+    return list(formats.get(auth_type) or [])
 
 
-def create_checkin_activity_chart(logs=None, days: int = 30, figsize=(6, 4), dpi=100) -> Figure:
-    """Generate recent check-in activity chart (success/failure + quota trend)."""
-    if logs is None:
-        logs = load_checkin_log()
+def set_site_api_format(site: dict, auth_type: str, api_format: list) -> bool:
+    """记录站点识别到的余额接口格式，有变化时返回 True"""
+    if not api_format:
+        return False
+    formats = site.get("balance_api_format")
+    if not isinstance(formats, dict):
+        formats = {}
+    if formats.get(auth_type) == list(api_format):
+        return False
+    formats[auth_type] = list(api_format)
+    site["balance_api_format"] = formats
+    return True
 
-    today = datetime.now().date()
-    date_list = [today - timedelta(days=offset) for offset in range(max(days, 1) - 1, -1, -1)]
-    date_keys = [d.strftime("%Y-%m-%d") for d in date_list]
 
-    success_map = {key: 0 for key in date_keys}
-    fail_map = {key: 0 for key in date_keys}
-    quota_map = {key: 0.0 for key in date_keys}
+def _parse_datetime(value: str):
+    if not value:
+        return None
+    raw = str(value).strip()
+    if not raw:
+        return None
 
-    for log in logs:
-        log_dt = _parse_datetime(log.get("time", ""))
-        if not log_dt:
-            continue
-        key = log_dt.strftime("%Y-%m-%d")
-        if key not in success_map:
+    formats = (
+        "%Y-%m-%d %H:%M:%S",
+        "%Y-%m-%d",
+        "%Y/%m/%d",
+        "%Y/%m/%d %H:%M:%S",
+    )
+    for fmt in formats:
+        try:
+            return datetime.strptime(raw, fmt)
+        except ValueError:
             continue
 
-        if log.get("success"):
-            success_map[key] += 1
-            quota_map[key] += float(log.get("quota_awarded", 0) or 0)
-        else:
-            fail_map[key] += 1
-
-    success_values = [success_map[key] for key in date_keys]
-    fail_values = [fail_map[key] for key in date_keys]
-    quota_values = [quota_map[key] for key in date_keys]
-
-    if max(success_values + fail_values, default=0) <= 0 and max(quota_values, default=0) <= 0:
-        return _create_placeholder_chart("暂无签到记录", figsize=figsize, dpi=dpi)
-
-    fig, ax1 = plt.subplots(figsize=figsize, dpi=dpi)
-    x_positions = list(range(len(date_keys)))
-
-    ax1.bar(
-        x_positions,
-        success_values,
-        color="#10b981",
-        width=0.72,
-        label="成功",
-        edgecolor="white",
-        linewidth=0.8,
-    )
-    ax1.bar(
-        x_positions,
-        fail_values,
-        bottom=success_values,
-        color="#f97316",
-        width=0.72,
-        label="失败",
-        edgecolor="white",
-        linewidth=0.8,
-    )
+    try:
+        return datetime.fromisoformat(raw)
+    except ValueError:
+        return None
 
-    ax2 = ax1.twinx()
-    ax2.plot(
-        x_positions,
-        quota_values,
-        color="#6366f1",
-        marker="o",
-        markersize=3.8,
-        linewidth=2.0,
-        label="额度(USD)",
-    )
 
-    display_labels = [datetime.strptime(key, "%Y-%m-%d").strftime("%m-%d") for key in date_keys]
-    step = max(1, len(display_labels) // 7)
-    tick_pos = [idx for idx in range(len(display_labels)) if (idx % step == 0 or idx == len(display_labels) - 1)]
-    tick_labels = [display_labels[idx] for idx in tick_pos]
-    ax1.set_xticks(tick_pos)
-    ax1.set_xticklabels(tick_labels)
+def _parse_datetime_column(values) -> np.ndarray:
+    """
+    批量解析日期时间字符串为 datetime64[s] 数组（无法解析的为 NaT）
 
-    ax1.set_title("签到活跃度（近30天）", fontproperties=FONT_TITLE, color="#0f172a", pad=10)
-    ax1.set_ylabel("Check-in Count", fontproperties=FONT_DEFAULT, color="#334155")
-    ax2.set_ylabel("Quota (USD)", fontproperties=FONT_DEFAULT, color="#334155")
+    整列一次交给 NumPy 解析（"/" 分隔的日期先统一为 "-"），
+    整列解析失败（含无效值或带时区的值）时再逐个交给 _parse_datetime。
+    """
+    raw = np.array([str(value or "").strip() for value in values], dtype=str)
+    if not len(raw):
+        return np.zeros(0, dtype="datetime64[s]")
+    raw = np.char.replace(raw, "/", "-")
+    try:
+        with warnings.catch_warnings():
+            # 带时区的值 NumPy 会换算为 UTC 并警告，这里按本地时间处理，交给逐个解析
+            warnings.simplefilter("error")
+            return raw.astype("datetime64[s]")
+    except (ValueError, Warning):
+        pass
+
+    parsed = np.full(len(raw), np.datetime64("NaT"), dtype="datetime64[s]")
+    for index, text in enumerate(raw.tolist()):
+        value_dt = _parse_datetime(text)
+        if value_dt:
+            parsed[index] = np.datetime64(value_dt.replace(tzinfo=None), "s")
+    return parsed
+
+
+def _record_months(records: list) -> list:
+    """批量计算充值记录计入的月份（见 _record_month）"""
+    amounts = []
+    for record in records:
+        try:
+            amounts.append(float(record.get("amount", 0) or 0))
+        except (TypeError, ValueError):
+            amounts.append(0.0)
+    dates = _parse_datetime_column([record.get("date", "") for record in records])
+    months = np.datetime_as_string(dates.astype("datetime64[M]"))
+    valid = ~np.isnat(dates) & (np.asarray(amounts) > 0)
+    return [month if ok else None for month, ok in zip(months.tolist(), valid.tolist())]
+
+
+class CheckinColumns:
+    """签到日志的列式数组（day: datetime64[D]，success: bool，quota: float）"""
+
+    __slots__ = ("day", "success", "quota")
+
+    def __init__(self, logs: list):
+        self.day = _parse_datetime_column([log.get("time", "") for log in logs]).astype("datetime64[D]")
+        self.success = np.array([bool(log.get("success")) for log in logs], dtype=bool)
+        quota = []
+        for log in logs:
+            try:
+                quota.append(float(log.get("quota_awarded", 0) or 0))
+            except (TypeError, ValueError):
+                quota.append(0.0)
+        self.quota = np.array(quota, dtype=np.float64)
+
+    def daily(self, start, days: int):
+        """从 start（datetime64[D]）起 days 天内每天的 (成功次数, 失败次数, 成功获得的额度)"""
+        offsets = (self.day - start).astype(np.int64)
+        in_range = ~np.isnat(self.day) & (offsets >= 0) & (offsets < days)
+        ok = in_range & self.success
+        failed = in_range & ~self.success
+        return (
+            np.bincount(offsets[ok], minlength=days),
+            np.bincount(offsets[failed], minlength=days),
+            np.bincount(offsets[ok], weights=self.quota[ok], minlength=days),
+        )
 
-    _set_axis_style(ax1, grid_axis="y")
-    ax2.spines["top"].set_visible(False)
-    ax2.spines["left"].set_visible(False)
-    ax2.spines["right"].set_color("#cbd5e1")
-    ax2.tick_params(colors="#334155", labelsize=9)
 
-    ax2.yaxis.set_major_formatter(FuncFormatter(lambda y, _: f"${y:,.1f}"))
+_checkin_columns_cache = {"version": None, "columns": None}
+_checkin_columns_lock = threading.Lock()
 
-    _apply_tick_font(ax1)
-    _apply_tick_font(ax2)
 
-    handles1, labels1 = ax1.get_legend_handles_labels()
-    handles2, labels2 = ax2.get_legend_handles_labels()
-    legend = ax1.legend(handles1 + handles2, labels1 + labels2, loc="upper left", frameon=False, fontsize=8.8)
-    for text_item in legend.get_texts():
-        text_item.set_fontproperties(FONT_SMALL)
+def get_checkin_log_version():
+    """签到日志的数据版本（有新记录或被替换后变化）"""
+    if get_stats_backend() == STATS_BACKEND_SQLITE:
+        return (STATS_BACKEND_SQLITE, _get_stats_db().get_checkin_log_version())
+    return (STATS_BACKEND_JSON, _get_checkin_journal().version)
 
-    peak_count = max([s + f for s, f in zip(success_values, fail_values)], default=0)
-    ax1.set_ylim(0, peak_count * 1.28 if peak_count > 0 else 1)
 
-    peak_quota = max(quota_values, default=0)
-    ax2.set_ylim(0, peak_quota * 1.25 if peak_quota > 0 else 1)
+def get_checkin_log_signature() -> tuple:
+    """签到日志的持久版本（重启后仍可比较，用于图表磁盘缓存；JSON 后端取日志文件的大小和修改时间）"""
+    if get_stats_backend() == STATS_BACKEND_SQLITE:
+        return get_checkin_log_version()
+    try:
+        stat = os.stat(_get_checkin_journal().path)
+    except OSError:
+        return (STATS_BACKEND_JSON, 0, 0)
+    return (STATS_BACKEND_JSON, stat.st_size, stat.st_mtime_ns)
+
 
-    fig.tight_layout()
-    return fig
+def load_checkin_columns() -> CheckinColumns:
+    """签到日志的列式数组（按数据版本缓存，日志没有变化时不重新解析）"""
+    version = get_checkin_log_version()
+    with _checkin_columns_lock:
+        if _checkin_columns_cache["version"] != version:
+            _checkin_columns_cache["columns"] = CheckinColumns(load_checkin_log())
+            _checkin_columns_cache["version"] = version
+        return _checkin_columns_cache["columns"]
 
 
 def get_stats_summary(sites: list) -> dict:
     """
-    获取统计摘要
+    获取统计摘要（遍历全部站点；共享 SiteRepository 时用 repo.summary()，修改后无需重新遍历）
 
     Returns:
         {
@@ -672,32 +996,26 @@ def get_stats_summary(sites: list) -> dict:
                 "paid": {"count": 5, "balance": 300},
                 "free": {"count": 3, "balance": 100},
                 "subscription": {"count": 2, "balance": 100}
-            }
+            },
+            "recharge_by_month": {"2025-01": 100.0, ...}
         }
     """
-    summary = {
-        "total_sites": len(sites),
-        "total_balance_usd": 0,
-        "total_recharge": 0,
-        "by_type": {}
-    }
-
-    for site in sites:
-        site_type = site.get("type", SITE_TYPE_PAID)
-
-        if site_type not in summary["by_type"]:
-            summary["by_type"][site_type] = {"count": 0, "balance": 0}
+    return SiteAggregates(sites).summary()
 
-        summary["by_type"][site_type]["count"] += 1
 
-        # 统计余额（只计 USD/CNY）
-        if site.get("balance_unit") in ("USD", "CNY", ""):
-            balance = site.get("balance", 0)
-            summary["by_type"][site_type]["balance"] += balance
-            summary["total_balance_usd"] += balance
+# 图表函数已移到 charts 模块，保留从 stats 导入的旧写法（访问时才导入 matplotlib）
+_CHART_EXPORTS = (
+    "create_balance_bar_chart",
+    "create_type_stats_chart",
+    "create_recharge_trend_chart",
+    "create_checkin_activity_chart",
+    "create_model_usage_chart",
+    "create_usage_trend_chart",
+)
 
-        # 统计充值总额
-        for record in site.get("recharge_records", []):
-            summary["total_recharge"] += record.get("amount", 0)
 
-    return summary
+def __getattr__(name):
+    if name in _CHART_EXPORTS:
+        from konata_api import charts
+        return getattr(charts, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,393 @@
+"""统计数据 SQLite 存储 - 站点、充值记录和签到日志按行保存
+
+启用后（config.json 中 stats_storage.backend 为 "sqlite"）代替 stats.json 和签到日志文件：
+每个站点、每条充值记录、每条签到日志各占一行，修改只更新变化的行，不再重写整个文件。
+首次打开时自动从现有的 stats.json 和签到日志导入（原文件保留不动）。
+站点的完整字段以 JSON 保存在 data 列中，新增字段无需改表结构。
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from typing import Optional
+
+from konata_api.utils import get_exe_dir
+
+
+SCHEMA_VERSION = 2   # 2: 充值记录主键改为 (site_id, id)，不同站点的记录ID可以相同
+
+_RECHARGE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS recharge_records (
+    site_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (site_id, id)
+);
+CREATE INDEX IF NOT EXISTS idx_recharge_site ON recharge_records(site_id, position);
+"""
+
+_SCHEMA = _RECHARGE_SCHEMA + """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS sites (
+    id TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    url TEXT NOT NULL DEFAULT '',
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_sites_url ON sites(url);
+CREATE TABLE IF NOT EXISTS checkin_log (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    time TEXT NOT NULL,
+    site_id TEXT NOT NULL DEFAULT '',
+    success INTEGER NOT NULL DEFAULT 0,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_checkin_time ON checkin_log(time);
+"""
+
+
+def get_stats_db_path() -> str:
+    """获取统计数据库文件路径"""
+    return os.path.join(get_exe_dir(), "config", "stats.db")
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, ensure_ascii=False)
+
+
+def _site_body(site: dict) -> str:
+    """站点行内容（充值记录单独成行）"""
+    return _dumps({k: v for k, v in site.items() if k != "recharge_records"})
+
+
+def _row_keys(ids: list, prefix: str) -> list:
+    """
+    为列表中的每一项确定行键：优先使用自身的 ID，缺失或与前面重复时改用 前缀+下标
+    （同样不与已有的键重复），保证同一列表中不会有两项写入同一行
+    """
+    keys = []
+    used = set()
+    for index, item_id in enumerate(ids):
+        key = str(item_id) if item_id else ""
+        if not key or key in used:
+            key = f"{prefix}{index}"
+            while key in used or key in ids:
+                key += "_"
+        used.add(key)
+        keys.append(key)
+    return keys
+
+
+def _assign_positions(keys: list, cached_positions: dict) -> dict:
+    """
+    为有序列表分配排序值：已有排序值仍保持递增的沿用，只给新增或顺序变化的项重新分配，
+    这样删除或追加一项不会导致其余行全部更新
+    """
+    positions = {}
+    previous = -1
+    for key in keys:
+        position = cached_positions.get(key)
+        if position is None or position <= previous:
+            position = previous + 1
+        positions[key] = position
+        previous = position
+    return positions
+
+
+class StatsDatabase:
+    """统计数据库（单个连接，内部加锁，可在工作线程中调用）"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or get_stats_db_path()
+        self._lock = threading.RLock()
+        self._conn = None
+        # 最近一次读写后数据库中的内容，用于 save_stats 只写入变化的行
+        self._site_rows = {}    # site_id -> (position, url, data)
+        self._record_rows = {}  # site_id -> {record_id: (position, data)}
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            row = conn.execute("SELECT value FROM meta WHERE key = 'schema_version'").fetchone()
+            if row is not None and int(row[0]) < 2:
+                self._upgrade_recharge_key(conn)
+            conn.execute(
+                "INSERT OR REPLACE INTO meta(key, value) VALUES ('schema_version', ?)", (str(SCHEMA_VERSION),)
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def _upgrade_recharge_key(conn: sqlite3.Connection):
+        """版本 1 -> 2：充值记录表按 (site_id, id) 重建（旧表中的行原样复制）"""
+        conn.executescript(
+            "BEGIN;"
+            "ALTER TABLE recharge_records RENAME TO recharge_records_v1;"
+            "DROP INDEX IF EXISTS idx_recharge_site;"
+            + _RECHARGE_SCHEMA +
+            "INSERT OR IGNORE INTO recharge_records(site_id, id, position, data) "
+            "SELECT site_id, id, position, data FROM recharge_records_v1;"
+            "DROP TABLE recharge_records_v1;"
+            "COMMIT;"
+        )
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    # === 元数据与迁移 ===
+
+    def get_meta(self, key: str, default: str = "") -> str:
+        with self._lock:
+            row = self._connect().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+            return row[0] if row else default
+
+    def set_meta(self, key: str, value: str):
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO meta(key, value) VALUES (?, ?)", (key, value))
+
+    def migrate_from_json(self, stats_data: dict, checkin_logs: list) -> bool:
+        """
+        从 JSON 数据一次性导入（已导入过则跳过）
+
+        Args:
+            stats_data: stats.json 的内容
+            checkin_logs: 现有的签到日志（从新到旧）
+
+        Returns:
+            bool: 本次是否执行了导入
+        """
+        with self._lock:
+            if self.get_meta("migrated_from_json"):
+                return False
+            conn = self._connect()
+            site_rows, record_rows = self._build_rows(stats_data)
+            with conn:
+                self._write_changed_rows(conn, site_rows, record_rows)
+                conn.executemany(
+                    "INSERT INTO checkin_log(time, site_id, success, data) VALUES (?, ?, ?, ?)",
+                    [self._checkin_row(record) for record in reversed(checkin_logs or [])],
+                )
+                conn.execute("INSERT OR REPLACE INTO meta(key, value) VALUES ('migrated_from_json', '1')")
+            self._site_rows = site_rows
+            self._record_rows = record_rows
+            return True
+
+    # === 站点 ===
+
+    def load_stats(self) -> dict:
+        """读取全部站点（格式同 stats.json）"""
+        with self._lock:
+            conn = self._connect()
+            sites = []
+            by_id = {}
+            self._site_rows = {}
+            for site_id, position, url, data in conn.execute(
+                "SELECT id, position, url, data FROM sites ORDER BY position, rowid"
+            ):
+                site = json.loads(data)
+                site["recharge_records"] = []
+                sites.append(site)
+                by_id[site_id] = site
+                self._site_rows[site_id] = (position, url, data)
+
+            self._record_rows = {}
+            for site_id, record_id, position, data in conn.execute(
+                "SELECT site_id, id, position, data FROM recharge_records ORDER BY site_id, position, rowid"
+            ):
+                self._record_rows.setdefault(site_id, {})[record_id] = (position, data)
+                if site_id in by_id:
+                    by_id[site_id]["recharge_records"].append(json.loads(data))
+            return {"sites": sites}
+
+    def _build_rows(self, data: dict):
+        """
+        把站点数据转换为各表的行内容 (site_rows, record_rows)
+
+        没有ID或与前面站点ID重复的站点（旧版数据）改用新的ID保存，不会被跳过或合并到同一行
+        """
+        sites = data.get("sites", [])
+        site_ids = _row_keys([site.get("id") for site in sites], "site-")
+        site_positions = _assign_positions(
+            site_ids,
+            {site_id: row[0] for site_id, row in self._site_rows.items()},
+        )
+
+        site_rows = {}
+        record_rows = {}
+        for site_id, site in zip(site_ids, sites):
+            if site.get("id") != site_id:
+                site = dict(site, id=site_id)
+            site_rows[site_id], record_rows[site_id] = self._rows_of_site(site_id, site_positions[site_id], site)
+        return site_rows, record_rows
+
+    def _rows_of_site(self, site_id: str, position: int, site: dict):
+        """单个站点的行内容 (site_row, {record_id: record_row})，充值记录沿用已有的排序值"""
+        site_row = (position, str(site.get("url", "")).rstrip("/"), _site_body(site))
+        records = site.get("recharge_records", []) or []
+        record_ids = _row_keys([record.get("id") for record in records], f"{site_id}-")
+        record_positions = _assign_positions(
+            record_ids,
+            {record_id: row[0] for record_id, row in self._record_rows.get(site_id, {}).items()},
+        )
+        record_rows = {
+            record_id: (record_positions[record_id], _dumps(record))
+            for record_id, record in zip(record_ids, records)
+        }
+        return site_row, record_rows
+
+    def _write_site_rows(self, conn: sqlite3.Connection, site_id: str, site_row: tuple, record_rows: dict):
+        """写入单个站点中变化的行，并删除已移除的充值记录（调用方负责事务）"""
+        if self._site_rows.get(site_id) != site_row:
+            conn.execute(
+                "INSERT OR REPLACE INTO sites(id, position, url, data) VALUES (?, ?, ?, ?)",
+                (site_id, *site_row),
+            )
+        cached_records = self._record_rows.get(site_id, {})
+        for record_id, row in record_rows.items():
+            if cached_records.get(record_id) != row:
+                conn.execute(
+                    "INSERT OR REPLACE INTO recharge_records(site_id, id, position, data) VALUES (?, ?, ?, ?)",
+                    (site_id, record_id, *row),
+                )
+        conn.executemany(
+            "DELETE FROM recharge_records WHERE site_id = ? AND id = ?",
+            [(site_id, record_id) for record_id in cached_records if record_id not in record_rows],
+        )
+
+    def _write_changed_rows(self, conn: sqlite3.Connection, site_rows: dict, record_rows: dict):
+        """与上次读写的内容比较，只写入新增、修改和删除的行（调用方负责事务）"""
+        for site_id, site_row in site_rows.items():
+            self._write_site_rows(conn, site_id, site_row, record_rows.get(site_id, {}))
+        removed_sites = [(site_id,) for site_id in self._site_rows if site_id not in site_rows]
+        conn.executemany("DELETE FROM sites WHERE id = ?", removed_sites)
+        removed_records = [
+            (site_id, record_id)
+            for site_id, rows in self._record_rows.items() if site_id not in site_rows
+            for record_id in rows
+        ]
+        conn.executemany("DELETE FROM recharge_records WHERE site_id = ? AND id = ?", removed_records)
+
+    def save_stats(self, data: dict) -> bool:
+        """
+        保存全部站点（兼容 stats.json 的整体保存方式），实际只写入变化的行
+
+        Returns:
+            bool: 是否保存成功
+        """
+        with self._lock:
+            conn = self._connect()
+            site_rows, record_rows = self._build_rows(data)
+            try:
+                with conn:
+                    self._write_changed_rows(conn, site_rows, record_rows)
+            except sqlite3.Error:
+                return False
+            self._site_rows = site_rows
+            self._record_rows = record_rows
+            return True
+
+    def save_sites(self, sites: list) -> bool:
+        """
+        只保存给定的站点及其充值记录（站点的增删和顺序没有变化时使用），其余站点不会被序列化
+
+        Returns:
+            bool: 是否保存成功；有站点不在数据库中（需要整体保存）时返回 False
+        """
+        with self._lock:
+            if any(site.get("id") not in self._site_rows for site in sites):
+                return False
+            conn = self._connect()
+            rows = {}
+            for site in sites:
+                site_id = site["id"]
+                rows[site_id] = self._rows_of_site(site_id, self._site_rows[site_id][0], site)
+            try:
+                with conn:
+                    for site_id, (site_row, record_rows) in rows.items():
+                        self._write_site_rows(conn, site_id, site_row, record_rows)
+            except sqlite3.Error:
+                return False
+            for site_id, (site_row, record_rows) in rows.items():
+                self._site_rows[site_id] = site_row
+                self._record_rows[site_id] = record_rows
+            return True
+
+    # === 签到日志 ===
+
+    @staticmethod
+    def _checkin_row(record: dict) -> tuple:
+        return (
+            str(record.get("time", "")),
+            str(record.get("site_id", "")),
+            1 if record.get("success") else 0,
+            _dumps(record),
+        )
+
+    def add_checkin_log(self, record: dict, keep: int) -> bool:
+        """追加一条签到日志，只保留最近 keep 条"""
+        with self._lock:
+            conn = self._connect()
+            try:
+                with conn:
+                    cursor = conn.execute(
+                        "INSERT INTO checkin_log(time, site_id, success, data) VALUES (?, ?, ?, ?)",
+                        self._checkin_row(record),
+                    )
+                    conn.execute("DELETE FROM checkin_log WHERE seq <= ?", (cursor.lastrowid - keep,))
+                return True
+            except sqlite3.Error:
+                return False
+
+    def replace_checkin_log(self, logs: list) -> bool:
+        """用给定的日志（从新到旧）替换全部签到日志"""
+        with self._lock:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.execute("DELETE FROM checkin_log")
+                    conn.executemany(
+                        "INSERT INTO checkin_log(time, site_id, success, data) VALUES (?, ?, ?, ?)",
+                        [self._checkin_row(record) for record in reversed(logs)],
+                    )
+                return True
+            except sqlite3.Error:
+                return False
+
+    def load_checkin_log(self, limit: Optional[int] = None) -> list:
+        """读取签到日志（从新到旧）"""
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT data FROM checkin_log ORDER BY seq DESC LIMIT ?",
+                (-1 if limit is None else limit,),
+            )
+            return [json.loads(data) for (data,) in rows]
+
+    def get_checkin_log_version(self) -> int:
+        """签到日志的数据版本（最大序号：序号自增不复用，追加或替换后都会变化）"""
+        with self._lock:
+            row = self._connect().execute("SELECT MAX(seq) FROM checkin_log").fetchone()
+            return row[0] or 0
+
+    def get_checkin_site_ids(self, day: str) -> set:
+        """某天（YYYY-MM-DD）签到成功的站点ID集合"""
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT DISTINCT site_id FROM checkin_log WHERE time >= ? AND time < ? AND success = 1",
+                (day, day + "~"),
+            )
+            return {site_id for (site_id,) in rows}
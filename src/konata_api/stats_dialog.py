@@ -1,7 +1,6 @@
 """
 统计模块 GUI - 站点档案管理
 """
-import io
 import json
 from datetime import datetime
 import webbrowser
@@ -10,39 +9,44 @@ import tkinter as tk
 from ttkbootstrap.constants import *
 from ttkbootstrap.scrolled import ScrolledFrame, ScrolledText
 from tkinter import messagebox, Text
-from PIL import Image, ImageTk
 
 from konata_api.utils import resource_path, fit_toplevel
 from konata_api.stats import (
-    load_stats, save_stats, create_site, add_site, update_site, delete_site,
-    get_site_by_id, add_recharge_record, delete_recharge_record,
-    add_checkin_log,
-    import_from_profiles, get_stats_summary,
-    create_balance_bar_chart, create_type_stats_chart,
-    create_recharge_trend_chart, create_checkin_activity_chart,
+    SiteRepository, create_site,
+    add_checkin_log, get_checkin_log_signature,
     SITE_TYPE_PAID, SITE_TYPE_FREE, SITE_TYPE_SUBSCRIPTION, SITE_TYPE_LABELS
 )
 from konata_api.api import query_balance_by_cookie, do_checkin
+from konata_api.balance_history import (
+    record_balance, delete_balance_history, SOURCE_COOKIE, SOURCE_CHECKIN, SOURCE_MANUAL,
+)
+from konata_api.chart_cache import chart_cache_key
+from konata_api.chart_render import submit_chart, rgba_to_pil, to_photo_image
+from konata_api.log_analytics import get_log_store_signature
 
 
 class StatsFrame(ttk.Frame):
     """统计模块面板（嵌入式 Frame）"""
 
-    def __init__(self, parent, profiles=None, show_site_list=True, on_save_callback=None, **kwargs):
+    def __init__(self, parent, profiles=None, show_site_list=True, on_save_callback=None, site_repo=None, **kwargs):
         """
         Args:
             parent: 父窗口
             profiles: 主配置中的 profiles 列表（用于导入）
             show_site_list: 是否显示站点列表（嵌入主窗口时可隐藏）
             on_save_callback: 保存站点后的回调函数
+            site_repo: 共享的 SiteRepository（留空则自行加载）
         """
         super().__init__(parent, **kwargs)
         self.profiles = profiles or []
         self.show_site_list = show_site_list
         self.on_save_callback = on_save_callback
-        self.stats_data = load_stats()
+        self.site_repo = site_repo if site_repo is not None else SiteRepository.load()
         self.current_site_id = None
         self.charts_loaded = False  # 图表是否已加载
+        self._chart_generation = 0  # 每次绘制加 1，丢弃上一轮尚未完成的渲染结果
+        self._chart_photos = {}     # 图表标签 -> 上次显示的 PhotoImage（尺寸相同时复用）
+        self._site_list_version = None  # 站点列表上次绘制时的数据版本
 
         self.create_widgets()
         if self.show_site_list:
@@ -62,24 +66,24 @@ class StatsFrame(ttk.Frame):
 
         # 优先按 ID 查找
         if site_id:
-            site = get_site_by_id(self.stats_data, site_id)
+            site = self.site_repo.get(site_id)
             if site:
                 self.current_site_id = site["id"]
                 self.load_site_to_form(site)
                 return
 
         # 如果没有 ID，按 URL 查找（兼容旧逻辑）
-        for site in self.stats_data.get("sites", []):
-            if site.get("url", "").rstrip("/") == url:
-                self.current_site_id = site["id"]
-                self.load_site_to_form(site)
-                return
+        site = self.site_repo.get_by_url(url)
+        if site:
+            self.current_site_id = site["id"]
+            self.load_site_to_form(site)
+            return
 
         # 如果不存在，自动创建新站点
         new_site = create_site(name=name, url=url, site_type=SITE_TYPE_PAID)
         new_site["api_key"] = api_key
-        add_site(self.stats_data, new_site)
-        save_stats(self.stats_data)
+        self.site_repo.add(new_site)
+        self.site_repo.save()
 
         self.current_site_id = new_site["id"]
         self.load_site_to_form(new_site)
@@ -401,6 +405,7 @@ class StatsFrame(ttk.Frame):
         self.charts_content.columnconfigure(1, weight=1, minsize=540)
         self.charts_content.rowconfigure(0, weight=1)
         self.charts_content.rowconfigure(1, weight=1)
+        self.charts_content.rowconfigure(2, weight=1)
 
         self.charts_window_id = self.charts_canvas.create_window(
             (0, 0),
@@ -434,6 +439,16 @@ class StatsFrame(ttk.Frame):
         self.checkin_chart_label = ttk.Label(checkin_chart, text=placeholder, bootstyle="secondary", anchor=CENTER, justify=CENTER)
         self.checkin_chart_label.pack(fill=BOTH, expand=YES)
 
+        model_chart = ttk.Labelframe(self.charts_content, text=" 模型消耗（本地日志·近30天） ", padding=6)
+        model_chart.grid(row=2, column=0, sticky="nsew", padx=(0, 6), pady=(12, 0))
+        self.model_chart_label = ttk.Label(model_chart, text=placeholder, bootstyle="secondary", anchor=CENTER, justify=CENTER)
+        self.model_chart_label.pack(fill=BOTH, expand=YES)
+
+        usage_chart = ttk.Labelframe(self.charts_content, text=" 调用趋势（本地日志·近30天） ", padding=6)
+        usage_chart.grid(row=2, column=1, sticky="nsew", padx=(6, 0), pady=(12, 0))
+        self.usage_chart_label = ttk.Label(usage_chart, text=placeholder, bootstyle="secondary", anchor=CENTER, justify=CENTER)
+        self.usage_chart_label.pack(fill=BOTH, expand=YES)
+
     def on_charts_content_configure(self, event=None):
         """更新图表区域滚动范围"""
         if not hasattr(self, "charts_canvas"):
@@ -449,17 +464,20 @@ class StatsFrame(ttk.Frame):
 
     # ============ 事件处理 ============
 
-    def refresh_site_list(self):
-        """刷新站点列表"""
-        self.stats_data = load_stats()
-
+    def refresh_site_list(self, force=False):
+        """刷新站点列表（数据版本没有变化时跳过）"""
         # 如果没有站点列表组件，跳过
         if not hasattr(self, 'site_tree'):
             return
 
+        snapshot = self.site_repo.snapshot()
+        if not force and snapshot.version == self._site_list_version:
+            return
+        self._site_list_version = snapshot.version
+
         self.site_tree.delete(*self.site_tree.get_children())
 
-        for site in self.stats_data.get("sites", []):
+        for site in snapshot.sites:
             name = site.get("name", "未命名")
             site_type = SITE_TYPE_LABELS.get(site.get("type", SITE_TYPE_PAID), "付费站")
             balance = site.get("balance", 0)
@@ -480,7 +498,7 @@ class StatsFrame(ttk.Frame):
 
         site_id = selection[0]
         self.current_site_id = site_id
-        site = get_site_by_id(self.stats_data, site_id)
+        site = self.site_repo.get(site_id)
 
         if site:
             self.load_site_to_form(site)
@@ -621,7 +639,7 @@ class StatsFrame(ttk.Frame):
         }
 
         # Cookie 更新时间：当 Cookie 变更时自动更新
-        prev_site = get_site_by_id(self.stats_data, self.current_site_id)
+        prev_site = self.site_repo.get(self.current_site_id)
         prev_cookie = (prev_site or {}).get("session_cookie", "") if prev_site else ""
         new_cookie = updates.get("session_cookie", "")
         if new_cookie and new_cookie != prev_cookie:
@@ -629,8 +647,15 @@ class StatsFrame(ttk.Frame):
         else:
             updates["checkin_cookie_updated_at"] = self.checkin_cookie_time_var.get().strip()
 
-        if update_site(self.stats_data, self.current_site_id, updates):
-            save_stats(self.stats_data)
+        # 手动修改的余额也记入余额历史
+        balance_changed = prev_site is not None and (
+            prev_site.get("balance") != balance or prev_site.get("balance_unit") != balance_unit
+        )
+
+        if self.site_repo.update(self.current_site_id, updates):
+            self.site_repo.save()
+            if balance_changed:
+                record_balance(self.current_site_id, balance, balance_unit, SOURCE_MANUAL)
             self.refresh_site_list()
             self.update_summary()
             # 通知主窗口刷新列表
@@ -647,8 +672,8 @@ class StatsFrame(ttk.Frame):
             url="https://",
             site_type=SITE_TYPE_PAID
         )
-        add_site(self.stats_data, site)
-        save_stats(self.stats_data)
+        self.site_repo.add(site)
+        self.site_repo.save()
         self.refresh_site_list()
         self.update_summary()
 
@@ -662,13 +687,14 @@ class StatsFrame(ttk.Frame):
             messagebox.showwarning("提示", "请先选择一个站点")
             return
 
-        site = get_site_by_id(self.stats_data, self.current_site_id)
+        site = self.site_repo.get(self.current_site_id)
         if not site:
             return
 
         if messagebox.askyesno("确认删除", f"确定要删除站点「{site.get('name', '')}」吗？"):
-            delete_site(self.stats_data, self.current_site_id)
-            save_stats(self.stats_data)
+            self.site_repo.delete(self.current_site_id)
+            self.site_repo.save()
+            delete_balance_history(self.current_site_id)
             self.current_site_id = None
             self.refresh_site_list()
             self.update_summary()
@@ -700,16 +726,13 @@ class StatsFrame(ttk.Frame):
             messagebox.showinfo("提示", "没有可导入的配置")
             return
 
-        new_sites = import_from_profiles(self.profiles, self.stats_data.get("sites", []))
+        new_sites = self.site_repo.import_profiles(self.profiles)
 
         if not new_sites:
             messagebox.showinfo("提示", "所有配置已存在，无需导入")
             return
 
-        for site in new_sites:
-            add_site(self.stats_data, site)
-
-        save_stats(self.stats_data)
+        self.site_repo.save()
         self.refresh_site_list()
         self.update_summary()
         messagebox.showinfo("成功", f"已导入 {len(new_sites)} 个站点")
@@ -720,7 +743,7 @@ class StatsFrame(ttk.Frame):
             messagebox.showwarning("提示", "请先选择一个站点")
             return
 
-        site = get_site_by_id(self.stats_data, self.current_site_id)
+        site = self.site_repo.get(self.current_site_id)
         if site:
             url = site.get("url", "")
             if url:
@@ -773,11 +796,12 @@ class StatsFrame(ttk.Frame):
 
             # 保存到站点数据
             if self.current_site_id:
-                update_site(self.stats_data, self.current_site_id, {
+                self.site_repo.update(self.current_site_id, {
                     "balance": balance,
                     "balance_unit": "USD"
                 })
-                save_stats(self.stats_data)
+                self.site_repo.save()
+                record_balance(self.current_site_id, balance, "USD", SOURCE_COOKIE)
                 self.refresh_site_list()
                 self.update_summary()
 
@@ -792,7 +816,7 @@ class StatsFrame(ttk.Frame):
             messagebox.showwarning("提示", "请先选择一个站点")
             return
 
-        site = get_site_by_id(self.stats_data, self.current_site_id)
+        site = self.site_repo.get(self.current_site_id)
         if not site:
             messagebox.showwarning("提示", "站点不存在")
             return
@@ -825,8 +849,9 @@ class StatsFrame(ttk.Frame):
             balance_result = query_balance_by_cookie(base_url, session_cookie, user_id)
             if balance_result.get("success"):
                 new_balance = balance_result.get("balance", 0)
-                update_site(self.stats_data, self.current_site_id, {"balance": new_balance, "balance_unit": "USD"})
-                save_stats(self.stats_data)
+                self.site_repo.update(self.current_site_id, {"balance": new_balance, "balance_unit": "USD"})
+                self.site_repo.save()
+                record_balance(self.current_site_id, new_balance, "USD", SOURCE_CHECKIN)
                 self.refresh_site_list()
                 self.update_summary()
 
@@ -1009,10 +1034,9 @@ class StatsFrame(ttk.Frame):
         date = self.recharge_date_var.get().strip() or None
         note = self.recharge_note_var.get().strip()
 
-        site = get_site_by_id(self.stats_data, self.current_site_id)
-        if site:
-            add_recharge_record(site, amount, date, note)
-            save_stats(self.stats_data)
+        if self.site_repo.add_recharge(self.current_site_id, amount, date, note):
+            site = self.site_repo.get(self.current_site_id)
+            self.site_repo.save()
             self.refresh_recharge_list(site)
             self.update_summary()
 
@@ -1032,61 +1056,78 @@ class StatsFrame(ttk.Frame):
             return
 
         record_id = selection[0]
-        site = get_site_by_id(self.stats_data, self.current_site_id)
 
-        if site and delete_recharge_record(site, record_id):
-            save_stats(self.stats_data)
+        if self.site_repo.delete_recharge(self.current_site_id, record_id):
+            site = self.site_repo.get(self.current_site_id)
+            self.site_repo.save()
             self.refresh_recharge_list(site)
             self.update_summary()
 
     def update_summary(self):
         """更新统计摘要（不绘制图表）"""
-        sites = self.stats_data.get("sites", [])
-        summary = get_stats_summary(sites)
+        summary = self.site_repo.summary()
         summary_text = f"📊 共 {summary['total_sites']} 个站点 | 💵 总余额 ${summary['total_balance_usd']:.2f} | 💰 总充值 ${summary['total_recharge']:.2f}"
         self.summary_label.config(text=summary_text)
 
     def draw_charts(self):
-        """绘制图表（点击按钮时才执行）"""
-        from matplotlib.backends.backend_agg import FigureCanvasAgg
-        import matplotlib.pyplot as plt
-
-        sites = self.stats_data.get("sites", [])
+        """绘制图表（点击按钮时才执行，在渲染进程中并行绘制，每张图完成后单独显示）"""
+        self._chart_generation += 1
+        generation = self._chart_generation
+
+        # 只传图表用到的字段，避免把整个站点列表（含充值记录）序列化到渲染进程
+        chart_sites = [
+            {key: site[key] for key in ("name", "balance", "balance_unit", "type") if key in site}
+            for site in self.site_repo.sites
+        ]
+        summary = self.site_repo.summary()
+        size = {"figsize": (4.8, 2.6), "dpi": 110}
+        today = datetime.now().strftime("%Y-%m-%d")   # 按月 / 按天统计的图表随日期变化
+        checkin_version = get_checkin_log_signature()
+        log_version = get_log_store_signature()
 
+        # (标签, 图表名称, 构建参数, 参数之外决定图表内容的数据版本)
         chart_jobs = [
-            (self.balance_chart_label, lambda: create_balance_bar_chart(sites, figsize=(4.8, 2.6), dpi=110)),
-            (self.type_chart_label, lambda: create_type_stats_chart(sites, figsize=(4.8, 2.6), dpi=110)),
-            (self.recharge_chart_label, lambda: create_recharge_trend_chart(sites, months=12, figsize=(4.8, 2.6), dpi=110)),
-            (self.checkin_chart_label, lambda: create_checkin_activity_chart(days=30, figsize=(4.8, 2.6), dpi=110)),
+            (self.balance_chart_label, "balance", {"sites": chart_sites, **size}, {}),
+            (self.type_chart_label, "type", {"sites": [], "summary": {"by_type": summary["by_type"]}, **size}, {}),
+            (self.recharge_chart_label, "recharge",
+             {"sites": [], "months": 12, "summary": {"recharge_by_month": summary["recharge_by_month"]}, **size},
+             {"today": today}),
+            (self.checkin_chart_label, "checkin", {"days": 30, **size}, {"today": today, "data": checkin_version}),
+            (self.model_chart_label, "model", {"days": 30, **size}, {"today": today, "data": log_version}),
+            (self.usage_chart_label, "usage", {"days": 30, **size}, {"today": today, "data": log_version}),
         ]
 
-        for chart_label, factory in chart_jobs:
-            fig = None
-            try:
-                fig = factory()
-                chart_img = self.fig_to_image(fig, FigureCanvasAgg)
-                chart_label.config(image=chart_img, text="")
-                chart_label.image = chart_img
-            except Exception as e:
-                chart_label.config(image="", text=f"图表生成失败: {e}")
-                chart_label.image = None
-            finally:
-                if fig is not None:
-                    plt.close(fig)
+        for chart_label, name, kwargs, versions in chart_jobs:
+            chart_label.config(image="", text="图表生成中...")
+            chart_label.image = None
 
-        self.charts_loaded = True
+            def on_rendered(result, error, chart_label=chart_label):
+                try:
+                    self.after(0, lambda: self._on_chart_rendered(generation, chart_label, result, error))
+                except (RuntimeError, tk.TclError):
+                    pass  # 窗口已关闭
 
-    def fig_to_image(self, fig, FigureCanvasAgg):
-        """将 matplotlib Figure 转换为 tkinter 可用的图片"""
-        canvas = FigureCanvasAgg(fig)
-        canvas.draw()
+            cache_key = chart_cache_key(name, {"kwargs": kwargs, **versions})
+            submit_chart(name, kwargs, on_rendered, cache_key=cache_key)
 
-        buf = io.BytesIO()
-        canvas.print_png(buf)
-        buf.seek(0)
+        self.charts_loaded = True
 
-        img = Image.open(buf)
-        return ImageTk.PhotoImage(img)
+    def _on_chart_rendered(self, generation, chart_label, result, error):
+        """显示一张渲染完成的图表（Tk 主线程），忽略已被新一轮绘制取代的结果"""
+        if generation != self._chart_generation:
+            return
+        if error is not None:
+            chart_label.config(image="", text=f"图表生成失败: {error}")
+            chart_label.image = None
+            return
+        chart_img = self.rgba_to_image(*result, photo=self._chart_photos.get(chart_label))
+        self._chart_photos[chart_label] = chart_img
+        chart_label.config(image=chart_img, text="")
+        chart_label.image = chart_img
+
+    def rgba_to_image(self, width, height, pixels, photo=None):
+        """将渲染进程返回的 RGBA 像素转换为 tkinter 可用的图片（尺寸相同时复用 photo）"""
+        return to_photo_image(rgba_to_pil(width, height, pixels), photo)
 
 
 class StatsDialog:
@@ -12,7 +12,8 @@ from ttkbootstrap.constants import *
 from ttkbootstrap.scrolled import ScrolledText
 import httpx
 
-from konata_api.stats import load_stats, get_site_by_id
+from konata_api.http_pool import get_client
+from konata_api.stats import SiteRepository
 from konata_api.conversation_test import (
     test_connectivity,
     detect_model,
@@ -30,12 +31,15 @@ from konata_api.utils import resource_path, fit_toplevel
 class TestFrame(ttkb.Frame):
     """站点测试面板（嵌入式 Frame）"""
 
-    def __init__(self, parent, show_site_list=True, **kwargs):
+    def __init__(self, parent, show_site_list=True, site_repo=None, **kwargs):
         super().__init__(parent, **kwargs)
 
         # 是否显示站点列表（嵌入主窗口时可隐藏，使用全局列表）
         self.show_site_list = show_site_list
 
+        # 站点数据（嵌入主窗口时共享主窗口的仓库）
+        self.site_repo = site_repo if site_repo is not None else SiteRepository.load()
+
         # 当前选中的站点
         self.current_site: Optional[dict] = None
 
@@ -116,7 +120,7 @@ class TestFrame(ttkb.Frame):
 
             # 刷新按钮
             ttk.Button(
-                left_frame, text="🔄 刷新列表", command=self._load_sites, bootstyle="info-outline"
+                left_frame, text="🔄 刷新列表", command=self._reload_sites, bootstyle="info-outline"
             ).grid(row=1, column=0, columnspan=2, pady=(5, 0), sticky=EW)
 
             # ========== 右侧：测试面板 ==========
@@ -247,6 +251,11 @@ class TestFrame(ttkb.Frame):
         )
         self.btn_send.grid(row=0, column=1)
 
+    def _reload_sites(self):
+        """重新读取站点数据并刷新列表"""
+        self.site_repo.reload()
+        self._load_sites()
+
     def _load_sites(self):
         """加载站点列表"""
         # 如果没有站点列表组件，跳过
@@ -257,9 +266,7 @@ class TestFrame(ttkb.Frame):
         for item in self.site_tree.get_children():
             self.site_tree.delete(item)
 
-        # 从 stats.json 加载
-        stats_data = load_stats()
-        sites = stats_data.get("sites", [])
+        sites = self.site_repo.sites
 
         for site in sites:
             self.site_tree.insert(
@@ -278,8 +285,7 @@ class TestFrame(ttkb.Frame):
             return
 
         site_id = selection[0]
-        stats_data = load_stats()
-        site = get_site_by_id(stats_data, site_id)
+        site = self.site_repo.get(site_id)
 
         if site:
             self.current_site = site
@@ -297,8 +303,8 @@ class TestFrame(ttkb.Frame):
             return api_key
 
         # 兼容：从配置文件中查找对应的 API Key
-        from konata_api.utils import load_config
-        config = load_config()
+        from konata_api.utils import get_config_snapshot
+        config = get_config_snapshot()
         site_url = self.current_site.get("url", "").rstrip("/")
 
         for profile in config.get("profiles", []):
@@ -429,35 +435,35 @@ class TestFrame(ttkb.Frame):
         full_response = ""
 
         try:
-            with httpx.Client(timeout=600.0) as client:
-                with client.stream("POST", full_url, headers=headers, json=body) as response:
-                    if response.status_code != 200:
-                        error = response.read().decode('utf-8', errors='ignore')
-                        hint = self._describe_http_error(
-                            response.status_code,
-                            error,
-                            response.headers.get("Content-Type", "")
-                        )
-                        if on_status:
-                            on_status(f"❌ 请求失败 [{response.status_code}]: {hint}")
-                        return ""
-
-                    if on_status:
-                        on_status("✅ 连接成功，等待响应...")
-
-                    # 判断响应格式
-                    is_anthropic = "anthropic" in preset_id or (self.api_config and "/v1/messages" in self.api_config.get("endpoint", ""))
-                    is_openai_responses = (
-                        preset_id == "openai_responses"
-                        or (self.api_config and "/v1/responses" in self.api_config.get("endpoint", ""))
+            client = get_client(full_url)
+            with client.stream("POST", full_url, headers=headers, json=body, timeout=600.0) as response:
+                if response.status_code != 200:
+                    error = response.read().decode('utf-8', errors='ignore')
+                    hint = self._describe_http_error(
+                        response.status_code,
+                        error,
+                        response.headers.get("Content-Type", "")
                     )
-
-                    if is_anthropic:
-                        full_response = self._parse_anthropic_stream(response, on_thinking, on_text, on_status)
-                    elif is_openai_responses:
-                        full_response = self._parse_openai_responses_stream(response, on_text, on_status)
-                    else:
-                        full_response = self._parse_openai_stream(response, on_text, on_status)
+                    if on_status:
+                        on_status(f"❌ 请求失败 [{response.status_code}]: {hint}")
+                    return ""
+
+                if on_status:
+                    on_status("✅ 连接成功，等待响应...")
+
+                # 判断响应格式
+                is_anthropic = "anthropic" in preset_id or (self.api_config and "/v1/messages" in self.api_config.get("endpoint", ""))
+                is_openai_responses = (
+                    preset_id == "openai_responses"
+                    or (self.api_config and "/v1/responses" in self.api_config.get("endpoint", ""))
+                )
+
+                if is_anthropic:
+                    full_response = self._parse_anthropic_stream(response, on_thinking, on_text, on_status)
+                elif is_openai_responses:
+                    full_response = self._parse_openai_responses_stream(response, on_text, on_status)
+                else:
+                    full_response = self._parse_openai_stream(response, on_text, on_status)
 
             self._last_response = full_response
             return full_response
@@ -1,9 +1,13 @@
 """工具函数模块"""
 
+import copy
 import json
 import os
 import sys
+import tempfile
+import threading
 import winreg
+from types import MappingProxyType
 
 
 def get_exe_dir():
@@ -37,27 +41,105 @@ def get_data_dir():
     return get_exe_dir()
 
 
-def load_config():
-    """加载配置文件"""
+# 配置缓存：文件 (修改时间, 大小) 不变时不重新读取
+_config_cache = {"signature": None, "data": None, "snapshot": None}
+_config_lock = threading.Lock()
+
+
+def _file_signature(path):
+    """文件的 (修改时间, 大小)，文件不存在时为 None"""
+    try:
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+    except OSError:
+        return None
+
+
+def freeze(value):
+    """把配置或数据转换为只读结构（dict -> MappingProxyType，list -> tuple）"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def _set_config_cache(signature, data):
+    _config_cache["signature"] = signature
+    _config_cache["data"] = data
+    _config_cache["snapshot"] = freeze(data)
+
+
+def _get_cached_config():
+    """返回缓存的配置（调用方需持有 _config_lock）"""
     config_file = get_config_path()
-    if os.path.exists(config_file):
+    signature = _file_signature(config_file)
+    if _config_cache["data"] is None or signature != _config_cache["signature"]:
+        data = {"profiles": []}
+        if signature is not None:
+            try:
+                with open(config_file, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except (json.JSONDecodeError, IOError, OSError):
+                pass
+        _set_config_cache(signature, data)
+    return _config_cache
+
+
+def load_config():
+    """加载配置文件（返回可修改的副本）"""
+    with _config_lock:
+        return copy.deepcopy(_get_cached_config()["data"])
+
+
+def get_config_snapshot():
+    """
+    获取只读配置快照（不复制，适合频繁读取的场景）
+
+    嵌套的 dict 为 MappingProxyType、list 为 tuple；需要修改时请使用 load_config
+    """
+    with _config_lock:
+        return _get_cached_config()["snapshot"]
+
+
+def atomic_write(path: str, data):
+    """
+    原子地写入文件：先完整写入同目录的临时文件并 fsync，再替换目标文件，
+    写入中途退出或断电不会留下只写了一半的文件
+
+    Args:
+        path: 目标文件路径（目录不存在时自动创建）
+        data: 文件内容（str 按 UTF-8 编码）
+
+    Raises:
+        OSError: 写入失败（临时文件已删除，目标文件保持原样）
+    """
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
         try:
-            with open(config_file, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except (json.JSONDecodeError, IOError, OSError):
+            os.remove(temp_path)
+        except OSError:
             pass
-    return {"profiles": []}
+        raise
 
 
 def save_config(config):
-    """保存配置文件"""
+    """保存配置文件（原子写入，并同步更新缓存）"""
     config_file = get_config_path()
-    # 确保 config 目录存在
-    config_dir = os.path.dirname(config_file)
-    if not os.path.exists(config_dir):
-        os.makedirs(config_dir)
-    with open(config_file, "w", encoding="utf-8") as f:
-        json.dump(config, f, ensure_ascii=False, indent=2)
+    content = json.dumps(config, ensure_ascii=False, indent=2)
+    with _config_lock:
+        atomic_write(config_file, content)
+        _set_config_cache(_file_signature(config_file), copy.deepcopy(config))
 
 
 # === 开机自启动相关 ===
@@ -0,0 +1,34 @@
+"""balance_history.balance_from_result 的测试：只有结果中真实返回余额时才记入历史"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from konata_api.balance_history import balance_from_result
+
+
+class BalanceFromResultTest(unittest.TestCase):
+
+    def test_complete_results(self):
+        self.assertEqual(balance_from_result({"hard_limit_usd": 100, "remaining_usd": 42.5}), (42.5, "USD"))
+        self.assertEqual(balance_from_result({"total_granted": 500, "total_available": 120}), (120, "Token"))
+        self.assertEqual(balance_from_result({"balance": 8, "unit": "CNY"}), (8, "CNY"))
+        self.assertEqual(balance_from_result({"balance": 0, "unit": ""}), (0, "USD"))
+
+    def test_partial_results_are_not_recorded(self):
+        # 只查到了订阅额度或用量，没有余额字段，不能按 0 USD 记录
+        self.assertIsNone(balance_from_result({"hard_limit_usd": 100}))
+        self.assertIsNone(balance_from_result({"total_granted": 500, "total_used": 20}))
+        self.assertIsNone(balance_from_result({"today_cost": 1.5}))
+        self.assertIsNone(balance_from_result({"balance": None, "unit": "USD"}))
+        self.assertIsNone(balance_from_result({}))
+
+    def test_failed_query_is_not_recorded(self):
+        self.assertIsNone(balance_from_result({"error": "timeout", "balance": 10}))
+        self.assertIsNone(balance_from_result(None))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+"""persistence.CoalescingWriter 的失败重试测试"""
+
+import os
+import sys
+import threading
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from konata_api import persistence
+from konata_api.persistence import CoalescingWriter
+
+
+class FailingWrite:
+    """每次都失败的写入函数（模拟只读目录 / 磁盘已满），记录调用次数"""
+
+    def __init__(self):
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def __call__(self):
+        with self.lock:
+            self.calls += 1
+        raise OSError(28, "No space left on device")
+
+
+class CoalescingWriterRetryTest(unittest.TestCase):
+
+    def test_retry_delay_has_minimum_and_grows(self):
+        writer = CoalescingWriter(lambda: True, delay=0)
+        delays = [writer.retry_delay(failures) for failures in range(1, 10)]
+        self.assertEqual(delays[0], persistence.MIN_RETRY_DELAY)
+        self.assertEqual(delays[1], persistence.MIN_RETRY_DELAY * 2)
+        self.assertEqual(delays[-1], persistence.MAX_RETRY_DELAY)
+        self.assertEqual(delays, sorted(delays))
+
+    def test_failing_write_does_not_spin(self):
+        write = FailingWrite()
+        # 缩短重试间隔让测试更快：0.05, 0.1, 0.2, 0.4, 0.4 ... 秒
+        with mock.patch.object(persistence, "MIN_RETRY_DELAY", 0.05), \
+                mock.patch.object(persistence, "MAX_RETRY_DELAY", 0.4):
+            writer = CoalescingWriter(write, delay=0, name="test-failing-writer")
+            writer.mark_dirty()
+            time.sleep(1.0)
+            calls = write.calls
+        # 没有退避时 delay=0 会在 1 秒内重试成千上万次
+        self.assertGreaterEqual(calls, 2)
+        self.assertLessEqual(calls, 8)
+        self.assertTrue(writer.pending)
+
+    def test_flush_writes_immediately_after_failure(self):
+        results = [False, True]
+        writes = []
+
+        def write():
+            writes.append(time.monotonic())
+            return results[len(writes) - 1]
+
+        writer = CoalescingWriter(write, delay=60, name="test-flush-writer")
+        writer.mark_dirty()
+        self.assertFalse(writer.flush())
+        self.assertTrue(writer.pending)
+        # 显式 flush 不受重试间隔限制
+        self.assertTrue(writer.flush())
+        self.assertFalse(writer.pending)
+        self.assertEqual(len(writes), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()